@@ -10,7 +10,7 @@ import sys
 import os
 sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
 
-from src.models import Base
+from src.models.models import Base
 
 # this is the Alembic Config object, which provides
 # access to the values within the .ini file in use.
@@ -0,0 +1,65 @@
+"""baseline: tabelas usuarios e pontos_usuarios
+
+Revision ID: 20251101_0000
+Revises:
+Create Date: 2025-11-01 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '20251101_0000'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Tabelas anteriores às migrações; bancos criados por init_db() já as têm
+    inspector = sa.inspect(op.get_bind())
+    if not inspector.has_table('usuarios'):
+        op.create_table(
+            'usuarios',
+            sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+            sa.Column('nome', sa.String(length=255), nullable=False),
+            sa.Column('cpf', sa.String(length=11), nullable=False),
+            sa.Column('matricula', sa.String(length=50), nullable=False),
+            sa.Column('email', sa.String(length=255), nullable=True),
+            sa.Column('foto_path', sa.String(length=500), nullable=True),
+            sa.Column('ativo', sa.Boolean(), server_default='1', nullable=False),
+            sa.Column('criado_em', sa.DateTime(), nullable=False),
+            sa.Column('atualizado_em', sa.DateTime(), nullable=False),
+            sa.PrimaryKeyConstraint('id'),
+            sa.UniqueConstraint('email')
+        )
+        op.create_index(op.f('ix_usuarios_nome'), 'usuarios', ['nome'], unique=False)
+        op.create_index(op.f('ix_usuarios_cpf'), 'usuarios', ['cpf'], unique=True)
+        op.create_index(op.f('ix_usuarios_matricula'), 'usuarios', ['matricula'], unique=True)
+    if not inspector.has_table('pontos_usuarios'):
+        op.create_table(
+            'pontos_usuarios',
+            sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+            sa.Column('usuario_id', sa.Integer(), nullable=False),
+            sa.Column('data_hora', sa.DateTime(), nullable=False),
+            sa.Column('confianca', sa.Float(), nullable=True),
+            sa.Column('foto_registro_path', sa.String(length=500), nullable=True),
+            sa.Column('observacao', sa.String(length=500), nullable=True),
+            sa.Column('dispositivo', sa.String(length=255), nullable=True),
+            sa.Column('criado_em', sa.DateTime(), nullable=False),
+            sa.ForeignKeyConstraint(['usuario_id'], ['usuarios.id'], ondelete='CASCADE'),
+            sa.PrimaryKeyConstraint('id')
+        )
+        op.create_index(op.f('ix_pontos_usuarios_usuario_id'), 'pontos_usuarios', ['usuario_id'], unique=False)
+        op.create_index(op.f('ix_pontos_usuarios_data_hora'), 'pontos_usuarios', ['data_hora'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_pontos_usuarios_data_hora'), table_name='pontos_usuarios')
+    op.drop_index(op.f('ix_pontos_usuarios_usuario_id'), table_name='pontos_usuarios')
+    op.drop_table('pontos_usuarios')
+    op.drop_index(op.f('ix_usuarios_matricula'), table_name='usuarios')
+    op.drop_index(op.f('ix_usuarios_cpf'), table_name='usuarios')
+    op.drop_index(op.f('ix_usuarios_nome'), table_name='usuarios')
+    op.drop_table('usuarios')
@@ -0,0 +1,45 @@
+"""cria tabela pontos_usuarios_arquivo
+
+Revision ID: 20251110_0001
+Revises: 20251101_0000
+Create Date: 2025-11-10 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '20251110_0001'
+down_revision = '20251101_0000'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # init_db() (Base.metadata.create_all) já cria a tabela e os índices quando o app sobe;
+    # em bancos assim basta registrar a revisão
+    if sa.inspect(op.get_bind()).has_table('pontos_usuarios_arquivo'):
+        return
+    op.create_table(
+        'pontos_usuarios_arquivo',
+        sa.Column('id', sa.Integer(), autoincrement=False, nullable=False),
+        sa.Column('usuario_id', sa.Integer(), nullable=False),
+        sa.Column('data_hora', sa.DateTime(), nullable=False),
+        sa.Column('confianca', sa.Float(), nullable=True),
+        sa.Column('foto_registro_path', sa.String(length=500), nullable=True),
+        sa.Column('observacao', sa.String(length=500), nullable=True),
+        sa.Column('dispositivo', sa.String(length=255), nullable=True),
+        sa.Column('criado_em', sa.DateTime(), nullable=False),
+        sa.Column('arquivado_em', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['usuario_id'], ['usuarios.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_pontos_usuarios_arquivo_usuario_id'), 'pontos_usuarios_arquivo', ['usuario_id'], unique=False)
+    op.create_index(op.f('ix_pontos_usuarios_arquivo_data_hora'), 'pontos_usuarios_arquivo', ['data_hora'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_pontos_usuarios_arquivo_data_hora'), table_name='pontos_usuarios_arquivo')
+    op.drop_index(op.f('ix_pontos_usuarios_arquivo_usuario_id'), table_name='pontos_usuarios_arquivo')
+    op.drop_table('pontos_usuarios_arquivo')
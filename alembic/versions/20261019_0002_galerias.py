@@ -0,0 +1,59 @@
+"""cria tabelas de galerias (shards de reconhecimento por site/grupo)
+
+Revision ID: 20261019_0002
+Revises: 20251110_0001
+Create Date: 2026-10-19 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '20261019_0002'
+down_revision = '20251110_0001'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # init_db() (Base.metadata.create_all) já cria as tabelas quando o app sobe; em bancos assim
+    # basta registrar a revisão
+    if sa.inspect(op.get_bind()).has_table('galerias'):
+        return
+    op.create_table(
+        'galerias',
+        sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column('nome', sa.String(length=64), nullable=False),
+        sa.Column('descricao', sa.String(length=255), nullable=True),
+        sa.Column('criado_em', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_galerias_nome'), 'galerias', ['nome'], unique=True)
+    op.create_table(
+        'galerias_usuarios',
+        sa.Column('galeria_id', sa.Integer(), nullable=False),
+        sa.Column('usuario_id', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['galeria_id'], ['galerias.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['usuario_id'], ['usuarios.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('galeria_id', 'usuario_id')
+    )
+    op.create_index(op.f('ix_galerias_usuarios_usuario_id'), 'galerias_usuarios', ['usuario_id'], unique=False)
+    op.create_table(
+        'cameras_galerias',
+        sa.Column('camera', sa.String(length=100), nullable=False),
+        sa.Column('galeria_id', sa.Integer(), nullable=False),
+        sa.Column('criado_em', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['galeria_id'], ['galerias.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('camera')
+    )
+    op.create_index(op.f('ix_cameras_galerias_galeria_id'), 'cameras_galerias', ['galeria_id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_cameras_galerias_galeria_id'), table_name='cameras_galerias')
+    op.drop_table('cameras_galerias')
+    op.drop_index(op.f('ix_galerias_usuarios_usuario_id'), table_name='galerias_usuarios')
+    op.drop_table('galerias_usuarios')
+    op.drop_index(op.f('ix_galerias_nome'), table_name='galerias')
+    op.drop_table('galerias')
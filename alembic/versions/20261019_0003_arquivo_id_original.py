@@ -0,0 +1,38 @@
+"""pontos_usuarios_arquivo: chave própria e id_original
+
+Revision ID: 20261019_0003
+Revises: 20261019_0002
+Create Date: 2026-10-19 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '20261019_0003'
+down_revision = '20261019_0002'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Tabelas criadas por init_db() com o model atual já têm a coluna
+    colunas = {c['name'] for c in sa.inspect(op.get_bind()).get_columns('pontos_usuarios_arquivo')}
+    if 'id_original' in colunas:
+        return
+    op.add_column('pontos_usuarios_arquivo', sa.Column('id_original', sa.Integer(), nullable=True))
+    op.execute('UPDATE pontos_usuarios_arquivo SET id_original = id')
+    with op.batch_alter_table('pontos_usuarios_arquivo') as batch_op:
+        batch_op.alter_column('id_original', existing_type=sa.Integer(), nullable=False)
+        batch_op.alter_column('id', existing_type=sa.Integer(), existing_nullable=False, autoincrement=True)
+    op.create_index(op.f('ix_pontos_usuarios_arquivo_id_original'), 'pontos_usuarios_arquivo', ['id_original'], unique=False)
+
+
+def downgrade() -> None:
+    # Só volta se os ids originais ainda forem únicos
+    op.drop_index(op.f('ix_pontos_usuarios_arquivo_id_original'), table_name='pontos_usuarios_arquivo')
+    op.execute('UPDATE pontos_usuarios_arquivo SET id = id_original')
+    with op.batch_alter_table('pontos_usuarios_arquivo') as batch_op:
+        batch_op.alter_column('id', existing_type=sa.Integer(), existing_nullable=False, autoincrement=False)
+        batch_op.drop_column('id_original')
@@ -5,15 +5,31 @@ from flask import Flask, render_template, Response, jsonify, request
 import cv2
 import numpy as np
 import base64
+import functools
+import json
 import os
+import time
 from datetime import datetime
 from models.db import get_db, init_db
-from models.models import Usuario, PontoUsuario
+from models.models import Usuario, PontoUsuario, Galeria, CameraGaleria
 from services.face_recognition_service import get_face_service
-from constants.config import ESP32_CAM_URL as CFG_ESP32_CAM_URL
-from urllib.parse import urlparse, urlunparse
-from urllib.request import urlopen, Request
-import socket
+from services.gallery_shards import get_gallery_manager, NOME_VALIDO as NOME_GALERIA_VALIDO
+from services.ponto_export import export_pontos, iter_pontos, parse_periodo, EXPORT_FORMATS
+from services.ponto_audit import PontoAuditor, records_from_paths, gallery_members
+from services.metrics import FRAME_TOTAL_SECONDS, FRAMES_TOTAL, render_metrics
+from services.tracing import get_tracer, frame_stage, db_commit
+from services.profiler import get_profiler
+from services.frame_recorder import get_recording_manager
+from services.calibration import get_calibrator
+from services.frame_store import get_frame_store
+from services.backpressure import get_frame_admission
+from services.mjpeg_broadcaster import get_mjpeg_broadcaster, BOUNDARY as MJPEG_BOUNDARY
+from services.esp32_recognition import get_esp32_recognition, EVENT_CHANNEL as ESP32_EVENT_CHANNEL
+from services.event_bus import get_event_bus
+from services.face_detectors import get_face_detector, largest_face, crop_face
+from services.face_quality import get_face_quality
+from services.burst_enrollment import get_burst_enrollment
+from constants.config import ESP32_CAM_URL as CFG_ESP32_CAM_URL, ESP32_CAM_ENABLED, CAMERA_MODE, ADMIN_TOKEN
 
 app = Flask(__name__)
 app.config['SECRET_KEY'] = 'your-secret-key'
@@ -31,31 +47,54 @@ init_db()
 # Variável global para serviço de reconhecimento facial
 face_service = get_face_service()
 
-# Classificador Haar para reutilização em todo o módulo (evita recriar a cada frame)
-face_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_frontalface_default.xml')
+# Galerias por site/grupo (um modelo por galeria; câmeras sem vínculo usam face_service)
+galleries = get_gallery_manager()
 
-# Cache do último frame capturado (evita competição pela câmera)
-import threading
-last_frame_lock = threading.Lock()
-last_frame_cache = None
-last_frame_registro_cache = None
+# Profiler sob demanda (ligado via /api/admin/profiler/*)
+profiler = get_profiler()
 
+# Tracing por frame (exportado via /api/admin/trace)
+tracer = get_tracer()
 
-def _detect_largest_face_bbox(gray):
+# Gravação de frames recebidos (controlada via /api/admin/gravacao/*)
+recording = get_recording_manager()
+
+# Detector de faces do processo (FACE_DETECTOR_BACKEND), o mesmo usado pelo reconhecimento
+face_detector = get_face_detector()
+
+# Porta de qualidade do rosto (também recusa fotos ruins no cadastro)
+face_quality = get_face_quality()
+
+# Último frame recebido por fluxo (somente leitura, publicado por troca de referência)
+frame_store = get_frame_store('reconhecimento')
+frame_registro_store = get_frame_store('registro')
+
+# Cadastro em rajada: fotos amostradas no servidor a partir do stream (/api/capturar_rajada)
+burst_enrollment = get_burst_enrollment()
+
+# Backpressure: um frame em processamento por sessão + intervalo recomendado aos clientes
+admission = get_frame_admission()
+
+# Retransmissão da ESP32-CAM: uma conexão com a câmera para todos os espectadores
+# (aberta no primeiro acesso a /api/espcam/*, ou já na inicialização com ESP32_CAM_ENABLED)
+mjpeg_broadcaster = get_mjpeg_broadcaster()
+if ESP32_CAM_ENABLED:
+    mjpeg_broadcaster.ensure_started()
+
+# Eventos para as páginas (SSE em /api/events): detecções, estado de UI e pontos registrados
+event_bus = get_event_bus()
+
+
+def _detect_largest_face_bbox(frame, gray):
     """Detecta faces e retorna o bounding box da maior face.
     Retorna tupla (x, y, w, h) ou None se não encontrar.
     """
-    faces = face_cascade.detectMultiScale(gray, scaleFactor=1.1, minNeighbors=5, minSize=(80, 80))
-    if len(faces) == 0:
-        return None
-    # Seleciona a maior face por área
-    x, y, w, h = max(faces, key=lambda f: f[2] * f[3])
-    return (x, y, w, h)
+    return largest_face(face_detector.detect(frame, gray, min_size=(80, 80)))
 
 
-def _crop_face_from_frame(frame, margin: float = 0.15, return_color: bool = False):
+def _crop_face_from_frame(frame, margin: float = 0.15, return_color: bool = False, bbox=None):
     """Recorta somente o rosto a partir do frame, com pequena margem.
-    - Detecta a maior face em escala de cinza
+    - Detecta a maior face (ou usa `bbox`, já detectada pelo chamador)
     - Aplica margem percentual
     - Redimensiona para 200x200
     - Se return_color=True retorna imagem BGR 200x200
@@ -63,29 +102,57 @@ def _crop_face_from_frame(frame, margin: float = 0.15, return_color: bool = Fals
     Retorna ndarray ou None.
     """
     gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-    bbox = _detect_largest_face_bbox(gray)
+    if bbox is None:
+        bbox = _detect_largest_face_bbox(frame, gray)
     if bbox is None:
         return None
-    x, y, w, h = bbox
-    mh = int(h * margin)
-    mw = int(w * margin)
-    x1 = max(0, x - mw)
-    y1 = max(0, y - mh)
-    x2 = min(gray.shape[1], x + w + mw)
-    y2 = min(gray.shape[0], y + h + mh)
     if return_color:
-        face_color = frame[y1:y2, x1:x2]
-        if face_color.size == 0:
-            return None
-        face_color = cv2.resize(face_color, (200, 200))
-        return face_color
-    else:
-        face_gray = gray[y1:y2, x1:x2]
-        if face_gray.size == 0:
+        return crop_face(frame, bbox, margin)
+    face_gray = crop_face(gray, bbox, margin)
+    return cv2.equalizeHist(face_gray) if face_gray is not None else None
+
+
+def _detection_payload(data):
+    """Dados de uma detecção pendente para a UI (com nome e matrícula), ou None se o CPF não existir."""
+    with get_db() as db:
+        usuario = db.query(Usuario).filter(Usuario.cpf == data['cpf']).first()
+        if not usuario:
             return None
-        face_gray = cv2.resize(face_gray, (200, 200))
-        face_gray = cv2.equalizeHist(face_gray)
-        return face_gray
+        return {
+            'found': True,
+            'cpf': usuario.cpf,
+            'nome': usuario.nome,
+            'matricula': usuario.matricula,
+            'horario': data['timestamp'],
+            'confidence': data['confidence'],
+            'detection_id': data.get('detection_id')
+        }
+
+
+def _publicar_deteccao(canal, data):
+    """Publica a detecção no canal; com assinantes SSE, ela não fica esperando em /api/last_detection."""
+    payload = _detection_payload(data)
+    if payload is None:
+        return
+    event_bus.publish(canal, 'detection', payload)
+    if event_bus.subscribers(canal):
+        galleries.clear_last_detection(data.get('detection_id'))
+
+
+# CAMERA_MODE=esp32: reconhecimento no servidor direto dos frames da câmera (sem ida e volta pelo navegador)
+esp32_recognition = None
+if CAMERA_MODE == 'esp32':
+    esp32_recognition = get_esp32_recognition()
+    esp32_recognition.on_detection = lambda det: _publicar_deteccao(ESP32_EVENT_CHANNEL, det)
+    esp32_recognition.start()
+
+
+def _frame_atual():
+    """Último frame da câmera (somente leitura) ou None: o do stream ESP32 consumido no servidor
+    (CAMERA_MODE=esp32, em que ninguém chama /api/process_frame) ou o último enviado pelo navegador."""
+    if esp32_recognition is not None:
+        return esp32_recognition.source.frames.get()
+    return frame_store.get()
 
 
 # ==================== ROTAS DE PÁGINAS ====================
@@ -105,7 +172,8 @@ def registro():
 @app.route('/espcam')
 def index_espcam():
     """Página de visualização da ESP32-CAM (stream estático)."""
-    return render_template('index_espcam.html', stream_url=CFG_ESP32_CAM_URL)
+    return render_template('index_espcam.html', stream_url=CFG_ESP32_CAM_URL,
+                           server_side=esp32_recognition is not None)
 
 
 @app.route('/registro_espcam')
@@ -114,93 +182,168 @@ def registro_espcam():
     return render_template('registro_espcam.html', stream_url=CFG_ESP32_CAM_URL)
 
 
-def _derive_snapshot_url(stream_url: str) -> str:
-    """Deriva a URL de snapshot (/capture) a partir da URL do stream fornecida.
-    Convenções usuais do firmware da Arduino (CameraWebServer):
-      - Página HTML: http://IP/
-      - Snapshot:    http://IP/capture (porta 80)
-      - Stream MJPEG:http://IP:81/stream (porta 81)
+@app.route('/api/espcam/snapshot')
+def api_espcam_snapshot():
+    """Último JPEG recebido da ESP32-CAM (mesmos bytes da câmera, sem recodificar).
+    Todos os espectadores compartilham uma única conexão com a câmera; se o frame em cache
+    tiver mais de MJPEG_SNAPSHOT_MAX_AGE, espera o próximo.
+    """
+    frame = mjpeg_broadcaster.snapshot()
+    if frame is None:
+        status = mjpeg_broadcaster.status()
+        return jsonify({'success': False, 'message': f"ESP32 snapshot indisponível: {status['last_error'] or 'sem frames da câmera'}"}), 503
+    return Response(frame.data, mimetype='image/jpeg', headers={
+        'Cache-Control': 'no-store',
+        'X-Frame-Seq': str(frame.seq),
+    })
+
+
+@app.route('/api/espcam/stream')
+def api_espcam_stream():
+    """Stream MJPEG (multipart/x-mixed-replace) retransmitido a partir da conexão única com a câmera.
+    Query: fps (opcional) limita a taxa para este espectador.
     """
     try:
-        p = urlparse(stream_url)
-        # Base host (sem porta 81)
-        host = p.hostname or 'localhost'
-        scheme = p.scheme or 'http'
-        # Se porta é 81, snapshot costuma estar no 80
-        netloc = host
-        if p.port and p.port != 80:
-            # Assume snapshot na 80
-            netloc = host
-        # Caminho padrão do snapshot
-        snapshot_path = '/capture'
-        return urlunparse((scheme, netloc, snapshot_path, '', '', ''))
-    except Exception:
-        # Fallback simples
-        return stream_url.rstrip('/') + '/capture'
+        fps = float(request.args.get('fps', 0))
+    except ValueError:
+        fps = 0.0
+    if not mjpeg_broadcaster.try_acquire():
+        return jsonify({'success': False, 'message': 'Limite de espectadores do stream atingido.'}), 503
+    return Response(
+        mjpeg_broadcaster.stream(max_fps=fps),
+        mimetype=f'multipart/x-mixed-replace; boundary={MJPEG_BOUNDARY}',
+        headers={'Cache-Control': 'no-store', 'X-Accel-Buffering': 'no'},
+        direct_passthrough=True
+    )
 
 
-@app.route('/api/espcam/snapshot')
-def api_espcam_snapshot():
-    """Proxy de snapshot para ESP32-CAM. Evita CORS no browser.
-    Retorna image/jpeg.
+@app.route('/api/espcam/reconhecimento')
+def api_espcam_reconhecimento():
+    """Estado do reconhecimento no servidor (CAMERA_MODE=esp32): caixas do último frame e status de UI.
+    Query: since (seq do último estado recebido) e espera (s, máx. 5) para aguardar um estado novo.
     """
-    url = _derive_snapshot_url(CFG_ESP32_CAM_URL)
+    if esp32_recognition is None:
+        return jsonify({'success': False, 'message': 'Reconhecimento no servidor desativado (CAMERA_MODE != esp32).'}), 409
     try:
-        req = Request(url, headers={'User-Agent': 'Mozilla/5.0'})
-        with urlopen(req, timeout=3) as resp:
-            data = resp.read()
-            return Response(data, mimetype='image/jpeg')
-    except (Exception, socket.timeout) as e:
-        return jsonify({'success': False, 'message': f'ESP32 snapshot indisponível: {str(e)}'}), 502
+        since = int(request.args.get('since', 0))
+        espera = max(0.0, min(5.0, float(request.args.get('espera', 0))))
+    except ValueError:
+        return jsonify({'success': False, 'message': 'Parâmetros inválidos.'}), 400
+    state = esp32_recognition.state(since=since, timeout=espera)
+    return jsonify({'success': True, 'state': state})
+
+
+@app.route('/api/espcam/status')
+def api_espcam_status():
+    """Estado da conexão com a câmera e dos espectadores."""
+    return jsonify({'success': True, 'espcam': mjpeg_broadcaster.status()})
 
 
 # ==================== ROTAS DE VÍDEO ====================
 
+def admitir_frame(endpoint: str, extra=None):
+    """Decorator: descarta o frame (sem decodificar) se a sessão já tem um em processamento.
+    A sessão é o `session_id` do corpo JSON ou, na falta dele, o IP do cliente.
+    """
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            data = request.get_json(silent=True) or {}
+            sessao = f"{endpoint}:{data.get('session_id') or request.remote_addr or ''}"
+            if not admission.try_acquire(sessao, endpoint):
+                body = {'success': True, 'skipped': True, 'next_interval_ms': admission.next_interval_ms()}
+                if extra:
+                    body.update(extra())
+                return jsonify(body)
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                admission.release(sessao)
+        return wrapper
+    return decorator
+
+
+def _servico_do_frame():
+    """Serviço da galeria do frame: `galeria` do corpo/query, a vinculada à `camera` ou o geral.
+    KeyError se a galeria pedida não existir.
+    """
+    data = request.get_json(silent=True) or {}
+    return galleries.for_camera(
+        data.get('camera') or request.args.get('camera'),
+        data.get('galeria') or request.args.get('galeria')
+    )
+
+
+def _ui_do_frame():
+    try:
+        return _servico_do_frame().get_ui_status()
+    except KeyError:
+        return None
+
+
 @app.route('/api/process_frame', methods=['POST'])
+@admitir_frame('process_frame', extra=lambda: {'ui': _ui_do_frame()})
+@profiler.profiled('process_frame')
+@tracer.traced('process_frame')
 def api_process_frame():
     """Processa frame enviado pelo cliente para reconhecimento"""
     try:
+        inicio = time.perf_counter()
         data = request.json or {}
         frame_data = data.get('frame')
         
         if not frame_data:
             return jsonify({'success': False, 'message': 'Frame não fornecido'}), 400
+        try:
+            servico = _servico_do_frame()
+        except KeyError:
+            return jsonify({'success': False, 'message': 'Galeria não encontrada'}), 404
         
         # Decodifica base64 para imagem
-        img_data = base64.b64decode(frame_data.split(',')[1] if ',' in frame_data else frame_data)
-        nparr = np.frombuffer(img_data, np.uint8)
-        frame = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
+        with frame_stage('b64decode'):
+            img_data = base64.b64decode(frame_data.split(',')[1] if ',' in frame_data else frame_data)
+        with frame_stage('imdecode'):
+            nparr = np.frombuffer(img_data, np.uint8)
+            frame = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
         
         if frame is None:
             return jsonify({'success': False, 'message': 'Falha ao decodificar frame'}), 400
+        FRAMES_TOTAL.inc()
+        recording.record('process_frame', img_data, data.get('session_id') or '')
         
-        # Atualiza cache do último frame
-        global last_frame_cache
-        with last_frame_lock:
-            last_frame_cache = frame.copy()
+        # Publica o frame decodificado; as caixas são desenhadas em uma cópia
+        frame_store.publish(frame)
+        frame = frame.copy()
         
         # Executa detecção e reconhecimento
-        face_service.detect_and_recognize(frame)
-        ui = face_service.get_ui_status()
+        found = servico.detect_and_recognize(frame)
+        ui = servico.get_ui_status()
+        if found and data.get('session_id'):
+            _publicar_deteccao(data['session_id'], found)
         
         # Codifica frame processado de volta para JPEG
-        ret, buffer = cv2.imencode('.jpg', frame)
+        with frame_stage('imencode'):
+            ret, buffer = cv2.imencode('.jpg', frame)
         if not ret:
             return jsonify({'success': False, 'message': 'Falha ao codificar frame'}), 500
         
-        frame_base64 = base64.b64encode(buffer).decode('utf-8')
-        
-        return jsonify({
-            'success': True,
-            'processed_frame': f'data:image/jpeg;base64,{frame_base64}',
-            'ui': ui
-        })
+        with frame_stage('response'):
+            frame_base64 = base64.b64encode(buffer).decode('utf-8')
+            response = jsonify({
+                'success': True,
+                'processed_frame': f'data:image/jpeg;base64,{frame_base64}',
+                'ui': ui,
+                'next_interval_ms': admission.next_interval_ms()
+            })
+        FRAME_TOTAL_SECONDS.observe(time.perf_counter() - inicio)
+        return response
         
     except Exception as e:
         return jsonify({'success': False, 'message': f'Erro: {str(e)}'}), 500
 
 
 @app.route('/api/process_frame_registro', methods=['POST'])
+@admitir_frame('process_frame_registro')
 def api_process_frame_registro():
     """Processa frame enviado pelo cliente para registro"""
     try:
@@ -218,14 +361,13 @@ def api_process_frame_registro():
         if frame is None:
             return jsonify({'success': False, 'message': 'Falha ao decodificar frame'}), 400
         
-        # Atualiza cache do último frame
-        global last_frame_registro_cache
-        with last_frame_lock:
-            last_frame_registro_cache = frame.copy()
+        # Publica o frame decodificado; as caixas são desenhadas em uma cópia
+        frame_registro_store.publish(frame)
+        frame = frame.copy()
         
         # Detecta faces para auxiliar no cadastro
         gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-        faces = face_cascade.detectMultiScale(gray, scaleFactor=1.1, minNeighbors=5, minSize=(60, 60))
+        faces = face_detector.detect(frame, gray, min_size=(60, 60))
         
         # Desenha retângulos ao redor das faces detectadas
         for (x, y, w, h) in faces:
@@ -247,7 +389,8 @@ def api_process_frame_registro():
         return jsonify({
             'success': True,
             'processed_frame': f'data:image/jpeg;base64,{frame_base64}',
-            'faces_detected': len(faces)
+            'faces_detected': len(faces),
+            'next_interval_ms': admission.next_interval_ms()
         })
         
     except Exception as e:
@@ -327,6 +470,34 @@ def api_last_recognition():
     return jsonify({'nome': None})
 
 
+@app.route('/api/exportar_pontos', methods=['GET'])
+def api_exportar_pontos():
+    """Exporta registros de ponto em streaming (CSV ou JSONL).
+    Query: formato=csv|jsonl, inicio, fim (ISO 8601), cpf?, usuario_id?, incluir_arquivo?
+    As linhas são lidas com cursor do servidor e enviadas em blocos.
+    """
+    formato = (request.args.get('formato') or 'csv').lower()
+    if formato not in EXPORT_FORMATS:
+        return jsonify({'success': False, 'message': 'Formato inválido. Use csv ou jsonl.'}), 400
+    try:
+        inicio, fim = parse_periodo(request.args.get('inicio'), request.args.get('fim'))
+    except ValueError as e:
+        return jsonify({'success': False, 'message': f'Período inválido: {str(e)}'}), 400
+    cpf = ''.join(filter(str.isdigit, request.args.get('cpf') or '')) or None
+    usuario_id = request.args.get('usuario_id', type=int)
+    incluir_arquivo = (request.args.get('incluir_arquivo') or '').lower() in ('1', 'true', 'sim')
+
+    filename = f"pontos_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{formato}"
+    return Response(
+        export_pontos(formato, inicio, fim, cpf=cpf, usuario_id=usuario_id, incluir_arquivo=incluir_arquivo),
+        mimetype=EXPORT_FORMATS[formato],
+        headers={
+            'Content-Disposition': f'attachment; filename={filename}',
+            'X-Accel-Buffering': 'no'
+        }
+    )
+
+
 @app.route('/api/cadastrar_usuario', methods=['POST'])
 def api_cadastrar_usuario():
     """(Deprecated) Endpoint antigo de cadastro isolado. Prefira /api/usuario_status"""
@@ -394,7 +565,8 @@ def usuario_status_internal(data, legacy: bool = False):
             # Cria novo usuário
             novo = Usuario(nome=nome, cpf=cpf, matricula=matricula, email=email)
             db.add(novo)
-            db.commit()
+            with db_commit('usuario_status'):
+                db.commit()
             return jsonify({
                 'success': True,
                 'new_user': True,
@@ -412,7 +584,7 @@ def usuario_status_internal(data, legacy: bool = False):
 def api_capturar_foto():
     """Captura foto atual da câmera e salva em pasta por CPF.
     Corpo: { usuario_id }
-    Retorna: { success, message, count, path }
+    Retorna: { success, message, count, path, quality }; 422 se o rosto não passa na porta de qualidade
     """
     try:
         data = request.json or {}
@@ -438,15 +610,23 @@ def api_capturar_foto():
                 print(f"[ERRO] Falha ao criar pasta {rostos_dir}: {dir_err}")
                 return jsonify({'success': False, 'message': f'Erro ao criar pasta: {str(dir_err)}'}), 500
 
-            # Usa o frame do cache ao invés de capturar diretamente da câmera
-            with last_frame_lock:
-                frame = last_frame_registro_cache.copy() if last_frame_registro_cache is not None else None
+            # Usa o último frame recebido ao invés de capturar diretamente da câmera
+            frame = frame_registro_store.get()
             
             if frame is None:
                 return jsonify({'success': False, 'message': 'Nenhum frame disponível. Aguarde o stream carregar.'}), 500
 
             # Recorta somente a região do rosto (bounding box) para usar no treinamento
-            face_img = _crop_face_from_frame(frame, margin=0.15, return_color=True)
+            gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+            bbox = _detect_largest_face_bbox(frame, gray)
+            if bbox is None:
+                return jsonify({'success': False, 'message': 'Nenhum rosto detectado. Tente ajustar o enquadramento/iluminação.'}), 400
+            x, y, w, h = bbox
+            qualidade = face_quality.assess(gray[y:y+h, x:x+w], min(w, h), use='enroll')
+            print(f"[INFO] Qualidade da captura ({cpf}): {qualidade}")
+            if not qualidade['ok']:
+                return jsonify({'success': False, 'message': face_quality.message(qualidade), 'quality': qualidade}), 422
+            face_img = _crop_face_from_frame(frame, margin=0.15, return_color=True, bbox=bbox)
             if face_img is None:
                 return jsonify({'success': False, 'message': 'Nenhum rosto detectado. Tente ajustar o enquadramento/iluminação.'}), 400
 
@@ -468,7 +648,8 @@ def api_capturar_foto():
             if not usuario.foto_path:
                 usuario.foto_path = rostos_dir
             db.add(usuario)
-            db.commit()
+            with db_commit('capturar_foto'):
+                db.commit()
 
             total = len([f for f in os.listdir(rostos_dir) if f.lower().endswith('.jpg')])
             rel_path = os.path.relpath(filepath, base_dir)
@@ -477,7 +658,8 @@ def api_capturar_foto():
                 'success': True,
                 'message': 'Foto capturada e salva com sucesso',
                 'count': total,
-                'path': rel_path
+                'path': rel_path,
+                'quality': qualidade
             })
     except Exception as e:
         print(f"[ERRO] api_capturar_foto: {e}")
@@ -486,10 +668,74 @@ def api_capturar_foto():
         return jsonify({'success': False, 'message': f'Erro ao capturar foto: {str(e)}'}), 500
 
 
+@app.route('/api/capturar_rajada', methods=['POST'])
+def api_capturar_rajada():
+    """Inicia a captura automática de fotos no servidor, sem um POST por foto.
+    Corpo: { usuario_id, fotos?, segundos?, fonte?: 'registro'|'esp32' }
+    ('registro': frames enviados pela página de cadastro; 'esp32': stream da ESP32-CAM).
+    Retorna 202 com o id da rajada; andamento em GET /api/capturar_rajada/<id>.
+    """
+    data = request.get_json(silent=True) or {}
+    usuario_id = data.get('usuario_id')
+    if not usuario_id:
+        return jsonify({'success': False, 'message': 'ID do usuário não fornecido'}), 400
+    fonte = data.get('fonte') or 'registro'
+    if fonte not in ('registro', 'esp32'):
+        return jsonify({'success': False, 'message': "fonte deve ser 'registro' ou 'esp32'"}), 400
+    try:
+        fotos = int(data['fotos']) if data.get('fotos') is not None else None
+        segundos = float(data['segundos']) if data.get('segundos') is not None else None
+    except (TypeError, ValueError):
+        return jsonify({'success': False, 'message': 'fotos e segundos devem ser numéricos'}), 400
+    with get_db() as db:
+        usuario = db.query(Usuario).filter(Usuario.id == usuario_id).first()
+        if not usuario:
+            return jsonify({'success': False, 'message': 'Usuário não encontrado'}), 404
+        cpf = usuario.cpf
+    if fonte == 'esp32':
+        mjpeg_broadcaster.ensure_started()
+        frames = mjpeg_broadcaster.source.frames
+    else:
+        frames = frame_registro_store
+    try:
+        job = burst_enrollment.start(usuario_id, cpf, fonte, frames, fotos, segundos)
+    except RuntimeError as e:
+        return jsonify({'success': False, 'message': str(e)}), 409
+    return jsonify({'success': True, 'message': 'Captura iniciada', 'job_id': job.id, 'status': job.status()}), 202
+
+
+@app.route('/api/capturar_rajada/<job_id>', methods=['GET'])
+def api_capturar_rajada_status(job_id):
+    """Andamento da rajada: estado, fotos aceitas/descartadas, fotos gravadas e galerias atualizadas."""
+    job = burst_enrollment.get(job_id)
+    if job is None:
+        return jsonify({'success': False, 'message': 'Captura não encontrada'}), 404
+    return jsonify({'success': True, 'status': job.status()})
+
+
+@app.route('/api/capturar_rajada/<job_id>/cancelar', methods=['POST'])
+def api_capturar_rajada_cancelar(job_id):
+    """Interrompe a rajada sem gravar as fotos."""
+    job = burst_enrollment.get(job_id)
+    if job is None:
+        return jsonify({'success': False, 'message': 'Captura não encontrada'}), 404
+    job.cancel()
+    return jsonify({'success': True, 'message': 'Captura cancelada'})
+
+
 @app.route('/api/recriar_modelo', methods=['POST'])
 def api_recriar_modelo():
-    qtd = face_service.train()
-    return jsonify({'success': True, 'message': f'Modelo re-treinado com {qtd} imagens.'})
+    """Re-treina o modelo geral e todas as galerias, ou só a galeria do corpo JSON (`galeria`)."""
+    nome = (request.get_json(silent=True) or {}).get('galeria')
+    try:
+        treinadas = galleries.train(nome)
+    except KeyError:
+        return jsonify({'success': False, 'message': 'Galeria não encontrada'}), 404
+    if not nome:
+        # Dataset mudou: re-ajusta as tabelas da evidência sequencial
+        face_service.start_evidence_fit()
+    qtd = treinadas.get(nome or 'geral', 0)
+    return jsonify({'success': True, 'message': f'Modelo re-treinado com {qtd} imagens.', 'galerias': treinadas})
 
 
 @app.route('/api/model_status', methods=['GET'])
@@ -499,6 +745,17 @@ def api_model_status():
     status = {
         'trained': face_service.is_trained(),
         'threshold': face_service.get_threshold(),
+        'pool': face_service.pool_status(),
+        'backpressure': admission.status(),
+        'motion_gate': face_service.motion_gate_status(),
+        'evidence': face_service.evidence_status(),
+        'esp32_recognition': esp32_recognition.status() if esp32_recognition is not None else None,
+        'events': event_bus.status(),
+        'memory': face_service.memory_status(),
+        'detector': face_detector.name,
+        'quality': face_quality.status(),
+        'burst': burst_enrollment.status(),
+        'galleries': galleries.status(),
         'datasets': []
     }
     if os.path.isdir(base):
@@ -526,12 +783,88 @@ def api_ajustar_limite():
     return jsonify({'success': True, 'threshold': value})
 
 
+def _bool_opcional(valor):
+    """None, bool ou "true"/"false" (sem diferenciar maiúsculas) -> None/bool; outro valor -> ValueError."""
+    if valor is None or isinstance(valor, bool):
+        return valor
+    if isinstance(valor, str) and valor.strip().lower() in ('true', 'false'):
+        return valor.strip().lower() == 'true'
+    raise ValueError(f'valor booleano inválido: {valor!r}')
+
+
+@app.route('/api/ajustar_movimento', methods=['POST'])
+def api_ajustar_movimento():
+    """Liga/desliga a porta de movimento e ajusta sua sensibilidade.
+    Body: { enabled?: bool, threshold?: number (diferença média em níveis de cinza; menor = mais sensível) }
+    """
+    data = request.json or {}
+    threshold = data.get('threshold')
+    if threshold is not None:
+        try:
+            threshold = float(threshold)
+        except (TypeError, ValueError):
+            return jsonify({'success': False, 'message': 'Threshold inválido.'}), 400
+    try:
+        enabled = _bool_opcional(data.get('enabled'))
+    except ValueError:
+        return jsonify({'success': False, 'message': 'enabled deve ser true ou false.'}), 400
+    status = face_service.configure_motion_gate(enabled=enabled, threshold=threshold)
+    return jsonify({'success': True, 'motion_gate': status})
+
+
+@app.route('/api/ajustar_evidencia', methods=['POST'])
+def api_ajustar_evidencia():
+    """Liga/desliga a confirmação antecipada por evidência sequencial e ajusta a taxa de erro nominal.
+    Body: { enabled?: bool, target_error?: number (ex.: 0.01; menor = mais frames antes de confirmar),
+            reajustar?: bool (re-ajusta as tabelas genuíno/impostor ao dataset atual) }
+    """
+    data = request.json or {}
+    target_error = data.get('target_error')
+    if target_error is not None:
+        try:
+            target_error = float(target_error)
+        except (TypeError, ValueError):
+            return jsonify({'success': False, 'message': 'target_error inválido.'}), 400
+        if not 0.0 < target_error < 1.0:
+            return jsonify({'success': False, 'message': 'target_error deve estar em (0, 1).'}), 400
+    try:
+        enabled = _bool_opcional(data.get('enabled'))
+        reajustar = _bool_opcional(data.get('reajustar'))
+    except ValueError:
+        return jsonify({'success': False, 'message': 'enabled e reajustar devem ser true ou false.'}), 400
+    if reajustar:
+        face_service.fit_evidence()
+    status = face_service.configure_evidence(enabled=enabled, target_error=target_error)
+    return jsonify({'success': True, 'evidence': status})
+
+
+@app.route('/api/calibrar_limite', methods=['POST'])
+def api_calibrar_limite():
+    """Avalia o dataset (leave-one-out ou k-fold) e sugere um limiar pelas curvas FAR/FRR.
+    JSON: {modo: 'loo'|'kfold', k, far (alvo, padrão 0.01), passos, aplicar (bool)}
+    """
+    data = request.json or {}
+    try:
+        resultado = get_calibrator().evaluate(
+            modo=data.get('modo', 'loo'),
+            k=data.get('k', 5),
+            far_alvo=data.get('far', 0.01),
+            passos=data.get('passos', 200),
+            limite_atual=face_service.get_threshold(),
+        )
+    except (TypeError, ValueError) as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    aplicado = None
+    if data.get('aplicar'):
+        aplicado = face_service.set_threshold(resultado['limite_sugerido'])
+    return jsonify({'success': True, 'resultado': resultado, 'threshold_aplicado': aplicado})
+
+
 @app.route('/api/predict_now', methods=['GET'])
 def api_predict_now():
     """Executa predição no frame atual e retorna detalhes (para depuração)."""
-    # Usa o frame do cache ao invés de capturar diretamente
-    with last_frame_lock:
-        frame = last_frame_cache.copy() if last_frame_cache is not None else None
+    # Usa o último frame recebido ao invés de capturar diretamente
+    frame = _frame_atual()
     
     if frame is None:
         return jsonify({'success': False, 'message': 'Nenhum frame disponível no cache'}), 500
@@ -540,6 +873,53 @@ def api_predict_now():
     return jsonify({'success': True, 'result': result})
 
 
+@app.route('/api/verificar', methods=['POST'])
+def api_verificar():
+    """Verificação 1:1: compara o rosto apenas com as fotos da pessoa declarada (crachá/teclado).
+    Body: { cpf? | matricula?, frame?: base64 (padrão: último frame recebido) }
+    Retorna: { success, verified, cpf, distance, threshold, bbox, images }
+    """
+    try:
+        data = request.json or {}
+        cpf = ''.join(filter(str.isdigit, str(data.get('cpf') or '')))
+        matricula = str(data.get('matricula') or '').strip()
+        if not cpf and not matricula:
+            return jsonify({'success': False, 'message': 'Informe cpf ou matrícula'}), 400
+        if matricula and not cpf:
+            with get_db() as db:
+                usuario = db.query(Usuario).filter(Usuario.matricula == matricula).first()
+                if not usuario:
+                    return jsonify({'success': False, 'message': 'Usuário não encontrado'}), 404
+                cpf = usuario.cpf
+
+        frame_data = data.get('frame')
+        if frame_data:
+            img_data = base64.b64decode(frame_data.split(',')[1] if ',' in frame_data else frame_data)
+            frame = cv2.imdecode(np.frombuffer(img_data, np.uint8), cv2.IMREAD_COLOR)
+            if frame is None:
+                return jsonify({'success': False, 'message': 'Falha ao decodificar frame'}), 400
+        else:
+            frame = _frame_atual()
+            if frame is None:
+                return jsonify({'success': False, 'message': 'Nenhum frame disponível no cache'}), 500
+
+        inicio = time.perf_counter()
+        result = face_service.verify(frame, cpf)
+        if not result['enrolled']:
+            return jsonify({'success': False, 'cpf': cpf, 'message': 'Pessoa sem fotos cadastradas'}), 404
+        if not result['found']:
+            return jsonify({'success': False, 'cpf': cpf, 'verified': False,
+                            'message': 'Nenhum rosto detectado'}), 422
+        return jsonify({
+            'success': True,
+            'cpf': cpf,
+            **result,
+            'ms': round((time.perf_counter() - inicio) * 1000.0, 2)
+        })
+    except Exception as e:
+        return jsonify({'success': False, 'message': f'Erro: {str(e)}'}), 500
+
+
 @app.route('/api/ajustar_tempos', methods=['POST'])
 def api_ajustar_tempos():
     """Ajusta tempos de UX: estabilidade antes de detectar e cooldown pós-detecção.
@@ -559,23 +939,15 @@ def api_ajustar_tempos():
 
 @app.route('/api/last_detection', methods=['GET'])
 def api_last_detection():
-    data = face_service.pop_last_detection()
+    """Detecção pendente da galeria da página (query `camera`/`galeria`, como em process_frame)."""
+    try:
+        data = _servico_do_frame().pop_last_detection()
+    except KeyError:
+        return jsonify({'found': False})
     if not data:
         return jsonify({'found': False})
     # Busca usuário por CPF
-    with get_db() as db:
-        usuario = db.query(Usuario).filter(Usuario.cpf == data['cpf']).first()
-        if not usuario:
-            return jsonify({'found': False})
-        return jsonify({
-            'found': True,
-            'cpf': usuario.cpf,
-            'nome': usuario.nome,
-            'matricula': usuario.matricula,
-            'horario': data['timestamp'],
-            'confidence': data['confidence'],
-            'detection_id': data.get('detection_id')
-        })
+    return jsonify(_detection_payload(data) or {'found': False})
 
 
 @app.route('/api/confirmar_ponto', methods=['POST'])
@@ -601,7 +973,7 @@ def api_confirmar_ponto():
                 return jsonify({'success': False, 'message': 'Usuário não encontrado'}), 404
             foto_registro_rel = None
             if detection_id:
-                det = face_service.consume_detection(detection_id)
+                det = galleries.consume_detection(detection_id)
                 if det and det.get('cpf') == cpf:
                     base_dir = os.path.join(os.path.dirname(__file__), 'constants', 'rostos', cpf)
                     os.makedirs(base_dir, exist_ok=True)
@@ -617,9 +989,8 @@ def api_confirmar_ponto():
                             # Continua sem abortar; tenta fallback com frame atual
                             print(f"[confirmar_ponto] Erro ao salvar ROI: {e}")
             if not foto_registro_rel:
-                # Fallback: captura frame atual, recorta e salva
-                with last_frame_lock:
-                    frame = last_frame_cache.copy() if last_frame_cache is not None else None
+                # Fallback: usa o último frame recebido (ou o do stream ESP32), recorta e salva
+                frame = _frame_atual()
                 
                 if frame is None:
                     return jsonify({'success': False, 'message': 'Nenhum frame disponível no cache'}), 500
@@ -639,7 +1010,16 @@ def api_confirmar_ponto():
             ponto = PontoUsuario(usuario_id=usuario.id, confianca=confidence, foto_registro_path=foto_registro_rel)
             db.add(ponto)
             db.add(usuario)
-            db.commit()
+            with db_commit('confirmar_ponto'):
+                db.commit()
+            if body.get('canal'):
+                event_bus.publish(body['canal'], 'ponto', {
+                    'cpf': usuario.cpf,
+                    'nome': usuario.nome,
+                    'matricula': usuario.matricula,
+                    'horario': ponto.data_hora.isoformat(),
+                    'detection_id': detection_id
+                })
         return jsonify({'success': True, 'message': 'Ponto registrado com sucesso.'})
     except Exception as e:
         # Garante resposta JSON para evitar erro de parse no frontend
@@ -647,6 +1027,298 @@ def api_confirmar_ponto():
         return jsonify({'success': False, 'message': f'Erro interno ao registrar ponto: {str(e)}'}), 500
 
 
+# ==================== EVENTOS (SSE) ====================
+
+@app.route('/api/events', methods=['GET'])
+def api_events():
+    """Server-Sent Events de um canal: detection, status (reconhecimento no servidor) e ponto.
+    Query: canal (session_id da página ou 'esp32'). Reconexões enviam Last-Event-ID (ou ?last_event_id=)
+    e recebem os eventos perdidos que ainda estão no buffer do canal; conexões novas, só os próximos.
+    """
+    canal = (request.args.get('canal') or '').strip()
+    if not canal or len(canal) > 100:
+        return jsonify({'success': False, 'message': 'Informe o canal.'}), 400
+    last_event_id = request.headers.get('Last-Event-ID') or request.args.get('last_event_id')
+    if not event_bus.try_acquire():
+        return jsonify({'success': False, 'message': 'Limite de conexões de eventos atingido.'}), 503
+    return Response(
+        event_bus.stream(canal, last_event_id),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-store', 'X-Accel-Buffering': 'no'}
+    )
+
+
+# ==================== MÉTRICAS ====================
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    """Expõe métricas de latência por etapa e contadores no formato texto do Prometheus."""
+    return Response(render_metrics(), mimetype='text/plain; version=0.0.4; charset=utf-8')
+
+
+# ==================== ADMINISTRAÇÃO ====================
+
+def _admin_autorizado() -> bool:
+    """Endpoints /api/admin/*: exige X-Admin-Token (ou ?token=) igual a ADMIN_TOKEN.
+    Sem ADMIN_TOKEN configurado, aceita apenas requisições de localhost.
+    """
+    if ADMIN_TOKEN:
+        token = request.headers.get('X-Admin-Token') or request.args.get('token')
+        return token == ADMIN_TOKEN
+    return request.remote_addr in ('127.0.0.1', '::1')
+
+
+@app.route('/api/admin/profiler/iniciar', methods=['POST'])
+def api_admin_profiler_iniciar():
+    """Liga profiling para as próximas N execuções ou T segundos do alvo.
+    Body: { modo: 'cprofile'|'amostragem'|'tracemalloc', alvo?: 'process_frame'|'esp32',
+            requisicoes?: int, segundos?: number, intervalo_ms?: number }
+    """
+    if not _admin_autorizado():
+        return jsonify({'success': False, 'message': 'Não autorizado'}), 403
+    data = request.json or {}
+    try:
+        status = profiler.start(
+            modo=data.get('modo', 'cprofile'),
+            alvo=data.get('alvo', 'process_frame'),
+            requisicoes=data.get('requisicoes'),
+            segundos=data.get('segundos'),
+            intervalo_ms=float(data.get('intervalo_ms', 5.0))
+        )
+    except (TypeError, ValueError) as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    return jsonify({'success': True, 'status': status})
+
+
+@app.route('/api/admin/profiler/status', methods=['GET'])
+def api_admin_profiler_status():
+    if not _admin_autorizado():
+        return jsonify({'success': False, 'message': 'Não autorizado'}), 403
+    return jsonify({'success': True, 'status': profiler.status()})
+
+
+@app.route('/api/admin/profiler/parar', methods=['POST'])
+def api_admin_profiler_parar():
+    if not _admin_autorizado():
+        return jsonify({'success': False, 'message': 'Não autorizado'}), 403
+    return jsonify({'success': True, 'status': profiler.stop()})
+
+
+@app.route('/api/admin/profiler/resultado', methods=['GET'])
+def api_admin_profiler_resultado():
+    """Baixa o resultado da última sessão (.pstats, .folded ou diff do tracemalloc)."""
+    if not _admin_autorizado():
+        return jsonify({'success': False, 'message': 'Não autorizado'}), 403
+    result = profiler.result()
+    if result is None:
+        return jsonify({'success': False, 'message': 'Nenhum resultado disponível (sessão ausente ou em andamento)'}), 404
+    content, filename, mimetype = result
+    return Response(content, mimetype=mimetype,
+                    headers={'Content-Disposition': f'attachment; filename={filename}'})
+
+
+@app.route('/api/admin/trace', methods=['GET'])
+def api_admin_trace():
+    """Baixa o buffer de spans como Chrome trace JSON (chrome://tracing ou Perfetto)."""
+    if not _admin_autorizado():
+        return jsonify({'success': False, 'message': 'Não autorizado'}), 403
+    filename = f"trace_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+    response = jsonify(tracer.to_chrome_trace())
+    response.headers['Content-Disposition'] = f'attachment; filename={filename}'
+    return response
+
+
+@app.route('/api/admin/trace', methods=['POST'])
+def api_admin_trace_config():
+    """Liga/desliga o tracing e/ou limpa o buffer.
+    Body: { ativo?: bool, limpar?: bool }
+    """
+    if not _admin_autorizado():
+        return jsonify({'success': False, 'message': 'Não autorizado'}), 403
+    data = request.json or {}
+    try:
+        ativo = _bool_opcional(data.get('ativo'))
+        limpar = _bool_opcional(data.get('limpar'))
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    if ativo is not None:
+        tracer.set_enabled(ativo)
+    if limpar:
+        tracer.clear()
+    return jsonify({'success': True, 'status': tracer.status()})
+
+
+@app.route('/api/admin/gravacao/iniciar', methods=['POST'])
+def api_admin_gravacao_iniciar():
+    """Inicia gravação (.frec) dos JPEGs recebidos.
+    Body: { fonte?: 'process_frame'|'esp32'|'todas', nome?: str, max_frames?: int, max_mb?: number }
+    """
+    if not _admin_autorizado():
+        return jsonify({'success': False, 'message': 'Não autorizado'}), 403
+    data = request.json or {}
+    try:
+        kwargs = {}
+        if data.get('max_mb') is not None:
+            kwargs['max_mb'] = float(data['max_mb'])
+        status = recording.start(
+            fonte=data.get('fonte', 'todas'),
+            nome=data.get('nome'),
+            max_frames=int(data['max_frames']) if data.get('max_frames') is not None else None,
+            **kwargs
+        )
+    except (TypeError, ValueError) as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    return jsonify({'success': True, 'status': status})
+
+
+@app.route('/api/admin/gravacao/parar', methods=['POST'])
+def api_admin_gravacao_parar():
+    if not _admin_autorizado():
+        return jsonify({'success': False, 'message': 'Não autorizado'}), 403
+    return jsonify({'success': True, 'status': recording.stop()})
+
+
+@app.route('/api/admin/gravacao/status', methods=['GET'])
+def api_admin_gravacao_status():
+    if not _admin_autorizado():
+        return jsonify({'success': False, 'message': 'Não autorizado'}), 403
+    return jsonify({'success': True, 'status': recording.status()})
+
+
+@app.route('/api/admin/auditoria', methods=['POST'])
+def api_admin_auditoria():
+    """Audita fotos de ponto contra o CPF declarado e todo o cadastro; resposta em JSON Lines (streaming).
+    Corpo: caminhos? (lista de caminhos relativos a src/ ou {caminho, cpf}) ou inicio?/fim?/cpf?/
+    incluir_arquivo? (pontos do banco); galeria? (compara só com os membros); somente_alertas?.
+    Uma linha por registro (status, predicted_cpf, distance, claimed_distance, mismatch) e, por último,
+    { resumo }.
+    """
+    if not _admin_autorizado():
+        return jsonify({'success': False, 'message': 'Não autorizado'}), 403
+    body = request.get_json(silent=True) or {}
+    try:
+        if body.get('caminhos') is not None:
+            if not isinstance(body['caminhos'], list):
+                return jsonify({'success': False, 'message': '"caminhos" deve ser uma lista.'}), 400
+            registros = list(records_from_paths(body['caminhos']))
+        else:
+            inicio, fim = parse_periodo(body.get('inicio'), body.get('fim'))
+            cpf = ''.join(filter(str.isdigit, str(body.get('cpf') or ''))) or None
+            incluir_arquivo = bool(_bool_opcional(body.get('incluir_arquivo')))
+            registros = iter_pontos(inicio, fim, cpf=cpf, incluir_arquivo=incluir_arquivo)
+        cpfs = gallery_members(body['galeria']) if body.get('galeria') else None
+        somente_alertas = bool(_bool_opcional(body.get('somente_alertas')))
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    except KeyError:
+        return jsonify({'success': False, 'message': 'Galeria não encontrada'}), 404
+    # Threads em vez de processos: não faz fork do servidor web
+    auditor = PontoAuditor(face_service.base_dir, face_service.threshold, cpfs=cpfs, processes=False)
+
+    def gerar():
+        for r in auditor.run(registros):
+            if r['status'] != 'ok' or not somente_alertas:
+                yield json.dumps(r, ensure_ascii=False) + '\n'
+        yield json.dumps({'resumo': auditor.stats}, ensure_ascii=False) + '\n'
+
+    return Response(gerar(), mimetype='application/x-ndjson', headers={'X-Accel-Buffering': 'no'})
+
+
+@app.route('/api/admin/galerias', methods=['GET'])
+def api_admin_galerias():
+    """Galerias do banco com membros, câmeras vinculadas e estado do modelo."""
+    if not _admin_autorizado():
+        return jsonify({'success': False, 'message': 'Não autorizado'}), 403
+    estado = galleries.status()['galerias']
+    with get_db() as db:
+        galerias = [{
+            'nome': g.nome,
+            'descricao': g.descricao,
+            'cpfs': sorted(u.cpf for u in g.usuarios),
+            'cameras': sorted(c.camera for c in g.cameras),
+            'modelo': estado.get(g.nome),
+        } for g in db.query(Galeria).order_by(Galeria.nome).all()]
+    return jsonify({'success': True, 'galerias': galerias})
+
+
+@app.route('/api/admin/galerias', methods=['POST'])
+def api_admin_galerias_salvar():
+    """Cria ou altera uma galeria. Corpo JSON: nome, descricao?, cpfs? (substitui os membros),
+    adicionar?/remover? (listas de CPFs), cameras? (substitui os vínculos; uma câmera pertence a
+    uma única galeria). A galeria é (re)treinada em seguida se os membros mudaram.
+    """
+    if not _admin_autorizado():
+        return jsonify({'success': False, 'message': 'Não autorizado'}), 403
+    body = request.get_json(silent=True) or {}
+    nome = str(body.get('nome') or '').strip().lower()
+    if not NOME_GALERIA_VALIDO.match(nome):
+        return jsonify({'success': False, 'message': 'Nome inválido (use letras minúsculas, números, - e _).'}), 400
+    for campo in ('cpfs', 'adicionar', 'remover', 'cameras'):
+        if campo in body and not isinstance(body[campo], list):
+            return jsonify({'success': False, 'message': f'"{campo}" deve ser uma lista.'}), 400
+    with get_db() as db:
+        galeria = db.query(Galeria).filter(Galeria.nome == nome).first()
+        if galeria is None:
+            galeria = Galeria(nome=nome)
+            db.add(galeria)
+        if 'descricao' in body:
+            galeria.descricao = body.get('descricao')
+        cpfs = {u.cpf for u in galeria.usuarios} if 'cpfs' not in body else {str(c) for c in body['cpfs']}
+        cpfs |= {str(c) for c in body.get('adicionar') or []}
+        cpfs -= {str(c) for c in body.get('remover') or []}
+        usuarios = db.query(Usuario).filter(Usuario.cpf.in_(cpfs)).all() if cpfs else []
+        desconhecidos = sorted(cpfs - {u.cpf for u in usuarios})
+        if desconhecidos:
+            db.rollback()
+            return jsonify({'success': False, 'message': 'CPF(s) não cadastrado(s).', 'cpfs': desconhecidos}), 404
+        galeria.usuarios = usuarios
+        if 'cameras' in body:
+            db.flush()
+            cameras = {str(c).strip() for c in body['cameras'] if str(c).strip()}
+            for vinculo in list(galeria.cameras):
+                if vinculo.camera not in cameras:
+                    db.delete(vinculo)
+            for camera in cameras:
+                vinculo = db.query(CameraGaleria).filter(CameraGaleria.camera == camera).first()
+                if vinculo is None:
+                    db.add(CameraGaleria(camera=camera, galeria_id=galeria.id))
+                else:
+                    vinculo.galeria_id = galeria.id
+        with db_commit('galeria'):
+            db.commit()
+    treinadas = galleries.reload()
+    return jsonify({'success': True, 'message': f"Galeria '{nome}' salva.", 'treinadas': treinadas,
+                    'galeria': galleries.status()['galerias'].get(nome)})
+
+
+@app.route('/api/admin/galerias/<nome>', methods=['DELETE'])
+def api_admin_galerias_remover(nome):
+    """Remove a galeria; suas câmeras voltam ao serviço geral. O arquivo do modelo é mantido."""
+    if not _admin_autorizado():
+        return jsonify({'success': False, 'message': 'Não autorizado'}), 403
+    with get_db() as db:
+        galeria = db.query(Galeria).filter(Galeria.nome == nome).first()
+        if galeria is None:
+            return jsonify({'success': False, 'message': 'Galeria não encontrada'}), 404
+        db.delete(galeria)
+        with db_commit('galeria'):
+            db.commit()
+    galleries.reload()
+    return jsonify({'success': True, 'message': f"Galeria '{nome}' removida."})
+
+
+@app.route('/api/admin/galerias/<nome>/treinar', methods=['POST'])
+def api_admin_galerias_treinar(nome):
+    """Re-treina só esta galeria (ex.: após novas fotos de um membro)."""
+    if not _admin_autorizado():
+        return jsonify({'success': False, 'message': 'Não autorizado'}), 403
+    try:
+        treinadas = galleries.train(nome)
+    except KeyError:
+        return jsonify({'success': False, 'message': 'Galeria não encontrada'}), 404
+    return jsonify({'success': True, 'message': f'Galeria re-treinada com {treinadas[nome]} imagens.'})
+
+
 # ==================== MAIN ====================
 
 if __name__ == '__main__':
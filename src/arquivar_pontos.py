@@ -0,0 +1,34 @@
+"""
+Script de arquivamento de pontos antigos
+Move registros de pontos_usuarios para pontos_usuarios_arquivo em lotes
+"""
+import argparse
+from constants.config import PONTOS_ARCHIVE_AFTER_DAYS, PONTOS_ARCHIVE_CHUNK_SIZE
+from services.archive_service import arquivar_pontos
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Arquiva pontos antigos em pontos_usuarios_arquivo')
+    parser.add_argument('--dias', type=int, default=PONTOS_ARCHIVE_AFTER_DAYS,
+                        help=f'Idade mínima (em dias) para arquivar (padrão: {PONTOS_ARCHIVE_AFTER_DAYS})')
+    parser.add_argument('--lote', type=int, default=PONTOS_ARCHIVE_CHUNK_SIZE,
+                        help=f'Linhas movidas por transação (padrão: {PONTOS_ARCHIVE_CHUNK_SIZE})')
+    parser.add_argument('--max-lotes', type=int, default=None,
+                        help='Limita a quantidade de lotes nesta execução')
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("ARQUIVAMENTO DE PONTOS")
+    print("=" * 60)
+    print(f"\nArquivando pontos com mais de {args.dias} dia(s), lotes de {args.lote}...")
+
+    resultado = arquivar_pontos(dias=args.dias, chunk_size=args.lote, max_chunks=args.max_lotes)
+
+    print(f"\n✓ {resultado['arquivados']} registro(s) arquivado(s) em {resultado['lotes']} lote(s)")
+    print(f"  Limite: {resultado['limite']}")
+    print(f"  Tempo:  {resultado['segundos']}s")
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    main()
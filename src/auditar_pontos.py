@@ -0,0 +1,82 @@
+"""
+Script de auditoria das fotos de ponto
+Confere as fotos de registro (foto_registro_path) contra o CPF declarado e contra todo o cadastro, em lote
+"""
+import argparse
+import json
+import os
+from datetime import datetime
+from constants.config import AUDIT_WORKERS, AUDIT_CHUNK_SIZE
+from services.face_recognition_service import DEFAULT_CONFIDENCE_THRESHOLD
+from services.ponto_audit import PontoAuditor, records_from_paths, gallery_members
+from services.ponto_export import iter_pontos, parse_periodo
+
+ROSTOS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'constants', 'rostos')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Audita as fotos de registro de ponto contra o cadastro')
+    parser.add_argument('--inicio', default=None, help='Início do período (ISO 8601)')
+    parser.add_argument('--fim', default=None, help='Fim do período (ISO 8601; só a data inclui o dia inteiro)')
+    parser.add_argument('--cpf', default=None, help='Somente pontos deste CPF')
+    parser.add_argument('--incluir-arquivo', action='store_true', help='Inclui pontos_usuarios_arquivo')
+    parser.add_argument('--caminhos', nargs='+', default=None,
+                        help='Audita estas fotos (relativas a src/) em vez de consultar o banco')
+    parser.add_argument('--galeria', default=None, help='Compara só com os membros desta galeria')
+    parser.add_argument('--dataset', default=ROSTOS_DIR, help='Pasta de rostos (<cpf>/*.jpg)')
+    parser.add_argument('--limite', type=float, default=DEFAULT_CONFIDENCE_THRESHOLD,
+                        help=f'Limiar de distância (padrão: {DEFAULT_CONFIDENCE_THRESHOLD})')
+    parser.add_argument('--workers', type=int, default=AUDIT_WORKERS,
+                        help='Processos (padrão: AUDIT_WORKERS; 0 = um por CPU)')
+    parser.add_argument('--lote', type=int, default=AUDIT_CHUNK_SIZE,
+                        help=f'Registros por bloco (padrão: {AUDIT_CHUNK_SIZE})')
+    parser.add_argument('--somente-alertas', action='store_true', help='Grava só os registros com status diferente de ok')
+    parser.add_argument('--saida', default=None, help='Arquivo JSONL (padrão: auditoria_<data>.jsonl)')
+    args = parser.parse_args()
+
+    try:
+        if args.caminhos:
+            registros = list(records_from_paths(args.caminhos))
+        else:
+            inicio, fim = parse_periodo(args.inicio, args.fim)
+            cpf = ''.join(filter(str.isdigit, args.cpf or '')) or None
+            registros = iter_pontos(inicio, fim, cpf=cpf, incluir_arquivo=args.incluir_arquivo)
+        cpfs = gallery_members(args.galeria) if args.galeria else None
+    except ValueError as e:
+        parser.error(str(e))
+    except KeyError:
+        parser.error(f'galeria não encontrada: {args.galeria}')
+    saida = args.saida or f"auditoria_{datetime.now().strftime('%Y%m%d_%H%M%S')}.jsonl"
+
+    print("=" * 60)
+    print("AUDITORIA DAS FOTOS DE PONTO")
+    print("=" * 60)
+    auditor = PontoAuditor(args.dataset, args.limite, workers=args.workers, chunk_size=args.lote, cpfs=cpfs)
+    print(f"\nAuditando com {auditor.workers} worker(s), limiar {auditor.threshold}"
+          + (f", galeria {args.galeria}" if args.galeria else '') + "...")
+
+    # Primeiras divergências, para o resumo (o arquivo tem todas)
+    divergencias = []
+    with open(saida, 'w', encoding='utf-8') as f:
+        for r in auditor.run(registros):
+            if r['mismatch'] and len(divergencias) < 20:
+                divergencias.append(r)
+            if r['status'] != 'ok' or not args.somente_alertas:
+                f.write(json.dumps(r, ensure_ascii=False) + '\n')
+
+    s = auditor.stats
+    print(f"\n✓ {s['registros']} registro(s) auditado(s) em {s['segundos']}s "
+          f"({s['registros_por_minuto']} por minuto)")
+    print(f"  Galeria: {s['galeria']['pessoas']} pessoa(s), {s['galeria']['fotos']} foto(s) "
+          f"em {s['galeria']['segundos']}s")
+    print("  Status: " + ', '.join(f'{k}={v}' for k, v in s['status'].items() if v))
+    for r in divergencias:
+        origem = f"ponto {r['id']} ({r['data_hora']})" if r['id'] is not None else r['foto_registro_path']
+        print(f"  ⚠️  {origem}: declarado {r['cpf']} "
+              f"(dist. {r['claimed_distance']}), parece {r['predicted_cpf']} (dist. {r['distance']})")
+    print(f"\nResultado em {saida}")
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,6 @@
+"""
+Benchmarks offline do sistema de reconhecimento facial.
+
+Executar a partir de `src/`:
+    python -m benchmarks.recognition --saida bench.json
+"""
@@ -0,0 +1,128 @@
+"""Utilitários compartilhados pelos benchmarks: fontes de frames, estatísticas e ambiente."""
+from __future__ import annotations
+import os
+import platform
+import resource
+import sys
+from datetime import datetime
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from services.frame_recorder import ReplaySource
+
+SRC_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+ROSTOS_DIR = os.path.join(SRC_DIR, 'constants', 'rostos')
+IMAGE_EXTS = ('.jpg', '.jpeg', '.png')
+
+
+def list_dataset(base_dir: str = ROSTOS_DIR) -> List[Tuple[str, str]]:
+    """Lista (cpf, caminho) de todas as imagens do dataset, em ordem estável."""
+    itens = []
+    if not os.path.isdir(base_dir):
+        return itens
+    for cpf in sorted(os.listdir(base_dir)):
+        pasta = os.path.join(base_dir, cpf)
+        if not os.path.isdir(pasta):
+            continue
+        for arquivo in sorted(os.listdir(pasta)):
+            if arquivo.lower().endswith(IMAGE_EXTS):
+                itens.append((cpf, os.path.join(pasta, arquivo)))
+    return itens
+
+
+def frame_with_border(img: np.ndarray, size: Optional[Tuple[int, int]]) -> np.ndarray:
+    """Centraliza um recorte de rosto em uma moldura (largura, altura), simulando um frame de câmera.
+    Os recortes do dataset (200x200) ocupam a imagem inteira e o detector não os encontra sem margem.
+    """
+    if size is None:
+        return img
+    w, h = size
+    ih, iw = img.shape[:2]
+    if iw >= w or ih >= h:
+        return img
+    top = (h - ih) // 2
+    left = (w - iw) // 2
+    return cv2.copyMakeBorder(img, top, h - ih - top, left, w - iw - left, cv2.BORDER_CONSTANT, value=(40, 40, 40))
+
+
+def parse_size(valor: str) -> Optional[Tuple[int, int]]:
+    """Converte 'LxA' em (largura, altura); '0'/'none' desativa a moldura."""
+    if not valor or valor.lower() in ('0', 'none', 'nenhuma'):
+        return None
+    w, h = valor.lower().split('x')
+    return int(w), int(h)
+
+
+def iter_frames(path: str) -> Iterator[np.ndarray]:
+    """Itera frames BGR de uma gravação `.frec`, de um diretório de imagens (ordem alfabética)
+    ou de um arquivo de vídeo."""
+    if path.lower().endswith('.frec'):
+        for _ts, _sid, frame in ReplaySource(path).iter_frames():
+            yield frame
+        return
+    if os.path.isdir(path):
+        for arquivo in sorted(os.listdir(path)):
+            if arquivo.lower().endswith(IMAGE_EXTS):
+                frame = cv2.imread(os.path.join(path, arquivo), cv2.IMREAD_COLOR)
+                if frame is not None:
+                    yield frame
+        return
+    cap = cv2.VideoCapture(path)
+    try:
+        while True:
+            ok, frame = cap.read()
+            if not ok:
+                break
+            yield frame
+    finally:
+        cap.release()
+
+
+def percentiles(values: Iterable[float], scale: float = 1.0) -> Dict:
+    """p50/p95/p99/média/máx de uma amostra, multiplicados por `scale`."""
+    arr = np.asarray(list(values), dtype=np.float64) * scale
+    if arr.size == 0:
+        return {'n': 0}
+    p50, p95, p99 = np.percentile(arr, [50, 95, 99])
+    return {
+        'n': int(arr.size),
+        'p50': round(float(p50), 4),
+        'p95': round(float(p95), 4),
+        'p99': round(float(p99), 4),
+        'mean': round(float(arr.mean()), 4),
+        'max': round(float(arr.max()), 4),
+    }
+
+
+def peak_rss_mb() -> float:
+    """Pico de memória residente do processo (MB)."""
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reporta em KB, macOS em bytes
+    if sys.platform == 'darwin':
+        return round(rss / (1024 * 1024), 2)
+    return round(rss / 1024, 2)
+
+
+def project_version() -> Optional[str]:
+    try:
+        import tomllib
+        with open(os.path.join(SRC_DIR, '..', 'pyproject.toml'), 'rb') as f:
+            return tomllib.load(f)['project']['version']
+    except Exception:
+        return None
+
+
+def environment(label: Optional[str] = None) -> Dict:
+    """Metadados do ambiente para comparar execuções entre versões."""
+    return {
+        'label': label,
+        'version': project_version(),
+        'timestamp': datetime.utcnow().isoformat(),
+        'python': platform.python_version(),
+        'opencv': cv2.__version__,
+        'numpy': np.__version__,
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+    }
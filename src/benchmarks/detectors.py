@@ -0,0 +1,188 @@
+"""Benchmark dos detectores de face (`services/face_detectors.py`).
+
+Para cada backend disponível (haar, lbp, yunet) mede latência p50/p95/p99 e
+FPS e a sensibilidade (recall):
+ - no dataset `constants/rostos`: cada recorte centralizado em uma moldura
+   contém exatamente um rosto, então recall = imagens com ao menos uma face;
+ - em sequências gravadas (`--frames`): não há rótulo, então a referência é
+   outro backend (`--referencia`, padrão haar) e conta-se quantas faces dela
+   também foram encontradas (IoU >= `--iou`), além de faces extras.
+
+Backends sem arquivo de modelo aparecem como `skipped` com o motivo.
+
+Uso (a partir de `src/`):
+    python -m benchmarks.detectors --saida detectores.json
+    python -m benchmarks.detectors --lbp lbpcascade_frontalface_improved.xml \
+        --yunet face_detection_yunet_2023mar.onnx --frames constants/gravacoes/portaria.frec
+"""
+from __future__ import annotations
+import argparse
+import json
+import os
+import sys
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import cv2
+import numpy as np
+
+from benchmarks.common import ROSTOS_DIR, list_dataset, frame_with_border, iter_frames, percentiles, environment, parse_size
+from services.face_detectors import BACKENDS, CascadeDetector, FaceDetector, YuNetDetector, create_detector
+from services.face_recognition_service import FACE_SIZE
+
+
+def _iou(a: Tuple[int, int, int, int], b: Tuple[int, int, int, int]) -> float:
+    ax2, ay2 = a[0] + a[2], a[1] + a[3]
+    bx2, by2 = b[0] + b[2], b[1] + b[3]
+    iw = max(0, min(ax2, bx2) - max(a[0], b[0]))
+    ih = max(0, min(ay2, by2) - max(a[1], b[1]))
+    inter = iw * ih
+    uniao = a[2] * a[3] + b[2] * b[3] - inter
+    return inter / uniao if uniao > 0 else 0.0
+
+
+def _detect_all(detector: FaceDetector, frames: Sequence[np.ndarray], repeat: int) -> Tuple[List[List], Dict]:
+    """Detecta em todos os frames; retorna as caixas (da última passada) e as estatísticas de tempo."""
+    grays = [cv2.cvtColor(f, cv2.COLOR_BGR2GRAY) for f in frames]
+    lat: List[float] = []
+    caixas: List[List] = []
+    inicio = time.perf_counter()
+    for _ in range(repeat):
+        caixas = []
+        for frame, gray in zip(frames, grays):
+            t0 = time.perf_counter()
+            caixas.append(detector.detect(frame, gray, min_size=FACE_SIZE))
+            lat.append(time.perf_counter() - t0)
+    wall = time.perf_counter() - inicio
+    return caixas, {
+        'frames': len(lat),
+        'fps': round(len(lat) / wall, 2) if wall > 0 else None,
+        'latency_ms': percentiles(lat, 1000.0),
+    }
+
+
+def _dataset_recall(caixas: List[List]) -> Dict:
+    com_face = sum(1 for c in caixas if c)
+    return {
+        'images': len(caixas),
+        'detected': com_face,
+        'recall': round(com_face / len(caixas), 4) if caixas else None,
+        'multiple_faces': sum(1 for c in caixas if len(c) > 1),
+    }
+
+
+def _agreement(caixas: List[List], referencia: List[List], iou_min: float) -> Dict:
+    """Faces da referência também encontradas (IoU >= iou_min) e faces a mais."""
+    ref_total = encontradas = extras = 0
+    for atuais, ref in zip(caixas, referencia):
+        usadas = set()
+        for r in ref:
+            ref_total += 1
+            melhor, idx = 0.0, None
+            for i, c in enumerate(atuais):
+                if i not in usadas:
+                    v = _iou(r, c)
+                    if v > melhor:
+                        melhor, idx = v, i
+            if idx is not None and melhor >= iou_min:
+                usadas.add(idx)
+                encontradas += 1
+        extras += len(atuais) - len(usadas)
+    return {
+        'reference_faces': ref_total,
+        'matched': encontradas,
+        'recall_vs_reference': round(encontradas / ref_total, 4) if ref_total else None,
+        'extra_faces': extras,
+    }
+
+
+def _build(backend: str, lbp_path: Optional[str], yunet_path: Optional[str]) -> FaceDetector:
+    if backend == 'lbp' and lbp_path:
+        return CascadeDetector('lbp', lbp_path)
+    if backend == 'yunet' and yunet_path:
+        return YuNetDetector(yunet_path)
+    return create_detector(backend)
+
+
+def run(base_dir: str = ROSTOS_DIR, frames_paths: Sequence[str] = (), backends: Sequence[str] = BACKENDS,
+        referencia: str = 'haar', repeat: int = 1, moldura: Optional[Tuple[int, int]] = (640, 480),
+        iou_min: float = 0.5, lbp_path: Optional[str] = None, yunet_path: Optional[str] = None,
+        label: Optional[str] = None) -> Dict:
+    imagens = [img for img in (cv2.imread(c, cv2.IMREAD_COLOR) for _, c in list_dataset(base_dir)) if img is not None]
+    frames_dataset = [frame_with_border(img, moldura) for img in imagens]
+    gravacoes = {os.path.basename(os.path.normpath(c)): list(iter_frames(c)) for c in frames_paths}
+
+    detectores: Dict[str, FaceDetector] = {}
+    resultado: Dict = {
+        'environment': environment(label),
+        'dataset': {'base_dir': base_dir, 'images': len(imagens), 'frame_size': list(moldura) if moldura else None},
+        'reference': referencia,
+        'backends': {},
+    }
+    for backend in dict.fromkeys(list(backends) + ([referencia] if gravacoes else [])):
+        try:
+            detectores[backend] = _build(backend, lbp_path, yunet_path)
+        except ValueError as e:
+            resultado['backends'][backend] = {'skipped': str(e)}
+
+    caixas_gravacoes: Dict[str, Dict[str, List[List]]] = {}
+    for backend, detector in detectores.items():
+        r: Dict = {'path': getattr(detector, 'path', None)}
+        if frames_dataset:
+            caixas, tempos = _detect_all(detector, frames_dataset, repeat)
+            r['dataset'] = {**tempos, **_dataset_recall(caixas)}
+        for nome, frames in gravacoes.items():
+            caixas, tempos = _detect_all(detector, frames, repeat)
+            caixas_gravacoes.setdefault(nome, {})[backend] = caixas
+            r[nome] = tempos
+        resultado['backends'][backend] = r
+
+    for nome, por_backend in caixas_gravacoes.items():
+        ref = por_backend.get(referencia)
+        if ref is None:
+            continue
+        for backend, caixas in por_backend.items():
+            resultado['backends'][backend][nome].update(_agreement(caixas, ref, iou_min))
+    return resultado
+
+
+def main(argv: Optional[Sequence[str]] = None):
+    parser = argparse.ArgumentParser(description='Benchmark dos detectores de face (velocidade e sensibilidade)')
+    parser.add_argument('--dataset', default=ROSTOS_DIR, help='Pasta de rostos (<cpf>/*.jpg)')
+    parser.add_argument('--frames', action='append', default=[],
+                        help='Sequência gravada (.frec, diretório de imagens ou vídeo); pode repetir')
+    parser.add_argument('--backends', default=','.join(BACKENDS), help='Backends comparados (lista separada por vírgula)')
+    parser.add_argument('--referencia', default='haar', help='Backend de referência nas gravações (sem rótulo)')
+    parser.add_argument('--lbp', default=None, help='Caminho da lbpcascade (padrão: FACE_DETECTOR_LBP_PATH)')
+    parser.add_argument('--yunet', default=None, help='Modelo ONNX do YuNet (padrão: FACE_DETECTOR_YUNET_MODEL)')
+    parser.add_argument('--iou', type=float, default=0.5, help='IoU mínimo para considerar a mesma face')
+    parser.add_argument('--repeticoes', type=int, default=1, help='Passadas sobre os frames')
+    parser.add_argument('--moldura', default='640x480',
+                        help='Tamanho do frame simulado em torno de cada rosto do dataset (ou "none")')
+    parser.add_argument('--rotulo', default=None, help='Rótulo livre da execução (ex.: commit)')
+    parser.add_argument('--saida', default=None, help='Arquivo JSON de saída (padrão: stdout)')
+    args = parser.parse_args(argv)
+
+    resultado = run(
+        base_dir=args.dataset,
+        frames_paths=args.frames,
+        backends=[b.strip().lower() for b in args.backends.split(',') if b.strip()],
+        referencia=args.referencia.lower(),
+        repeat=max(1, args.repeticoes),
+        moldura=parse_size(args.moldura),
+        iou_min=args.iou,
+        lbp_path=args.lbp,
+        yunet_path=args.yunet,
+        label=args.rotulo,
+    )
+    texto = json.dumps(resultado, indent=2, ensure_ascii=False)
+    if args.saida:
+        with open(args.saida, 'w', encoding='utf-8') as f:
+            f.write(texto + '\n')
+        print(f'✓ Resultado salvo em {args.saida}', file=sys.stderr)
+    else:
+        print(texto)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,365 @@
+"""Gerador de carga multi-quiosque para a API Flask.
+
+Simula N clientes (navegador ou página ESP32) em paralelo. Cada cliente repete
+o ciclo do `recognition.js`: envia um frame para `/api/process_frame`, consulta
+`/api/last_detection` periodicamente e, com `--confirmar`, confirma as
+detecções em `/api/confirmar_ponto`. A concorrência cresce em degraus (ex.: 1,2,4,8,16) e,
+para cada degrau, são reportados vazão, latência p50/p95/p99 e taxa de erro
+por endpoint.
+
+Alvos:
+ - em processo (padrão): `app.test_client()`, sem servidor HTTP;
+ - `--url http://localhost:5000`: servidor real (inclui rede e threads do Flask).
+
+Frames: recortes do dataset com moldura (cada cliente usa uma identidade,
+como uma pessoa parada diante do quiosque) ou gravações `--frames`.
+
+Confirmação é opcional (`--confirmar`) porque grava pontos no banco e fotos
+`confirm_*.jpg` em `constants/rostos`, que o próximo treino aprende: use só
+contra um banco e um dataset de testes.
+
+Uso (a partir de `src/`):
+    python -m benchmarks.load_test --clientes 1,2,4,8 --duracao 20 --saida carga.json
+    python -m benchmarks.load_test --url http://localhost:5000 --frames constants/gravacoes/portaria.frec
+"""
+from __future__ import annotations
+import argparse
+import base64
+import http.client
+import json
+import sys
+import threading
+import time
+from collections import defaultdict
+from typing import Dict, List, Optional, Sequence, Tuple
+from urllib.parse import urlsplit
+
+import cv2
+import numpy as np
+
+from benchmarks.common import ROSTOS_DIR, list_dataset, frame_with_border, iter_frames, percentiles, environment, parse_size
+
+# Intervalos padrão de cada tipo de cliente (mesmos do frontend)
+PERFIS = {
+    'navegador': {'frame_s': 0.10, 'poll_s': 1.2},   # recognition.js: cycle 100 ms, poll 1.2 s
+    'esp32': {'frame_s': 0.20, 'poll_s': 1.2},       # página /espcam: snapshot a cada 200 ms
+}
+ENDPOINTS = ('process_frame', 'last_detection', 'confirmar_ponto')
+
+
+class _InProcessTransport:
+    """Requisições direto na app Flask (um test_client por thread)."""
+
+    def __init__(self, app):
+        self._client = app.test_client()
+
+    def request(self, method: str, path: str, body: Optional[Dict] = None) -> Tuple[int, Optional[Dict]]:
+        if method == 'POST':
+            r = self._client.post(path, json=body)
+        else:
+            r = self._client.get(path)
+        return r.status_code, r.get_json(silent=True)
+
+    def close(self):
+        pass
+
+
+class _HttpTransport:
+    """Requisições HTTP com conexão persistente por thread (reconecta se cair)."""
+
+    def __init__(self, base_url: str, timeout: float):
+        parts = urlsplit(base_url)
+        self._https = parts.scheme == 'https'
+        self._host = parts.hostname or 'localhost'
+        self._port = parts.port
+        self._prefix = parts.path.rstrip('/')
+        self._timeout = timeout
+        self._conn: Optional[http.client.HTTPConnection] = None
+
+    def _connect(self) -> http.client.HTTPConnection:
+        if self._conn is None:
+            cls = http.client.HTTPSConnection if self._https else http.client.HTTPConnection
+            self._conn = cls(self._host, self._port, timeout=self._timeout)
+        return self._conn
+
+    def request(self, method: str, path: str, body: Optional[Dict] = None) -> Tuple[int, Optional[Dict]]:
+        payload = json.dumps(body).encode('utf-8') if body is not None else None
+        headers = {'Content-Type': 'application/json'} if payload is not None else {}
+        for tentativa in range(2):
+            conn = self._connect()
+            try:
+                conn.request(method, self._prefix + path, body=payload, headers=headers)
+                resp = conn.getresponse()
+                raw = resp.read()
+                if resp.getheader('Connection', '').lower() == 'close':
+                    self.close()
+                try:
+                    return resp.status, json.loads(raw) if raw else None
+                except ValueError:
+                    return resp.status, None
+            except (http.client.HTTPException, ConnectionError, OSError):
+                self.close()
+                if tentativa == 1:
+                    raise
+        raise RuntimeError('inalcançável')
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+
+class _Stats:
+    """Amostras de latência e erros por endpoint, compartilhadas entre as threads de um degrau."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencias: Dict[str, List[float]] = defaultdict(list)
+        self.erros: Dict[str, int] = defaultdict(int)
+        self.mensagens: Dict[str, int] = defaultdict(int)
+        self.deteccoes = 0
+        self.confirmacoes = 0
+        self.descartados = 0
+        self.dicas_ms: List[int] = []
+
+    def add(self, endpoint: str, segundos: float, ok: bool, erro: Optional[str] = None):
+        with self._lock:
+            self.latencias[endpoint].append(segundos)
+            if not ok:
+                self.erros[endpoint] += 1
+                if erro:
+                    self.mensagens[f'{endpoint}: {erro[:120]}'] += 1
+
+    def count(self, campo: str):
+        with self._lock:
+            setattr(self, campo, getattr(self, campo) + 1)
+
+
+def _encode_frames(frames: Sequence[np.ndarray], qualidade: int) -> List[str]:
+    """Codifica frames como data URL JPEG (o mesmo formato que o canvas do navegador envia)."""
+    saida = []
+    for frame in frames:
+        ok, buf = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, qualidade])
+        if ok:
+            saida.append('data:image/jpeg;base64,' + base64.b64encode(buf).decode('ascii'))
+    return saida
+
+
+def load_frame_sets(frames_paths: Sequence[str], base_dir: str, moldura: Optional[Tuple[int, int]],
+                    qualidade: int = 80) -> List[List[str]]:
+    """Conjuntos de frames codificados: um por identidade do dataset, ou um por gravação."""
+    conjuntos: List[List[str]] = []
+    if frames_paths:
+        for caminho in frames_paths:
+            conjuntos.append(_encode_frames(list(iter_frames(caminho)), qualidade))
+    else:
+        por_cpf: Dict[str, List[np.ndarray]] = defaultdict(list)
+        for cpf, caminho in list_dataset(base_dir):
+            img = cv2.imread(caminho, cv2.IMREAD_COLOR)
+            if img is not None:
+                por_cpf[cpf].append(frame_with_border(img, moldura))
+        for cpf in sorted(por_cpf):
+            conjuntos.append(_encode_frames(por_cpf[cpf], qualidade))
+    conjuntos = [c for c in conjuntos if c]
+    if not conjuntos:
+        raise SystemExit('Nenhum frame disponível para o teste de carga')
+    return conjuntos
+
+
+def _timed(stats: _Stats, endpoint: str, transport, method: str, path: str,
+           body: Optional[Dict] = None) -> Optional[Dict]:
+    t0 = time.perf_counter()
+    try:
+        status, data = transport.request(method, path, body)
+    except Exception as e:
+        stats.add(endpoint, time.perf_counter() - t0, False, type(e).__name__)
+        return None
+    dt = time.perf_counter() - t0
+    ok = 200 <= status < 300 and not (isinstance(data, dict) and data.get('success') is False)
+    erro = None
+    if not ok:
+        erro = f'HTTP {status}' + (f" {data.get('message')}" if isinstance(data, dict) and data.get('message') else '')
+    stats.add(endpoint, dt, ok, erro)
+    return data if ok else None
+
+
+def _client_loop(idx: int, transport, frames: Sequence[str], perfil: Dict, deadline: float,
+                 stats: _Stats, confirmar: bool, seguir_dica: bool):
+    sessao = f'carga-{idx}'
+    i = idx  # desloca o início para os clientes não ficarem sincronizados
+    proximo_poll = time.perf_counter() + perfil['poll_s']
+    try:
+        while True:
+            inicio = time.perf_counter()
+            if inicio >= deadline:
+                return
+            r = _timed(stats, 'process_frame', transport, 'POST', '/api/process_frame',
+                       {'frame': frames[i % len(frames)], 'session_id': sessao})
+            i += 1
+            intervalo = perfil['frame_s']
+            if r is not None:
+                if r.get('skipped'):
+                    stats.count('descartados')
+                dica = r.get('next_interval_ms')
+                if isinstance(dica, (int, float)):
+                    with stats._lock:
+                        stats.dicas_ms.append(dica)
+                    if seguir_dica:
+                        intervalo = dica / 1000.0
+            agora = time.perf_counter()
+            if agora >= proximo_poll:
+                proximo_poll = agora + perfil['poll_s']
+                det = _timed(stats, 'last_detection', transport, 'GET', '/api/last_detection')
+                if det and det.get('found'):
+                    stats.count('deteccoes')
+                    if confirmar:
+                        r = _timed(stats, 'confirmar_ponto', transport, 'POST', '/api/confirmar_ponto', {
+                            'cpf': det.get('cpf'),
+                            'detection_id': det.get('detection_id'),
+                            'confidence': det.get('confidence'),
+                        })
+                        if r is not None:
+                            stats.count('confirmacoes')
+            espera = intervalo - (time.perf_counter() - inicio)
+            if espera > 0:
+                time.sleep(min(espera, max(0.0, deadline - time.perf_counter())))
+    finally:
+        transport.close()
+
+
+def run_step(make_transport, conjuntos: Sequence[Sequence[str]], clientes: int, perfil: Dict,
+             duracao: float, confirmar: bool, seguir_dica: bool = True) -> Dict:
+    stats = _Stats()
+    deadline = time.perf_counter() + duracao
+    threads = []
+    inicio = time.perf_counter()
+    for idx in range(clientes):
+        t = threading.Thread(
+            target=_client_loop,
+            args=(idx, make_transport(), conjuntos[idx % len(conjuntos)], perfil, deadline, stats, confirmar,
+                  seguir_dica),
+            daemon=True, name=f'carga-{idx}',
+        )
+        t.start()
+        threads.append(t)
+    for t in threads:
+        t.join()
+    wall = time.perf_counter() - inicio
+
+    endpoints = {}
+    for nome in ENDPOINTS:
+        lat = stats.latencias.get(nome, [])
+        n = len(lat)
+        erros = stats.erros.get(nome, 0)
+        endpoints[nome] = {
+            'requests': n,
+            'errors': erros,
+            'error_rate': round(erros / n, 6) if n else None,
+            'throughput_rps': round(n / wall, 2) if wall > 0 else None,
+            'latency_ms': percentiles(lat, 1000.0),
+        }
+    frames_ok = endpoints['process_frame']['requests'] - endpoints['process_frame']['errors'] - stats.descartados
+    alvo = clientes / perfil['frame_s']
+    return {
+        'clients': clientes,
+        'wall_seconds': round(wall, 3),
+        'frames_per_second': round(frames_ok / wall, 2) if wall > 0 else None,
+        'offered_frames_per_second': round(alvo, 2),
+        'frame_rate_ratio': round((frames_ok / wall) / alvo, 4) if wall > 0 and alvo else None,
+        'frames_skipped': stats.descartados,
+        'interval_hint_ms': percentiles(stats.dicas_ms),
+        'detections': stats.deteccoes,
+        'confirmations': stats.confirmacoes,
+        'endpoints': endpoints,
+        'error_messages': dict(sorted(stats.mensagens.items(), key=lambda kv: -kv[1])[:10]),
+    }
+
+
+def run(niveis: Sequence[int], duracao: float, perfil_nome: str = 'navegador', url: Optional[str] = None,
+        frames_paths: Sequence[str] = (), base_dir: str = ROSTOS_DIR,
+        moldura: Optional[Tuple[int, int]] = (640, 480), confirmar: bool = False,
+        frame_s: Optional[float] = None, poll_s: Optional[float] = None, timeout: float = 30.0,
+        seguir_dica: bool = True, label: Optional[str] = None) -> Dict:
+    perfil = dict(PERFIS[perfil_nome])
+    if frame_s is not None:
+        perfil['frame_s'] = max(0.0, frame_s)
+    if poll_s is not None:
+        perfil['poll_s'] = max(0.05, poll_s)
+    conjuntos = load_frame_sets(frames_paths, base_dir, moldura)
+
+    if url:
+        def make_transport():
+            return _HttpTransport(url, timeout)
+        alvo = url
+    else:
+        from app import app  # importa só no modo em processo (inicializa banco e modelo)
+
+        def make_transport():
+            return _InProcessTransport(app)
+        alvo = 'in-process'
+
+    degraus = []
+    for n in niveis:
+        print(f'→ {n} cliente(s) por {duracao}s...', file=sys.stderr)
+        degraus.append(run_step(make_transport, conjuntos, n, perfil, duracao, confirmar, seguir_dica))
+        pf = degraus[-1]['endpoints']['process_frame']
+        print(f"  {degraus[-1]['frames_per_second']} frames/s, p95 {pf['latency_ms'].get('p95')} ms, "
+              f"erros {pf['errors']}", file=sys.stderr)
+    return {
+        'environment': environment(label),
+        'target': alvo,
+        'profile': {'name': perfil_nome, **perfil},
+        'confirm': confirmar,
+        'follow_interval_hint': seguir_dica,
+        'frame_sets': [len(c) for c in conjuntos],
+        'steps': degraus,
+    }
+
+
+def main(argv: Optional[Sequence[str]] = None):
+    parser = argparse.ArgumentParser(description='Teste de carga multi-quiosque da API')
+    parser.add_argument('--url', default=None, help='Servidor alvo (ex.: http://localhost:5000); padrão: em processo')
+    parser.add_argument('--clientes', default='1,2,4,8', help='Degraus de concorrência (lista separada por vírgula)')
+    parser.add_argument('--duracao', type=float, default=15.0, help='Segundos por degrau')
+    parser.add_argument('--perfil', choices=sorted(PERFIS), default='navegador', help='Ritmo do cliente simulado')
+    parser.add_argument('--intervalo-frame', type=float, default=None, help='Sobrescreve o intervalo entre frames (s)')
+    parser.add_argument('--intervalo-poll', type=float, default=None, help='Sobrescreve o intervalo de /api/last_detection (s)')
+    parser.add_argument('--frames', action='append', default=[],
+                        help='Gravação (.frec, diretório de imagens ou vídeo); pode repetir, um conjunto por arquivo')
+    parser.add_argument('--dataset', default=ROSTOS_DIR, help='Pasta de rostos usada quando não há --frames')
+    parser.add_argument('--moldura', default='640x480', help='Tamanho do frame em torno de cada rosto do dataset')
+    parser.add_argument('--confirmar', action='store_true',
+                        help='Confirma as detecções em /api/confirmar_ponto (grava pontos e fotos; só em ambiente de testes)')
+    parser.add_argument('--ignorar-dica', action='store_true',
+                        help='Mantém o ritmo fixo do perfil em vez de seguir next_interval_ms do servidor')
+    parser.add_argument('--timeout', type=float, default=30.0, help='Timeout HTTP por requisição (s)')
+    parser.add_argument('--rotulo', default=None, help='Rótulo livre da execução (ex.: commit)')
+    parser.add_argument('--saida', default=None, help='Arquivo JSON de saída (padrão: stdout)')
+    args = parser.parse_args(argv)
+
+    resultado = run(
+        niveis=[int(x) for x in args.clientes.split(',') if x.strip()],
+        duracao=args.duracao,
+        perfil_nome=args.perfil,
+        url=args.url,
+        frames_paths=args.frames,
+        base_dir=args.dataset,
+        moldura=parse_size(args.moldura),
+        confirmar=args.confirmar,
+        frame_s=args.intervalo_frame,
+        poll_s=args.intervalo_poll,
+        timeout=args.timeout,
+        seguir_dica=not args.ignorar_dica,
+        label=args.rotulo,
+    )
+    texto = json.dumps(resultado, indent=2, ensure_ascii=False)
+    if args.saida:
+        with open(args.saida, 'w', encoding='utf-8') as f:
+            f.write(texto + '\n')
+        print(f'✓ Resultado salvo em {args.saida}', file=sys.stderr)
+    else:
+        print(texto)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,236 @@
+"""Benchmark offline de reconhecimento sobre o dataset `constants/rostos`.
+
+Reproduz as imagens cadastradas (e, opcionalmente, sequências de frames
+gravadas) em `FaceRecognitionService.detect_and_recognize` e `debug_predict`,
+medindo latência por etapa (p50/p95/p99, via spans do tracer), FPS por núcleo,
+pico de RSS e tempo de treino conforme a galeria cresce (identidades sintéticas).
+O resultado é JSON, para comparar versões e detectar regressões.
+
+Uso (a partir de `src/`):
+    python -m benchmarks.recognition --saida bench.json
+    python -m benchmarks.recognition --frames constants/gravacoes/portaria.frec --identidades 10,50,100
+"""
+from __future__ import annotations
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import cv2
+import numpy as np
+
+from benchmarks.common import (
+    ROSTOS_DIR, list_dataset, frame_with_border, iter_frames, percentiles, peak_rss_mb, environment, parse_size
+)
+from services.face_recognition_service import FaceRecognitionService
+from services.tracing import get_tracer
+
+
+def _run_frames(service: FaceRecognitionService, frames: Sequence[np.ndarray], repeat: int) -> Dict:
+    """Executa detect_and_recognize em cada frame e agrega latência total e por etapa."""
+    tracer = get_tracer()
+    tracer.set_enabled(True)
+    tracer.clear()
+    por_etapa: Dict[str, List[float]] = defaultdict(list)
+    totais: List[float] = []
+    wall_inicio = time.perf_counter()
+    cpu_inicio = time.process_time()
+    for _ in range(repeat):
+        for frame in frames:
+            img = frame.copy()  # detect_and_recognize desenha no frame
+            t0 = time.perf_counter()
+            service.detect_and_recognize(img)
+            totais.append(time.perf_counter() - t0)
+            for ev in tracer.events():
+                por_etapa[ev['name']].append(ev['dur'])  # µs
+            tracer.clear()
+    wall = time.perf_counter() - wall_inicio
+    cpu = time.process_time() - cpu_inicio
+    tracer.set_enabled(False)
+    n = len(totais)
+    return {
+        'frames': n,
+        'wall_seconds': round(wall, 4),
+        'cpu_seconds': round(cpu, 4),
+        'fps': round(n / wall, 2) if wall > 0 else None,
+        'fps_per_core': round(n / cpu, 2) if cpu > 0 else None,
+        'latency_ms': percentiles(totais, 1000.0),
+        'stages_ms': {nome: percentiles(durs, 0.001) for nome, durs in sorted(por_etapa.items())},
+    }
+
+
+def _run_debug_predict(service: FaceRecognitionService, frames: Sequence[np.ndarray]) -> Dict:
+    lat: List[float] = []
+    encontrados = 0
+    reconhecidos = 0
+    for frame in frames:
+        t0 = time.perf_counter()
+        r = service.debug_predict(frame)
+        lat.append(time.perf_counter() - t0)
+        if r.get('found'):
+            encontrados += 1
+        if r.get('recognized'):
+            reconhecidos += 1
+    return {
+        'frames': len(frames),
+        'faces_found': encontrados,
+        'recognized': reconhecidos,
+        'latency_ms': percentiles(lat, 1000.0),
+    }
+
+
+def _augment(img: np.ndarray, k: int) -> np.ndarray:
+    """Variação determinística de uma imagem para compor identidades sintéticas."""
+    out = img
+    if k % 2:
+        out = cv2.flip(out, 1)
+    angulo = (k * 7) % 11 - 5
+    if angulo:
+        h, w = out.shape[:2]
+        m = cv2.getRotationMatrix2D((w / 2, h / 2), angulo, 1.0)
+        out = cv2.warpAffine(out, m, (w, h), borderMode=cv2.BORDER_REFLECT)
+    brilho = (k * 37) % 61 - 30
+    if brilho:
+        out = cv2.convertScaleAbs(out, alpha=1.0, beta=brilho)
+    return out
+
+
+def _build_synthetic_gallery(dest: str, fonte: Dict[str, List[str]], n_ids: int, max_imgs: Optional[int]) -> int:
+    """Cria `n_ids` pastas de identidade em `dest` a partir das identidades reais."""
+    cpfs = sorted(fonte)
+    total = 0
+    for k in range(n_ids):
+        origem = fonte[cpfs[k % len(cpfs)]]
+        if max_imgs:
+            origem = origem[:max_imgs]
+        pasta = os.path.join(dest, f'{k:011d}')
+        os.makedirs(pasta, exist_ok=True)
+        for i, caminho in enumerate(origem):
+            img = cv2.imread(caminho, cv2.IMREAD_COLOR)
+            if img is None:
+                continue
+            cv2.imwrite(os.path.join(pasta, f'{i}.jpg'), _augment(img, k) if k >= len(cpfs) else img)
+            total += 1
+    return total
+
+
+def _run_train_scaling(fonte: Dict[str, List[str]], tamanhos: Sequence[int], max_imgs: Optional[int],
+                       probes: Sequence[np.ndarray]) -> List[Dict]:
+    resultados = []
+    for n_ids in tamanhos:
+        tmp = tempfile.mkdtemp(prefix='bench_galeria_')
+        try:
+            n_imgs = _build_synthetic_gallery(tmp, fonte, n_ids, max_imgs)
+            service = FaceRecognitionService(tmp)
+            t0 = time.perf_counter()
+            treinadas = service.train()
+            train_s = time.perf_counter() - t0
+            recognizer = service._recognizer
+            lat = []
+            if recognizer is not None:
+                for roi in probes:
+                    t1 = time.perf_counter()
+                    recognizer.predict(roi)
+                    lat.append(time.perf_counter() - t1)
+            resultados.append({
+                'identities': n_ids,
+                'images': n_imgs,
+                'trained_images': treinadas,
+                'train_seconds': round(train_s, 4),
+                'predict_ms': percentiles(lat, 1000.0),
+            })
+        finally:
+            shutil.rmtree(tmp, ignore_errors=True)
+    return resultados
+
+
+def _probe_rois(imagens: Sequence[np.ndarray], n: int = 50) -> List[np.ndarray]:
+    rois = []
+    for img in imagens[:n]:
+        gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+        rois.append(cv2.equalizeHist(cv2.resize(gray, (200, 200))))
+    return rois
+
+
+def run(base_dir: str = ROSTOS_DIR, frames_paths: Sequence[str] = (), repeat: int = 1,
+        moldura: Optional[Tuple[int, int]] = (640, 480), tamanhos: Sequence[int] = (10, 25, 50),
+        max_imgs: Optional[int] = None, label: Optional[str] = None) -> Dict:
+    dataset = list_dataset(base_dir)
+    if not dataset:
+        raise SystemExit(f'Nenhuma imagem encontrada em {base_dir}')
+    fonte: Dict[str, List[str]] = defaultdict(list)
+    for cpf, caminho in dataset:
+        fonte[cpf].append(caminho)
+    imagens = [img for img in (cv2.imread(c, cv2.IMREAD_COLOR) for _, c in dataset) if img is not None]
+    frames_dataset = [frame_with_border(img, moldura) for img in imagens]
+
+    service = FaceRecognitionService(base_dir)
+    t0 = time.perf_counter()
+    treinadas = service.train()
+    train_s = time.perf_counter() - t0
+
+    resultado = {
+        'environment': environment(label),
+        'dataset': {
+            'base_dir': base_dir,
+            'identities': len(fonte),
+            'images': len(imagens),
+            'frame_size': list(moldura) if moldura else None,
+            'train_seconds': round(train_s, 4),
+            'trained_images': treinadas,
+        },
+        'detect_and_recognize': {'dataset': _run_frames(service, frames_dataset, repeat)},
+        'debug_predict': {'dataset': _run_debug_predict(service, frames_dataset)},
+    }
+    for caminho in frames_paths:
+        nome = os.path.basename(os.path.normpath(caminho))
+        frames = list(iter_frames(caminho))
+        resultado['detect_and_recognize'][nome] = _run_frames(service, frames, repeat)
+        resultado['debug_predict'][nome] = _run_debug_predict(service, frames)
+
+    resultado['train_scaling'] = _run_train_scaling(fonte, tamanhos, max_imgs, _probe_rois(imagens))
+    resultado['peak_rss_mb'] = peak_rss_mb()
+    return resultado
+
+
+def main(argv: Optional[Sequence[str]] = None):
+    parser = argparse.ArgumentParser(description='Benchmark offline de reconhecimento facial')
+    parser.add_argument('--dataset', default=ROSTOS_DIR, help='Pasta de rostos (<cpf>/*.jpg)')
+    parser.add_argument('--frames', action='append', default=[],
+                        help='Sequência gravada (.frec, diretório de imagens ou vídeo); pode repetir')
+    parser.add_argument('--repeticoes', type=int, default=1, help='Passadas sobre os frames')
+    parser.add_argument('--moldura', default='640x480',
+                        help='Tamanho do frame simulado em torno de cada rosto do dataset (ou "none")')
+    parser.add_argument('--identidades', default='10,25,50',
+                        help='Tamanhos de galeria sintética para medir treino (lista separada por vírgula)')
+    parser.add_argument('--max-imagens', type=int, default=None, help='Imagens por identidade sintética')
+    parser.add_argument('--rotulo', default=None, help='Rótulo livre da execução (ex.: commit)')
+    parser.add_argument('--saida', default=None, help='Arquivo JSON de saída (padrão: stdout)')
+    args = parser.parse_args(argv)
+
+    tamanhos = [int(x) for x in args.identidades.split(',') if x.strip()]
+    resultado = run(
+        base_dir=args.dataset,
+        frames_paths=args.frames,
+        repeat=max(1, args.repeticoes),
+        moldura=parse_size(args.moldura),
+        tamanhos=tamanhos,
+        max_imgs=args.max_imagens,
+        label=args.rotulo,
+    )
+    texto = json.dumps(resultado, indent=2, ensure_ascii=False)
+    if args.saida:
+        with open(args.saida, 'w', encoding='utf-8') as f:
+            f.write(texto + '\n')
+        print(f'✓ Resultado salvo em {args.saida}', file=sys.stderr)
+    else:
+        print(texto)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,55 @@
+"""
+Script de calibração do limiar de reconhecimento
+Avalia o dataset de rostos (leave-one-out ou k-fold) e sugere um limiar pelas curvas FAR/FRR
+"""
+import argparse
+import json
+import os
+from constants.config import CALIBRATION_CACHE_PATH
+from services.calibration import ThresholdCalibrator, MODOS
+from services.face_recognition_service import DEFAULT_CONFIDENCE_THRESHOLD
+
+ROSTOS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'constants', 'rostos')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Calibra o limiar LBPH a partir do dataset cadastrado')
+    parser.add_argument('--dataset', default=ROSTOS_DIR, help='Pasta de rostos (<cpf>/*.jpg)')
+    parser.add_argument('--modo', choices=MODOS, default='loo', help='loo (leave-one-out) ou kfold')
+    parser.add_argument('--k', type=int, default=5, help='Número de folds no modo kfold')
+    parser.add_argument('--far', type=float, default=0.01, help='FAR máxima aceita (padrão: 0.01)')
+    parser.add_argument('--passos', type=int, default=200, help='Pontos da curva FAR/FRR')
+    parser.add_argument('--limite', type=float, default=DEFAULT_CONFIDENCE_THRESHOLD,
+                        help=f'Limiar atual para comparação (padrão: {DEFAULT_CONFIDENCE_THRESHOLD})')
+    parser.add_argument('--sem-cache', action='store_true', help='Não lê nem grava o cache de distâncias')
+    parser.add_argument('--saida', default=None, help='Arquivo JSON com o resultado completo (curvas)')
+    args = parser.parse_args()
+
+    calibrador = ThresholdCalibrator(args.dataset, cache_path=None if args.sem_cache else CALIBRATION_CACHE_PATH)
+    r = calibrador.evaluate(modo=args.modo, k=args.k, far_alvo=args.far, passos=args.passos,
+                            limite_atual=args.limite)
+
+    print("=" * 60)
+    print("CALIBRAÇÃO DO LIMIAR LBPH")
+    print("=" * 60)
+    print(f"\nModo: {r['modo']}" + (f" (k={r['k']})" if r['k'] else ''))
+    print(f"Identidades: {r['identidades']} | Imagens: {r['imagens']}")
+    print(f"Sondas genuínas: {r['sondas_genuinas']} | impostoras: {r['sondas_impostoras']}")
+    print(f"\n✓ Limiar sugerido (FAR <= {r['far_alvo']}): {r['limite_sugerido']}")
+    s = r['no_limite_sugerido']
+    print(f"  FAR={s['far']:.4f}  FRR={s['frr']:.4f}  confusões={s['misid']:.4f}")
+    a = r['limite_atual']
+    print(f"  Limiar atual {a['limite']}: FAR={a['far']:.4f}  FRR={a['frr']:.4f}  confusões={a['misid']:.4f}")
+    print(f"  EER ≈ {r['eer']['taxa']:.4f} em {r['eer']['limite']}")
+    c = r['cache']
+    print(f"\nHistogramas reusados: {c['histogramas_reusados']} | calculados: {c['histogramas_calculados']}")
+    print(f"Tempo: {r['segundos']}s")
+    if args.saida:
+        with open(args.saida, 'w', encoding='utf-8') as f:
+            json.dump(r, f, indent=2, ensure_ascii=False)
+        print(f"Resultado completo salvo em {args.saida}")
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    main()
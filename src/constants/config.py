@@ -22,3 +22,104 @@ FRAME_UPLOAD_MAX_SIZE_MB = int(os.getenv('FRAME_UPLOAD_MAX_SIZE_MB', '5'))
 
 # Configurações de camera
 CAMERA_MODE = os.getenv('CAMERA_MODE', 'client')  # 'client', 'server', 'esp32', 'auto'
+# 'esp32': reconhecimento no servidor direto do stream da ESP32-CAM (a página /espcam só recebe eventos)
+
+# Arquivamento de pontos antigos (pontos_usuarios -> pontos_usuarios_arquivo)
+PONTOS_ARCHIVE_AFTER_DAYS = int(os.getenv('PONTOS_ARCHIVE_AFTER_DAYS', '90'))
+PONTOS_ARCHIVE_CHUNK_SIZE = int(os.getenv('PONTOS_ARCHIVE_CHUNK_SIZE', '1000'))
+
+# Importação em lote de usuários e fotos (importar_usuarios.py)
+IMPORT_WORKERS = int(os.getenv('IMPORT_WORKERS', '0'))  # processos de recorte; 0 = um por CPU
+IMPORT_BATCH_SIZE = int(os.getenv('IMPORT_BATCH_SIZE', '200'))  # pessoas gravadas por transação
+
+# Auditoria em lote das fotos de ponto (auditar_pontos.py, /api/admin/auditoria)
+AUDIT_WORKERS = int(os.getenv('AUDIT_WORKERS', '0'))  # processos (CLI) ou threads (servidor); 0 = um por CPU
+AUDIT_CHUNK_SIZE = int(os.getenv('AUDIT_CHUNK_SIZE', '64'))  # registros comparados por matriz de distâncias
+
+# Endpoints administrativos (/api/admin/*). Sem token, só aceitos a partir de localhost
+ADMIN_TOKEN = os.getenv('ADMIN_TOKEN', '')
+
+# Tracing por frame (buffer circular exportável como Chrome trace JSON)
+TRACE_ENABLED = os.getenv('TRACE_ENABLED', 'false').lower() == 'true'
+TRACE_BUFFER_SIZE = int(os.getenv('TRACE_BUFFER_SIZE', '20000'))  # eventos
+
+# Gravação de frames (.frec) para reprodução e benchmarks
+FRAME_RECORD_DIR = os.getenv('FRAME_RECORD_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'gravacoes'))
+FRAME_RECORD_MAX_MB = float(os.getenv('FRAME_RECORD_MAX_MB', '500'))  # limite por gravação
+
+# Calibração do limiar LBPH (cache de histogramas e distâncias entre execuções)
+CALIBRATION_CACHE_PATH = os.getenv('CALIBRATION_CACHE_PATH', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'calibracao_cache.npz'))
+
+# Pool de processos para detecção + predição (0 = processa na thread da requisição)
+RECOGNITION_WORKERS = int(os.getenv('RECOGNITION_WORKERS', '0'))
+RECOGNITION_SLOT_MAX_MB = float(os.getenv('RECOGNITION_SLOT_MAX_MB', '8'))  # maior frame aceito pelos slots
+RECOGNITION_POOL_TIMEOUT = float(os.getenv('RECOGNITION_POOL_TIMEOUT', '5'))  # segundos
+
+# Backpressure em /api/process_frame*: intervalo recomendado aos clientes entre frames
+BACKPRESSURE_MIN_INTERVAL_MS = int(os.getenv('BACKPRESSURE_MIN_INTERVAL_MS', '100'))
+BACKPRESSURE_MAX_INTERVAL_MS = int(os.getenv('BACKPRESSURE_MAX_INTERVAL_MS', '2000'))
+BACKPRESSURE_CAPACITY = int(os.getenv('BACKPRESSURE_CAPACITY', '0'))  # frames simultâneos; 0 = RECOGNITION_WORKERS ou 1
+
+# Porta de movimento antes da detecção: pula o Haar cascade enquanto a cena está parada e ninguém é rastreado
+MOTION_GATE_ENABLED = os.getenv('MOTION_GATE_ENABLED', 'true').lower() == 'true'
+MOTION_GATE_THRESHOLD = float(os.getenv('MOTION_GATE_THRESHOLD', '3.0'))  # diferença média (níveis de cinza 0-255)
+MOTION_GATE_SIZE = int(os.getenv('MOTION_GATE_SIZE', '32'))  # largura da miniatura comparada (px)
+MOTION_GATE_ALPHA = float(os.getenv('MOTION_GATE_ALPHA', '0.05'))  # taxa de atualização do fundo
+MOTION_GATE_MAX_SKIP_SECONDS = float(os.getenv('MOTION_GATE_MAX_SKIP_SECONDS', '2'))  # detecção forçada mesmo sem movimento
+
+# Retransmissão MJPEG da ESP32-CAM: uma conexão com a câmera, qualquer número de espectadores
+MJPEG_MAX_VIEWERS = int(os.getenv('MJPEG_MAX_VIEWERS', '20'))  # streams simultâneos em /api/espcam/stream
+MJPEG_SNAPSHOT_MAX_AGE = float(os.getenv('MJPEG_SNAPSHOT_MAX_AGE', '1.0'))  # segundos; snapshot mais velho espera o próximo frame
+MJPEG_WAIT_TIMEOUT = float(os.getenv('MJPEG_WAIT_TIMEOUT', '3'))  # segundos esperando frame da câmera
+
+# Server-Sent Events (/api/events): detecções, estado de UI e pontos registrados por canal
+EVENTS_BUFFER_SIZE = int(os.getenv('EVENTS_BUFFER_SIZE', '100'))  # eventos guardados por canal para replay (Last-Event-ID)
+EVENTS_HEARTBEAT_SECONDS = float(os.getenv('EVENTS_HEARTBEAT_SECONDS', '15'))
+EVENTS_MAX_SUBSCRIBERS = int(os.getenv('EVENTS_MAX_SUBSCRIBERS', '100'))  # conexões SSE simultâneas
+EVENTS_CHANNEL_TTL_SECONDS = float(os.getenv('EVENTS_CHANNEL_TTL_SECONDS', '600'))  # canal sem assinantes é descartado
+
+# Estado em memória do reconhecimento (limitado, com expiração)
+PENDING_DETECTION_TTL_SECONDS = float(os.getenv('PENDING_DETECTION_TTL_SECONDS', '120'))  # detecção não confirmada é descartada
+PENDING_DETECTION_MAX = int(os.getenv('PENDING_DETECTION_MAX', '64'))  # cada uma guarda um recorte 200x200x3 (~120 KB)
+COOLDOWN_MAX_ENTRIES = int(os.getenv('COOLDOWN_MAX_ENTRIES', '1000'))
+
+# Detector de faces: 'haar' (padrão), 'lbp' (mais rápido) ou 'yunet' (cv2.FaceDetectorYN, requer modelo ONNX)
+FACE_DETECTOR_BACKEND = os.getenv('FACE_DETECTOR_BACKEND', 'haar').lower()
+FACE_DETECTOR_LBP_PATH = os.getenv('FACE_DETECTOR_LBP_PATH', '')  # lbpcascade_frontalface_improved.xml (fora do wheel pip)
+FACE_DETECTOR_YUNET_MODEL = os.getenv('FACE_DETECTOR_YUNET_MODEL', '')  # face_detection_yunet_2023mar.onnx
+FACE_DETECTOR_YUNET_SCORE = float(os.getenv('FACE_DETECTOR_YUNET_SCORE', '0.8'))  # confiança mínima
+
+# Evidência sequencial: confirma a identidade antes de stable_seconds quando os frames são claros
+EVIDENCE_ENABLED = os.getenv('EVIDENCE_ENABLED', 'true').lower() == 'true'
+EVIDENCE_TARGET_ERROR = float(os.getenv('EVIDENCE_TARGET_ERROR', '0.01'))  # taxa de erro nominal (frames independentes)
+EVIDENCE_BINS = int(os.getenv('EVIDENCE_BINS', '12'))  # faixas das tabelas genuíno/impostor ajustadas no dataset
+EVIDENCE_MAX_PER_FRAME = float(os.getenv('EVIDENCE_MAX_PER_FRAME', '2.0'))  # teto por frame (nenhum frame decide sozinho)
+EVIDENCE_MIN_FRAMES = int(os.getenv('EVIDENCE_MIN_FRAMES', '3'))
+
+# Verificação 1:1 (/api/verificar): histogramas por pessoa em cache (limitado, com expiração)
+VERIFY_CACHE_MAX_PERSONS = int(os.getenv('VERIFY_CACHE_MAX_PERSONS', '256'))
+VERIFY_CACHE_TTL_SECONDS = float(os.getenv('VERIFY_CACHE_TTL_SECONDS', '3600'))
+
+# Galerias (shards) por site/grupo: um modelo por galeria, câmeras vinculadas no banco
+GALLERY_MODEL_DIR = os.getenv('GALLERY_MODEL_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'modelos'))
+GALLERY_REFRESH_SECONDS = float(os.getenv('GALLERY_REFRESH_SECONDS', '60'))  # releitura de vínculos/membros do banco
+ESP32_CAMERA_ID = os.getenv('ESP32_CAMERA_ID', 'esp32')  # câmera do reconhecimento no servidor (CAMERA_MODE=esp32)
+
+# Qualidade do rosto (nitidez, tamanho, brilho, contraste, simetria): rostos ruins não passam pelo predict nem entram no cadastro
+QUALITY_GATE_ENABLED = os.getenv('QUALITY_GATE_ENABLED', 'true').lower() == 'true'
+QUALITY_MIN_SHARPNESS = float(os.getenv('QUALITY_MIN_SHARPNESS', '0.05'))  # var(Laplaciano) / var(intensidade)
+QUALITY_MIN_FACE_PX = int(os.getenv('QUALITY_MIN_FACE_PX', '70'))  # lado mínimo do rosto no reconhecimento
+QUALITY_ENROLL_MIN_FACE_PX = int(os.getenv('QUALITY_ENROLL_MIN_FACE_PX', '100'))  # lado mínimo no cadastro
+QUALITY_MIN_BRIGHTNESS = float(os.getenv('QUALITY_MIN_BRIGHTNESS', '40'))  # média de cinza (0-255)
+QUALITY_MAX_BRIGHTNESS = float(os.getenv('QUALITY_MAX_BRIGHTNESS', '220'))
+QUALITY_MIN_CONTRAST = float(os.getenv('QUALITY_MIN_CONTRAST', '20'))  # desvio padrão de cinza
+QUALITY_MIN_SYMMETRY = float(os.getenv('QUALITY_MIN_SYMMETRY', '0.3'))  # 1 = metades espelhadas idênticas
+
+# Cadastro em rajada (/api/capturar_rajada): fotos amostradas no servidor a partir do stream
+BURST_DEFAULT_PHOTOS = int(os.getenv('BURST_DEFAULT_PHOTOS', '15'))
+BURST_MAX_PHOTOS = int(os.getenv('BURST_MAX_PHOTOS', '40'))
+BURST_DEFAULT_SECONDS = float(os.getenv('BURST_DEFAULT_SECONDS', '15'))
+BURST_MAX_SECONDS = float(os.getenv('BURST_MAX_SECONDS', '60'))
+BURST_SAMPLE_INTERVAL = float(os.getenv('BURST_SAMPLE_INTERVAL', '0.2'))  # segundos mínimos entre frames avaliados
+BURST_MIN_DIFFERENCE = float(os.getenv('BURST_MIN_DIFFERENCE', '45'))  # distância LBPH mínima às fotos já aceitas (ruído de câmera ~33)
+BURST_JOBS_KEPT = int(os.getenv('BURST_JOBS_KEPT', '50'))  # rajadas concluídas consultáveis pelo status
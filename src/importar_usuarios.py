@@ -0,0 +1,90 @@
+"""
+Script de importação em lote de usuários
+Cadastra pessoas de um CSV (nome, cpf, matricula) com fotos de uma pasta ou .zip e treina o modelo uma vez no fim
+"""
+import argparse
+import json
+import os
+import time
+import urllib.request
+from constants.config import IMPORT_WORKERS, IMPORT_BATCH_SIZE
+from services.bulk_import import BulkImporter
+
+ROSTOS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'constants', 'rostos')
+
+
+def treinar_local(base_dir):
+    """Treina o modelo geral e as galerias neste processo (modelos das galerias ficam salvos em arquivo)."""
+    from services.face_recognition_service import FaceRecognitionService
+    from services.gallery_shards import GalleryShardManager
+    servico = FaceRecognitionService(base_dir)
+    imagens = servico.train()
+    galerias = GalleryShardManager(servico).reload()
+    return imagens, galerias
+
+
+def treinar_servidor(url):
+    """Pede ao servidor em execução que re-treine (POST /api/recriar_modelo)."""
+    req = urllib.request.Request(url.rstrip('/') + '/api/recriar_modelo', data=b'{}', method='POST',
+                                 headers={'Content-Type': 'application/json'})
+    with urllib.request.urlopen(req, timeout=600) as resp:
+        return json.loads(resp.read().decode('utf-8'))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Importa usuários e fotos em lote (CSV + pasta ou .zip de fotos)')
+    parser.add_argument('csv', help='CSV com as colunas nome, cpf, matricula (opcionais: email, galeria)')
+    parser.add_argument('fotos', help='Pasta ou .zip com <cpf|matricula>/*.jpg ou <cpf|matricula>_<n>.jpg')
+    parser.add_argument('--dataset', default=ROSTOS_DIR, help='Pasta de rostos (<cpf>/*.jpg)')
+    parser.add_argument('--workers', type=int, default=IMPORT_WORKERS,
+                        help='Processos de recorte (padrão: IMPORT_WORKERS; 0 = um por CPU)')
+    parser.add_argument('--lote', type=int, default=IMPORT_BATCH_SIZE,
+                        help=f'Pessoas gravadas por transação (padrão: {IMPORT_BATCH_SIZE})')
+    parser.add_argument('--simular', action='store_true', help='Só recorta e conta; não grava fotos nem usuários')
+    parser.add_argument('--servidor', default=None,
+                        help='URL do servidor em execução (ex.: http://localhost:5000); o treino final é feito por ele')
+    parser.add_argument('--sem-treino', action='store_true', help='Não treina o modelo no fim')
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("IMPORTAÇÃO DE USUÁRIOS EM LOTE")
+    print("=" * 60)
+
+    importador = BulkImporter(args.dataset, workers=args.workers, batch_size=args.lote)
+    print(f"\nImportando {args.csv} com fotos de {args.fotos} ({importador.workers} worker(s))...")
+    r = importador.run(args.csv, args.fotos, dry_run=args.simular)
+
+    print(f"\n✓ {r['pessoas']} pessoa(s) válida(s), {r['com_fotos']} com fotos")
+    if not args.simular:
+        print(f"  Novos: {r['novos']} | já cadastrados: {r['existentes']} | transações: {r['lotes']}")
+    print(f"  Fotos lidas: {r['fotos_lidas']} | aproveitadas: {r['fotos_aproveitadas']} | salvas: {r['fotos_salvas']}")
+    descartes = {k: v for k, v in sorted(r['resultados'].items()) if k != 'ok'}
+    if descartes:
+        print(f"  Descartadas: " + ', '.join(f'{k}={v}' for k, v in descartes.items()))
+    s = r['segundos']
+    print(f"\nTempo: {s['total']}s (leitura {s['leitura']}s, recorte {s['recorte']}s, banco {s['banco']}s)")
+    print(f"Vazão: {r['fotos_por_segundo']} foto(s)/s | {r['pessoas_por_segundo']} pessoa(s)/s")
+    if r['erros']:
+        print(f"\n⚠️  {len(r['erros'])} aviso(s):")
+        for erro in r['erros'][:50]:
+            print(f"  - {erro}")
+        if len(r['erros']) > 50:
+            print(f"  ... e mais {len(r['erros']) - 50}")
+
+    if not args.simular and not args.sem_treino and r['fotos_salvas']:
+        inicio = time.perf_counter()
+        if args.servidor:
+            print(f"\nRe-treinando no servidor {args.servidor}...")
+            resposta = treinar_servidor(args.servidor)
+            print(f"{'✓' if resposta.get('success') else '✗'} {resposta.get('message')}")
+        else:
+            print("\nTreinando o modelo...")
+            imagens, galerias = treinar_local(args.dataset)
+            print(f"✓ Modelo geral: {imagens} foto(s)" + (f" | galerias: {', '.join(galerias)}" if galerias else ''))
+            print("  Servidores em execução: POST /api/recriar_modelo (ou use --servidor)")
+        print(f"  Tempo: {round(time.perf_counter() - inicio, 3)}s")
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    main()
@@ -2,13 +2,21 @@
 Models do sistema de reconhecimento facial para controle de ponto.
 """
 from datetime import datetime
-from sqlalchemy import Column, Integer, String, DateTime, Boolean, Text, ForeignKey, Float, Enum
+from sqlalchemy import Column, Integer, String, DateTime, Boolean, Text, ForeignKey, Float, Enum, Table
 from sqlalchemy.orm import relationship, declarative_base
 import enum
 
 
 Base = declarative_base()
 
+# Associação usuário <-> galeria (um usuário pode pertencer a várias galerias)
+galerias_usuarios = Table(
+    'galerias_usuarios',
+    Base.metadata,
+    Column('galeria_id', Integer, ForeignKey('galerias.id', ondelete='CASCADE'), primary_key=True),
+    Column('usuario_id', Integer, ForeignKey('usuarios.id', ondelete='CASCADE'), primary_key=True, index=True),
+)
+
 class Usuario(Base):
     """
     Modelo de usuário do sistema.
@@ -38,6 +46,51 @@ class Usuario(Base):
     
     # Relacionamento com pontos
     pontos = relationship("PontoUsuario", back_populates="usuario", cascade="all, delete-orphan")
+    # Galerias (sites/grupos) em que o usuário é reconhecido
+    galerias = relationship("Galeria", secondary=galerias_usuarios, back_populates="usuarios")
+
+
+class Galeria(Base):
+    """
+    Galeria (shard) de reconhecimento: o conjunto de usuários admitidos em um site ou grupo.
+
+    Cada galeria tem seu próprio modelo LBPH, treinado só com as fotos dos seus
+    membros (ver `services/gallery_shards.py`). Usuários fora de qualquer
+    galeria continuam na galeria geral, usada por câmeras sem vínculo.
+
+    Attributes:
+        id: Identificador único da galeria
+        nome: Nome curto (letras minúsculas, dígitos, '-' e '_'); também nomeia o arquivo do modelo
+        descricao: Descrição livre (ex.: endereço do site)
+        criado_em: Data e hora de criação do registro
+    """
+    __tablename__ = 'galerias'
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    nome = Column(String(64), unique=True, nullable=False, index=True)
+    descricao = Column(String(255), nullable=True)
+    criado_em = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+    usuarios = relationship("Usuario", secondary=galerias_usuarios, back_populates="galerias")
+    cameras = relationship("CameraGaleria", back_populates="galeria", cascade="all, delete-orphan")
+
+
+class CameraGaleria(Base):
+    """
+    Vínculo de uma câmera (quiosque, ESP32-CAM) com a galeria que ela reconhece.
+
+    Attributes:
+        camera: Identificador da câmera (`?camera=` da página, ou ESP32_CAMERA_ID no modo esp32)
+        galeria_id: Galeria usada pelos frames dessa câmera
+        criado_em: Data e hora de criação do registro
+    """
+    __tablename__ = 'cameras_galerias'
+
+    camera = Column(String(100), primary_key=True)
+    galeria_id = Column(Integer, ForeignKey('galerias.id', ondelete='CASCADE'), nullable=False, index=True)
+    criado_em = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+    galeria = relationship("Galeria", back_populates="cameras")
 
 
 class PontoUsuario(Base):
@@ -69,3 +122,30 @@ class PontoUsuario(Base):
     # Relacionamento com usuário
     usuario = relationship("Usuario", back_populates="pontos")
     
+
+class PontoUsuarioArquivo(Base):
+    """
+    Arquivo de registros de ponto antigos.
+
+    Recebe as linhas de `pontos_usuarios` mais antigas que o limite configurado
+    (ver `services/archive_service.py`), mantendo a tabela principal pequena.
+    As colunas espelham `PontoUsuario`; o `id` original vai para `id_original`
+    (ids de `pontos_usuarios` podem ser reutilizados depois de removidos, então
+    não é único aqui).
+
+    Attributes:
+        id_original: `id` do registro em `pontos_usuarios`
+        arquivado_em: Data e hora em que o registro foi movido para o arquivo
+    """
+    __tablename__ = 'pontos_usuarios_arquivo'
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    id_original = Column(Integer, nullable=False, index=True)
+    usuario_id = Column(Integer, ForeignKey('usuarios.id', ondelete='CASCADE'), nullable=False, index=True)
+    data_hora = Column(DateTime, nullable=False, index=True)
+    confianca = Column(Float, nullable=True)
+    foto_registro_path = Column(String(500), nullable=True)
+    observacao = Column(String(500), nullable=True)
+    dispositivo = Column(String(255), nullable=True)
+    criado_em = Column(DateTime, nullable=False)
+    arquivado_em = Column(DateTime, default=datetime.utcnow, nullable=False)
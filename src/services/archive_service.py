@@ -0,0 +1,72 @@
+"""Arquivamento em lotes de registros de ponto antigos.
+
+Move linhas de `pontos_usuarios` mais antigas que `PONTOS_ARCHIVE_AFTER_DAYS`
+para `pontos_usuarios_arquivo`. Cada lote (INSERT ... SELECT + DELETE) roda na
+sua própria transação, mantendo os bloqueios curtos mesmo com o sistema em uso.
+"""
+from __future__ import annotations
+import time
+from datetime import datetime, timedelta
+from typing import Dict, Optional
+
+from sqlalchemy import select, insert, delete, literal
+
+from models.db import get_db
+from models.models import PontoUsuario, PontoUsuarioArquivo
+from constants.config import PONTOS_ARCHIVE_AFTER_DAYS, PONTOS_ARCHIVE_CHUNK_SIZE
+
+# Colunas copiadas da tabela principal (mesmos nomes nas duas tabelas); o `id` vai para `id_original`
+_COLUNAS = ['usuario_id', 'data_hora', 'confianca', 'foto_registro_path',
+            'observacao', 'dispositivo', 'criado_em']
+
+
+def arquivar_pontos(dias: int = PONTOS_ARCHIVE_AFTER_DAYS,
+                    chunk_size: int = PONTOS_ARCHIVE_CHUNK_SIZE,
+                    max_chunks: Optional[int] = None) -> Dict:
+    """Move pontos com `data_hora` anterior a (agora - `dias`) para o arquivo.
+    Processa em lotes de `chunk_size` linhas (ordem de id), um commit por lote.
+    `max_chunks` limita a quantidade de lotes por execução (None = até esvaziar).
+    Retorna { arquivados, lotes, limite, segundos }.
+    """
+    if dias < 0:
+        raise ValueError('dias deve ser >= 0')
+    chunk_size = max(1, int(chunk_size))
+    limite = datetime.utcnow() - timedelta(days=dias)
+    inicio = time.perf_counter()
+    total = 0
+    lotes = 0
+
+    origem = [PontoUsuario.id] + [getattr(PontoUsuario, c) for c in _COLUNAS]
+    destino = ([PontoUsuarioArquivo.id_original] + [getattr(PontoUsuarioArquivo, c) for c in _COLUNAS]
+               + [PontoUsuarioArquivo.arquivado_em])
+
+    while max_chunks is None or lotes < max_chunks:
+        with get_db() as db:
+            ids = db.execute(
+                select(PontoUsuario.id)
+                .where(PontoUsuario.data_hora < limite)
+                .order_by(PontoUsuario.id)
+                .limit(chunk_size)
+            ).scalars().all()
+            if not ids:
+                break
+            agora = datetime.utcnow()
+            db.execute(
+                insert(PontoUsuarioArquivo).from_select(
+                    destino,
+                    select(*origem, literal(agora)).where(PontoUsuario.id.in_(ids))
+                )
+            )
+            db.execute(delete(PontoUsuario).where(PontoUsuario.id.in_(ids)))
+            # commit ao sair do contexto
+        total += len(ids)
+        lotes += 1
+        if len(ids) < chunk_size:
+            break
+
+    return {
+        'arquivados': total,
+        'lotes': lotes,
+        'limite': limite.isoformat(),
+        'segundos': round(time.perf_counter() - inicio, 3)
+    }
@@ -0,0 +1,127 @@
+"""Controle de admissão de frames por sessão e intervalo recomendado aos clientes.
+
+ - Cada sessão (session_id enviado pelo cliente, ou o IP) tem no máximo um
+   frame em processamento; frames que chegam enquanto isso são descartados
+   sem decodificar (o cliente mantém o último frame processado na tela).
+ - O servidor estima o custo de serviço por frame (latência dividida pela
+   concorrência durante o processamento, em média móvel exponencial) e
+   devolve `next_interval_ms`: o intervalo para o próximo frame que mantém a
+   soma das sessões ativas dentro da capacidade, alargado quando há mais
+   frames em processamento do que a capacidade comporta.
+
+Os clientes seguem o intervalo (setTimeout encadeado), então sob carga a taxa
+de frames cai de forma gradual em vez de as requisições se acumularem.
+"""
+from __future__ import annotations
+import threading
+import time
+from typing import Dict, Optional
+
+from constants.config import (
+    BACKPRESSURE_MIN_INTERVAL_MS, BACKPRESSURE_MAX_INTERVAL_MS, BACKPRESSURE_CAPACITY, RECOGNITION_WORKERS
+)
+from services.metrics import FRAMES_DROPPED_TOTAL, FRAMES_IN_FLIGHT, FRAME_INTERVAL_HINT_SECONDS
+
+# Sessão sem frames há mais que isso não conta como ativa
+ACTIVE_WINDOW_SECONDS = 5.0
+# Folga sobre a capacidade estimada (evita operar no limite)
+HEADROOM = 1.2
+
+
+class FrameAdmission:
+    """Um frame em processamento por sessão + intervalo recomendado a partir da carga medida."""
+
+    def __init__(self, capacity: Optional[int] = None, min_interval_ms: int = BACKPRESSURE_MIN_INTERVAL_MS,
+                 max_interval_ms: int = BACKPRESSURE_MAX_INTERVAL_MS, alpha: float = 0.2):
+        if not capacity:
+            capacity = BACKPRESSURE_CAPACITY or max(1, RECOGNITION_WORKERS)
+        self.capacity = max(1, int(capacity))
+        self.min_interval_ms = max(0, int(min_interval_ms))
+        self.max_interval_ms = max(self.min_interval_ms, int(max_interval_ms))
+        self.alpha = alpha
+        self._lock = threading.Lock()
+        self._in_flight: Dict[str, tuple] = {}  # sessão -> (início, maior concorrência observada)
+        self._last_seen: Dict[str, float] = {}
+        self._ewma: Optional[float] = None
+        self._admitted = 0
+        self._dropped = 0
+
+    def try_acquire(self, session_key: str, endpoint: str = 'process_frame') -> bool:
+        """Reserva o processamento para a sessão. False se ela já tem um frame em andamento."""
+        agora = time.monotonic()
+        with self._lock:
+            self._last_seen[session_key] = agora
+            if session_key in self._in_flight:
+                self._dropped += 1
+                descartado = True
+            else:
+                concorrencia = len(self._in_flight) + 1
+                self._in_flight[session_key] = (agora, concorrencia)
+                # Frames já em andamento passam a dividir a CPU com este
+                for k, (t0, c) in self._in_flight.items():
+                    if c < concorrencia:
+                        self._in_flight[k] = (t0, concorrencia)
+                self._admitted += 1
+                descartado = False
+            FRAMES_IN_FLIGHT.set(len(self._in_flight))
+        if descartado:
+            FRAMES_DROPPED_TOTAL.labels(endpoint=endpoint).inc()
+        return not descartado
+
+    def release(self, session_key: str) -> None:
+        """Libera a sessão e atualiza a média do custo de serviço por frame."""
+        agora = time.monotonic()
+        with self._lock:
+            entrada = self._in_flight.pop(session_key, None)
+            if entrada is not None:
+                inicio, concorrencia = entrada
+                # Latência sob concorrência inclui espera pela CPU; normaliza pela capacidade ocupada
+                servico = (agora - inicio) * min(self.capacity, concorrencia) / concorrencia
+                self._ewma = servico if self._ewma is None else self.alpha * servico + (1 - self.alpha) * self._ewma
+            FRAMES_IN_FLIGHT.set(len(self._in_flight))
+
+    def next_interval_ms(self) -> int:
+        """Intervalo recomendado entre frames de uma sessão (ms)."""
+        agora = time.monotonic()
+        with self._lock:
+            # Limpeza amortizada de sessões que pararam de enviar
+            inativas = [k for k, t in self._last_seen.items()
+                        if agora - t > ACTIVE_WINDOW_SECONDS and k not in self._in_flight]
+            for k in inativas:
+                del self._last_seen[k]
+            ativas = max(1, len(self._last_seen))
+            em_andamento = len(self._in_flight)
+            ewma = self._ewma
+        if ewma is None:
+            intervalo = self.min_interval_ms
+        else:
+            # Cada sessão recebe uma fatia da capacidade; fila acima da capacidade alarga o intervalo
+            fatia = ewma * max(1.0, ativas / self.capacity)
+            pressao = 1.0 + max(0, em_andamento - self.capacity) / self.capacity
+            intervalo = fatia * pressao * HEADROOM * 1000.0
+        intervalo = int(max(self.min_interval_ms, min(self.max_interval_ms, intervalo)))
+        FRAME_INTERVAL_HINT_SECONDS.set(intervalo / 1000.0)
+        return intervalo
+
+    def status(self) -> Dict:
+        with self._lock:
+            return {
+                'capacity': self.capacity,
+                'in_flight': len(self._in_flight),
+                'active_sessions': len(self._last_seen),
+                'service_ms_ewma': round(self._ewma * 1000.0, 2) if self._ewma is not None else None,
+                'admitted': self._admitted,
+                'dropped': self._dropped,
+            }
+
+
+# Instância global
+_admission: Optional[FrameAdmission] = None
+
+
+def get_frame_admission() -> FrameAdmission:
+    """Retorna a instância singleton do controle de admissão de frames"""
+    global _admission
+    if _admission is None:
+        _admission = FrameAdmission()
+    return _admission
@@ -0,0 +1,361 @@
+"""Importação em lote de usuários e fotos (cadastro offline de um site novo).
+
+Entrada: um CSV com `nome`, `cpf`, `matricula` (opcionais: `email`, `galeria`)
+e uma pasta ou `.zip` com as fotos de cada pessoa, em uma subpasta com o CPF
+ou a matrícula (`<cpf>/*.jpg`) ou em arquivos `<cpf>.jpg` / `<cpf>_<n>.jpg`.
+
+ - O recorte do rosto (maior face, porta de qualidade do cadastro e o mesmo
+   recorte 200x200 de `/api/capturar_foto`) roda num pool de processos, uma
+   pessoa por tarefa. Cada worker abre o zip por conta própria: só nomes de
+   arquivo e JPEGs prontos trafegam entre processos.
+ - O processo principal insere os usuários em lotes de `IMPORT_BATCH_SIZE`,
+   uma transação por lote, e só grava os recortes em `rostos/<cpf>/` depois
+   que o lote é confirmado: uma pasta sem `Usuario` seria aprendida pelo
+   `train()` como identidade. Se o lote falhar (e-mail, CPF ou matrícula já
+   usados por outra importação em paralelo), as pessoas são regravadas uma a
+   uma e só as que falharem são relatadas.
+ - O modelo é treinado uma única vez, no fim (ver `importar_usuarios.py`).
+
+CPFs já cadastrados recebem as fotos novas (nome e matrícula ficam como
+estão); linhas inválidas ou com matrícula ou e-mail de outro CPF são
+ignoradas e relatadas.
+"""
+from __future__ import annotations
+import csv
+import logging
+import multiprocessing as mp
+import os
+import time
+import zipfile
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+import cv2
+import numpy as np
+from sqlalchemy.exc import IntegrityError
+
+from constants.config import IMPORT_WORKERS, IMPORT_BATCH_SIZE
+from models.db import get_db
+from models.models import Usuario, Galeria
+from services.face_detectors import get_face_detector, largest_face, crop_face
+from services.face_quality import get_face_quality
+from services.gallery_shards import NOME_VALIDO as NOME_GALERIA_VALIDO
+from services.tracing import db_commit
+
+logger = logging.getLogger(__name__)
+
+EXTENSOES = ('.jpg', '.jpeg', '.png', '.bmp')
+# Mesmo tamanho mínimo de rosto do cadastro manual
+_MIN_FACE = (80, 80)
+# Fotos maiores são reduzidas só para a detecção (o recorte sai da original)
+_MAX_LADO_DETECCAO = 1280
+
+# Estado de cada worker (criado em _init_worker)
+_detector = None
+_quality = None
+
+
+def ler_csv(caminho: str) -> Tuple[List[Dict], List[str]]:
+    """Lê o CSV (separador `,` ou `;`, cabeçalho obrigatório). Retorna (pessoas válidas, erros por linha)."""
+    with open(caminho, newline='', encoding='utf-8-sig') as f:
+        amostra = f.read(4096)
+        f.seek(0)
+        try:
+            dialeto = csv.Sniffer().sniff(amostra, delimiters=',;')
+        except csv.Error:
+            dialeto = csv.excel
+        leitor = csv.DictReader(f, dialect=dialeto)
+        campos = {(c or '').strip().lower() for c in leitor.fieldnames or []}
+        faltando = {'nome', 'cpf', 'matricula'} - campos
+        if faltando:
+            raise ValueError(f"CSV sem a(s) coluna(s): {', '.join(sorted(faltando))}")
+        pessoas: List[Dict] = []
+        erros: List[str] = []
+        vistos_cpf, vistos_mat, vistos_email = set(), set(), set()
+        for n, linha in enumerate(leitor, start=2):
+            linha = {(k or '').strip().lower(): (v or '').strip() for k, v in linha.items()}
+            nome = linha.get('nome', '')
+            cpf = ''.join(filter(str.isdigit, linha.get('cpf', '')))
+            matricula = linha.get('matricula', '')
+            email = linha.get('email') or None
+            if not nome or not matricula:
+                erros.append(f'linha {n}: nome e matrícula são obrigatórios')
+            elif len(cpf) != 11:
+                erros.append(f'linha {n}: CPF inválido')
+            elif cpf in vistos_cpf or matricula in vistos_mat:
+                erros.append(f'linha {n}: CPF ou matrícula repetido no CSV')
+            elif email and email.lower() in vistos_email:
+                erros.append(f'linha {n}: e-mail repetido no CSV')
+            elif linha.get('galeria') and not NOME_GALERIA_VALIDO.match(linha['galeria'].lower()):
+                erros.append(f'linha {n}: nome de galeria inválido')
+            else:
+                vistos_cpf.add(cpf)
+                vistos_mat.add(matricula)
+                if email:
+                    vistos_email.add(email.lower())
+                pessoas.append({'linha': n, 'nome': nome, 'cpf': cpf, 'matricula': matricula,
+                                'email': email,
+                                'galeria': (linha.get('galeria') or '').lower() or None})
+    return pessoas, erros
+
+
+def indexar_fotos(fonte: str, pessoas: List[Dict]) -> Dict[str, List[str]]:
+    """Fotos por CPF: caminhos (pasta) ou nomes de membro (zip), pela subpasta ou pelo prefixo do arquivo."""
+    chaves: Dict[str, str] = {}
+    for p in pessoas:
+        chaves[p['cpf']] = p['cpf']
+        chaves.setdefault(p['matricula'], p['cpf'])
+    eh_zip = zipfile.is_zipfile(fonte)
+    if eh_zip:
+        with zipfile.ZipFile(fonte) as z:
+            nomes = [i.filename for i in z.infolist() if not i.is_dir()]
+    else:
+        nomes = [os.path.relpath(os.path.join(raiz, a), fonte)
+                 for raiz, _, arquivos in os.walk(fonte) for a in arquivos]
+    fotos: Dict[str, List[str]] = {}
+    for nome in sorted(nomes):
+        if not nome.lower().endswith(EXTENSOES):
+            continue
+        partes = nome.replace('\\', '/').split('/')
+        prefixo = os.path.splitext(partes[-1])[0].split('_')[0]
+        candidatos = [partes[-2]] if len(partes) > 1 else []
+        candidatos.append(prefixo)
+        for chave in candidatos:
+            cpf = chaves.get(chave) or chaves.get(''.join(filter(str.isdigit, chave)))
+            if cpf:
+                fotos.setdefault(cpf, []).append(nome if eh_zip else os.path.join(fonte, nome))
+                break
+    return fotos
+
+
+# --- Recorte (workers) ---
+def _init_worker() -> None:
+    global _detector, _quality
+    # Um thread por processo: o paralelismo vem do pool
+    cv2.setNumThreads(1)
+    _detector = get_face_detector()
+    _quality = get_face_quality()
+
+
+def _recortar(imagem: np.ndarray) -> Tuple[Optional[np.ndarray], Optional[str]]:
+    """Recorte do maior rosto como no cadastro, ou (None, motivo: 'no_face' | motivo da qualidade)."""
+    h, w = imagem.shape[:2]
+    escala = min(1.0, _MAX_LADO_DETECCAO / float(max(h, w)))
+    reduzida = cv2.resize(imagem, None, fx=escala, fy=escala, interpolation=cv2.INTER_AREA) if escala < 1.0 else imagem
+    gray = cv2.cvtColor(reduzida, cv2.COLOR_BGR2GRAY)
+    bbox = largest_face(_detector.detect(reduzida, gray, min_size=_MIN_FACE))
+    if bbox is None:
+        return None, 'no_face'
+    x, y, bw, bh = (int(round(v / escala)) for v in bbox)
+    roi = cv2.cvtColor(imagem[y:y+bh, x:x+bw], cv2.COLOR_BGR2GRAY)
+    q = _quality.assess(roi, min(bw, bh), use='enroll')
+    if not q['ok']:
+        return None, q['reasons'][0]
+    recorte = crop_face(imagem, (x, y, bw, bh))
+    return recorte, (None if recorte is not None else 'no_face')
+
+
+def _recortar_pessoa(tarefa: Tuple[str, Optional[str], List[str]]) -> Tuple[str, List[bytes], Dict[str, int]]:
+    """Tarefa do pool: (cpf, zip ou None, fotos) -> (cpf, JPEGs dos recortes, contagem por resultado)."""
+    cpf, zip_path, fotos = tarefa
+    jpegs: List[bytes] = []
+    contagem: Dict[str, int] = {}
+    z = zipfile.ZipFile(zip_path) if zip_path else None
+    try:
+        for foto in fotos:
+            dados = z.read(foto) if z is not None else np.fromfile(foto, dtype=np.uint8)
+            imagem = cv2.imdecode(np.frombuffer(dados, dtype=np.uint8), cv2.IMREAD_COLOR)
+            if imagem is None:
+                resultado = 'invalid'
+            else:
+                recorte, resultado = _recortar(imagem)
+                if recorte is not None:
+                    ok, jpeg = cv2.imencode('.jpg', recorte)
+                    if ok:
+                        jpegs.append(jpeg.tobytes())
+                        resultado = 'ok'
+            contagem[resultado] = contagem.get(resultado, 0) + 1
+    finally:
+        if z is not None:
+            z.close()
+    return cpf, jpegs, contagem
+
+
+# --- Importação ---
+class BulkImporter:
+    """Importa um CSV + fotos: recorte em paralelo, gravação incremental e inserts em lote."""
+
+    def __init__(self, base_dir: str, workers: int = IMPORT_WORKERS, batch_size: int = IMPORT_BATCH_SIZE):
+        self.base_dir = base_dir
+        self.workers = int(workers) if workers and workers > 0 else (os.cpu_count() or 1)
+        self.batch_size = max(1, int(batch_size))
+
+    def run(self, csv_path: str, fotos_path: str, dry_run: bool = False) -> Dict:
+        """Executa a importação. Retorna contagens e tempos por etapa (sem treino)."""
+        inicio = time.perf_counter()
+        pessoas, erros = ler_csv(csv_path)
+        pessoas, conflitos = self._check_conflicts(pessoas)
+        erros += conflitos
+        fotos = indexar_fotos(fotos_path, pessoas)
+        zip_path = fotos_path if zipfile.is_zipfile(fotos_path) else None
+        t_index = time.perf_counter()
+
+        por_cpf = {p['cpf']: p for p in pessoas}
+        resultados: Dict[str, int] = {}
+        salvas = 0
+        lote: List[Dict] = []
+        gravadas = {'novos': 0, 'existentes': 0, 'lotes': 0}
+        tarefas = [(cpf, zip_path, fotos[cpf]) for cpf in por_cpf if cpf in fotos]
+        t_db = 0.0
+
+        def flush():
+            nonlocal t_db, salvas
+            if lote and not dry_run:
+                t = time.perf_counter()
+                r = self._save_batch(lote)
+                t_db += time.perf_counter() - t
+                gravadas['novos'] += r['novos']
+                gravadas['existentes'] += r['existentes']
+                gravadas['lotes'] += r['lotes']
+                erros.extend(r['erros'])
+                # Fotos só de quem foi gravado no banco
+                for p in r['gravadas']:
+                    if p.get('jpegs'):
+                        self._write_photos(p['cpf'], p['jpegs'])
+                        salvas += len(p['jpegs'])
+            lote.clear()
+
+        # Pessoas sem fotos também são cadastradas (fotos podem vir depois pelo navegador)
+        for cpf, p in por_cpf.items():
+            if cpf not in fotos:
+                lote.append(p)
+                if len(lote) >= self.batch_size:
+                    flush()
+
+        metodos = mp.get_all_start_methods()
+        ctx = mp.get_context('fork' if 'fork' in metodos else 'spawn')
+        with ctx.Pool(self.workers, initializer=_init_worker) as pool:
+            for cpf, jpegs, contagem in pool.imap_unordered(_recortar_pessoa, tarefas, chunksize=1):
+                for k, v in contagem.items():
+                    resultados[k] = resultados.get(k, 0) + v
+                p = dict(por_cpf[cpf])
+                if jpegs and not dry_run:
+                    p['jpegs'] = jpegs
+                    p['foto_path'] = os.path.join(self.base_dir, cpf)
+                elif not jpegs:
+                    erros.append(f"linha {p['linha']}: nenhuma foto aproveitada ({cpf})")
+                lote.append(p)
+                if len(lote) >= self.batch_size:
+                    flush()
+        flush()
+        fim = time.perf_counter()
+
+        lidas = sum(resultados.values())
+        return {
+            'pessoas': len(por_cpf),
+            'com_fotos': len(tarefas),
+            'novos': gravadas['novos'],
+            'existentes': gravadas['existentes'],
+            'lotes': gravadas['lotes'],
+            'fotos_lidas': lidas,
+            'fotos_aproveitadas': resultados.get('ok', 0),
+            'fotos_salvas': salvas,
+            'resultados': resultados,
+            'erros': erros,
+            'workers': self.workers,
+            'segundos': {
+                'leitura': round(t_index - inicio, 3),
+                'recorte': round(fim - t_index - t_db, 3),
+                'banco': round(t_db, 3),
+                'total': round(fim - inicio, 3),
+            },
+            'fotos_por_segundo': round(lidas / max(fim - t_index, 1e-9), 1),
+            'pessoas_por_segundo': round(len(por_cpf) / max(fim - inicio, 1e-9), 1),
+        }
+
+    def _check_conflicts(self, pessoas: List[Dict]) -> Tuple[List[Dict], List[str]]:
+        """Descarta pessoas cuja matrícula ou e-mail já pertence a outro CPF (consulta em lotes)."""
+        erros: List[str] = []
+        donos: Dict[str, str] = {}
+        donos_email: Dict[str, str] = {}
+        with get_db() as db:
+            for i in range(0, len(pessoas), self.batch_size):
+                bloco = pessoas[i:i + self.batch_size]
+                matriculas = [p['matricula'] for p in bloco]
+                for cpf, matricula in db.query(Usuario.cpf, Usuario.matricula).filter(Usuario.matricula.in_(matriculas)):
+                    donos[matricula] = cpf
+                emails = [p['email'] for p in bloco if p['email']]
+                if emails:
+                    for cpf, email in db.query(Usuario.cpf, Usuario.email).filter(Usuario.email.in_(emails)):
+                        donos_email[email.lower()] = cpf
+        validas = []
+        for p in pessoas:
+            dono = donos.get(p['matricula'])
+            dono_email = donos_email.get(p['email'].lower()) if p['email'] else None
+            if dono is not None and dono != p['cpf']:
+                erros.append(f"linha {p['linha']}: matrícula {p['matricula']} já pertence a outro CPF")
+            elif dono_email is not None and dono_email != p['cpf']:
+                erros.append(f"linha {p['linha']}: e-mail {p['email']} já pertence a outro CPF")
+            else:
+                validas.append(p)
+        return validas, erros
+
+    def _write_photos(self, cpf: str, jpegs: List[bytes]) -> None:
+        pasta = os.path.join(self.base_dir, cpf)
+        os.makedirs(pasta, exist_ok=True)
+        existentes = len([f for f in os.listdir(pasta) if f.lower().endswith('.jpg')])
+        for i, jpeg in enumerate(jpegs, start=1):
+            timestamp = datetime.utcnow().strftime('%Y%m%d_%H%M%S_%f')
+            with open(os.path.join(pasta, f'{cpf}_{existentes + i}_{timestamp}.jpg'), 'wb') as f:
+                f.write(jpeg)
+
+    def _save_batch(self, lote: List[Dict]) -> Dict:
+        """Grava o lote numa transação; se ela violar uma restrição, regrava pessoa a pessoa.
+        Retorna contagens, as pessoas gravadas e os erros das que não puderam ser gravadas.
+        """
+        try:
+            novos = self._insert(lote)
+            return {'novos': novos, 'existentes': len(lote) - novos, 'lotes': 1, 'gravadas': list(lote), 'erros': []}
+        except IntegrityError:
+            logger.warning("Lote de %d pessoa(s) violou restrição do banco; regravando uma a uma", len(lote))
+        r = {'novos': 0, 'existentes': 0, 'lotes': 0, 'gravadas': [], 'erros': []}
+        for p in lote:
+            try:
+                novo = self._insert([p])
+            except IntegrityError as e:
+                motivo = str(getattr(e, 'orig', e)).splitlines()[0]
+                r['erros'].append(f"linha {p['linha']}: não gravado ({p['cpf']}): {motivo}")
+                continue
+            r['novos'] += novo
+            r['existentes'] += 1 - novo
+            r['lotes'] += 1
+            r['gravadas'].append(p)
+        return r
+
+    def _insert(self, lote: List[Dict]) -> int:
+        """Uma transação: insere os CPFs novos, completa `foto_path` e adiciona às galerias. Retorna os novos."""
+        novos = 0
+        with get_db() as db:
+            cpfs = [p['cpf'] for p in lote]
+            usuarios = {u.cpf: u for u in db.query(Usuario).filter(Usuario.cpf.in_(cpfs))}
+            nomes_galerias = {p['galeria'] for p in lote if p['galeria']}
+            galerias = {g.nome: g for g in db.query(Galeria).filter(Galeria.nome.in_(nomes_galerias))} \
+                if nomes_galerias else {}
+            for p in lote:
+                usuario = usuarios.get(p['cpf'])
+                if usuario is None:
+                    usuario = Usuario(nome=p['nome'], cpf=p['cpf'], matricula=p['matricula'], email=p['email'])
+                    db.add(usuario)
+                    novos += 1
+                if p.get('foto_path') and not usuario.foto_path:
+                    usuario.foto_path = p['foto_path']
+                if p['galeria']:
+                    galeria = galerias.get(p['galeria'])
+                    if galeria is None:
+                        galeria = galerias[p['galeria']] = Galeria(nome=p['galeria'])
+                        db.add(galeria)
+                    if usuario not in galeria.usuarios:
+                        galeria.usuarios.append(usuario)
+            with db_commit('importar_usuarios'):
+                db.commit()
+        return novos
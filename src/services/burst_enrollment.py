@@ -0,0 +1,254 @@
+"""Cadastro em rajada: fotos amostradas no servidor a partir do stream.
+
+Antes, cada foto do cadastro era um POST em `/api/capturar_foto`, que
+detectava de novo sobre o último frame de registro. Aqui uma rajada
+(`BurstJob`) roda numa thread do servidor sobre a fonte de frames (a sessão
+da página de cadastro ou o stream da ESP32-CAM) até juntar `fotos` fotos ou
+passar `segundos`:
+
+ - no máximo um frame a cada `BURST_SAMPLE_INTERVAL`, sempre o mais recente;
+ - maior rosto do frame, porta de qualidade do cadastro (`face_quality`);
+ - recorte igual ao de `/api/capturar_foto`, codificado em JPEG uma vez só
+   (o modelo recebe exatamente a imagem que vai para o disco);
+ - só entram poses diferentes: a distância LBPH para todas as fotos já
+   aceitas na rajada precisa ser ao menos `BURST_MIN_DIFFERENCE`.
+
+No fim as fotos são gravadas de uma vez em `rostos/<cpf>/` e o modelo é
+atualizado com `recognizer.update` (geral e galerias do CPF), sem re-treinar.
+O andamento fica disponível por id em `status()` enquanto a rajada estiver
+entre as `BURST_JOBS_KEPT` mais recentes.
+"""
+from __future__ import annotations
+import logging
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+import cv2
+import numpy as np
+
+from constants.config import (
+    BURST_DEFAULT_PHOTOS, BURST_MAX_PHOTOS, BURST_DEFAULT_SECONDS, BURST_MAX_SECONDS,
+    BURST_SAMPLE_INTERVAL, BURST_MIN_DIFFERENCE, BURST_JOBS_KEPT
+)
+from models.db import get_db
+from models.models import Usuario
+from services.face_detectors import get_face_detector, largest_face, crop_face
+from services.face_quality import get_face_quality
+from services.face_recognition_service import get_face_service
+from services.gallery_shards import get_gallery_manager
+from services.lbph import preprocess_face, compute_histograms, chi2_alt_distances
+from services.metrics import BURST_FRAMES_TOTAL
+from services.tracing import db_commit
+
+logger = logging.getLogger(__name__)
+
+# Mesmo tamanho mínimo de rosto do cadastro manual
+_MIN_FACE = (80, 80)
+
+
+class BurstJob:
+    """Uma rajada: amostra frames de `frames` (LatestFrameStore) numa thread própria."""
+
+    def __init__(self, usuario_id: int, cpf: str, fonte: str, frames, base_dir: str,
+                 fotos: int, segundos: float, on_photos: Optional[Callable[[str, List[np.ndarray]], Dict]] = None):
+        self.id = uuid.uuid4().hex
+        self.usuario_id = usuario_id
+        self.cpf = cpf
+        self.fonte = fonte
+        self.frames = frames
+        self.base_dir = base_dir
+        self.fotos = fotos
+        self.segundos = segundos
+        self.on_photos = on_photos
+        self.state = 'running'  # running | saving | done | cancelled | failed
+        self.error: Optional[str] = None
+        self.started = time.time()
+        self.finished: Optional[float] = None
+        self.counts = {'frames': 0, 'no_face': 0, 'low_quality': 0, 'similar': 0, 'accepted': 0}
+        self.saved: List[str] = []
+        self.model: Dict[str, int] = {}
+        self._jpegs: List[bytes] = []
+        self._imagens: List[np.ndarray] = []
+        self._hists = np.zeros((0, 0), dtype=np.float32)
+        self._cancel = threading.Event()
+        self.thread = threading.Thread(target=self._run, daemon=True, name=f'burst-{self.id[:8]}')
+
+    def start(self) -> 'BurstJob':
+        self.thread.start()
+        return self
+
+    def cancel(self) -> None:
+        """Interrompe a rajada; nada é gravado."""
+        self._cancel.set()
+
+    @property
+    def running(self) -> bool:
+        return self.state in ('running', 'saving')
+
+    # --- Amostragem ---
+    def _run(self) -> None:
+        try:
+            self._sample()
+            if self._cancel.is_set():
+                self.state = 'cancelled'
+                return
+            self.state = 'saving'
+            self._save()
+            self.state = 'done'
+        except Exception as e:
+            logger.error(f"Rajada {self.id} ({self.cpf}) falhou: {e}")
+            self.error = str(e)
+            self.state = 'failed'
+        finally:
+            self.finished = time.time()
+            # Recortes já gravados (ou descartados): libera a memória da rajada
+            self._jpegs, self._imagens = [], []
+
+    def _sample(self) -> None:
+        detector = get_face_detector()
+        quality = get_face_quality()
+        prazo = time.monotonic() + self.segundos
+        seq = 0
+        proximo = 0.0
+        while not self._cancel.is_set() and len(self._jpegs) < self.fotos:
+            agora = time.monotonic()
+            if agora >= prazo:
+                break
+            if agora < proximo:
+                self._cancel.wait(proximo - agora)
+                continue
+            stored = self.frames.wait_newer(seq, min(0.5, prazo - agora))
+            if stored is None:
+                continue
+            seq = stored.seq
+            proximo = time.monotonic() + BURST_SAMPLE_INTERVAL
+            self.counts['frames'] += 1
+            self._evaluate(stored.image, detector, quality)
+
+    def _evaluate(self, frame: np.ndarray, detector, quality) -> None:
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        bbox = largest_face(detector.detect(frame, gray, min_size=_MIN_FACE))
+        if bbox is None:
+            self._count('no_face')
+            return
+        x, y, w, h = bbox
+        if not quality.assess(gray[y:y+h, x:x+w], min(w, h), use='enroll')['ok']:
+            self._count('low_quality')
+            return
+        recorte = crop_face(frame, bbox)
+        if recorte is None:
+            self._count('no_face')
+            return
+        ok, jpeg = cv2.imencode('.jpg', recorte)
+        if not ok:
+            return
+        # O modelo recebe a imagem como será lida do disco (após a compressão JPEG)
+        imagem = preprocess_face(cv2.imdecode(jpeg, cv2.IMREAD_GRAYSCALE))
+        hist = compute_histograms([imagem])
+        if len(self._hists) and float(chi2_alt_distances(hist, self._hists).min()) < BURST_MIN_DIFFERENCE:
+            self._count('similar')
+            return
+        self._hists = np.vstack([self._hists, hist]) if len(self._hists) else hist
+        self._jpegs.append(jpeg.tobytes())
+        self._imagens.append(imagem)
+        self._count('accepted')
+
+    def _count(self, result: str) -> None:
+        self.counts[result] += 1
+        BURST_FRAMES_TOTAL.labels(result=result).inc()
+
+    # --- Gravação e modelo ---
+    def _save(self) -> None:
+        if not self._jpegs:
+            return
+        pasta = os.path.join(self.base_dir, self.cpf)
+        os.makedirs(pasta, exist_ok=True)
+        existentes = len([f for f in os.listdir(pasta) if f.lower().endswith('.jpg')])
+        for i, jpeg in enumerate(self._jpegs, start=1):
+            timestamp = datetime.utcnow().strftime('%Y%m%d_%H%M%S_%f')
+            caminho = os.path.join(pasta, f'{self.cpf}_{existentes + i}_{timestamp}.jpg')
+            with open(caminho, 'wb') as f:
+                f.write(jpeg)
+            self.saved.append(caminho)
+        with get_db() as db:
+            usuario = db.query(Usuario).filter(Usuario.id == self.usuario_id).first()
+            if usuario is not None and not usuario.foto_path:
+                usuario.foto_path = pasta
+                with db_commit('capturar_rajada'):
+                    db.commit()
+        logger.info(f"Rajada {self.id}: {len(self.saved)} foto(s) de {self.cpf} em {pasta}")
+        if self.on_photos is not None:
+            self.model = self.on_photos(self.cpf, self._imagens)
+
+    def status(self) -> Dict:
+        fim = self.finished or time.time()
+        return {
+            'id': self.id,
+            'usuario_id': self.usuario_id,
+            'cpf': self.cpf,
+            'fonte': self.fonte,
+            'state': self.state,
+            'error': self.error,
+            'target': self.fotos,
+            'seconds': self.segundos,
+            'elapsed': round(fim - self.started, 2),
+            'progress': round(min(1.0, self.counts['accepted'] / self.fotos), 3),
+            'counts': dict(self.counts),
+            'saved': len(self.saved),
+            'model_updated': self.model,
+        }
+
+
+class BurstEnrollmentManager:
+    """Rajadas por id; uma rajada em andamento por fonte de frames."""
+
+    def __init__(self, base_dir: str, on_photos: Optional[Callable[[str, List[np.ndarray]], Dict]] = None,
+                 max_kept: int = BURST_JOBS_KEPT):
+        self.base_dir = base_dir
+        self.on_photos = on_photos
+        self.max_kept = max(1, int(max_kept))
+        self._lock = threading.Lock()
+        self._jobs: 'OrderedDict[str, BurstJob]' = OrderedDict()
+
+    def start(self, usuario_id: int, cpf: str, fonte: str, frames,
+              fotos: Optional[int] = None, segundos: Optional[float] = None) -> BurstJob:
+        """Inicia uma rajada. RuntimeError se já houver uma em andamento na mesma fonte."""
+        fotos = min(BURST_MAX_PHOTOS, max(1, int(fotos or BURST_DEFAULT_PHOTOS)))
+        segundos = min(BURST_MAX_SECONDS, max(1.0, float(segundos or BURST_DEFAULT_SECONDS)))
+        with self._lock:
+            if any(j.running and j.fonte == fonte for j in self._jobs.values()):
+                raise RuntimeError(f"Já existe uma captura em andamento na fonte '{fonte}'")
+            job = BurstJob(usuario_id, cpf, fonte, frames, self.base_dir, fotos, segundos, self.on_photos)
+            self._jobs[job.id] = job
+            # Descarta as concluídas mais antigas (as em andamento ficam)
+            for antigo in [k for k, j in self._jobs.items() if not j.running][:max(0, len(self._jobs) - self.max_kept)]:
+                del self._jobs[antigo]
+        return job.start()
+
+    def get(self, job_id: str) -> Optional[BurstJob]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def status(self) -> Dict:
+        with self._lock:
+            jobs = list(self._jobs.values())
+        return {'running': [j.id for j in jobs if j.running], 'kept': len(jobs)}
+
+
+# Instância global
+_manager: Optional[BurstEnrollmentManager] = None
+_manager_lock = threading.Lock()
+
+
+def get_burst_enrollment() -> BurstEnrollmentManager:
+    """Retorna a instância singleton (fotos em constants/rostos; modelo atualizado via galerias)"""
+    global _manager
+    with _manager_lock:
+        if _manager is None:
+            _manager = BurstEnrollmentManager(get_face_service().base_dir, get_gallery_manager().add_images)
+        return _manager
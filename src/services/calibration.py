@@ -0,0 +1,328 @@
+"""Calibração do limiar LBPH e avaliação de acurácia sobre o dataset cadastrado.
+
+Em vez de re-treinar o LBPH a cada fold, extrai os histogramas de todas as
+imagens uma vez e calcula a matriz de distâncias (qui-quadrado alternativo, a
+mesma "confidence" de `predict()`) em uma passada vetorizada. Leave-one-out e
+k-fold viram apenas máscaras sobre essa matriz:
+
+ - genuíno: a sonda é comparada com a galeria do fold; o vizinho mais próximo
+   define a identidade e a distância (como `predict()` faria).
+ - impostor: a mesma sonda, com a própria identidade removida da galeria,
+   simula uma pessoa não cadastrada.
+
+Para cada limiar t: FAR(t) = impostores aceitos; FRR(t) = genuínos não
+reconhecidos corretamente (rejeitados ou confundidos com outra pessoa).
+
+Histogramas e distâncias ficam em cache (`CALIBRATION_CACHE_PATH`); em novas
+execuções só as imagens novas ou alteradas têm o histograma recalculado.
+"""
+from __future__ import annotations
+import json
+import logging
+import os
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from constants.config import CALIBRATION_CACHE_PATH
+from services.lbph import LBPH_PARAMS, FACE_IMAGE_SIZE, load_face_image, compute_histograms, pairwise_chi2_alt
+
+logger = logging.getLogger(__name__)
+
+MODOS = ('loo', 'kfold')
+CACHE_VERSION = 1
+
+
+def _params_key() -> str:
+    return json.dumps({'v': CACHE_VERSION, 'lbph': LBPH_PARAMS, 'size': FACE_IMAGE_SIZE}, sort_keys=True)
+
+
+def list_dataset_files(base_dir: str) -> List[Tuple[str, str]]:
+    """Lista (cpf, caminho relativo) das imagens .jpg em `base_dir/<cpf>/`, em ordem estável."""
+    itens = []
+    if not os.path.isdir(base_dir):
+        return itens
+    for cpf in sorted(os.listdir(base_dir)):
+        pasta = os.path.join(base_dir, cpf)
+        if not os.path.isdir(pasta):
+            continue
+        for arquivo in sorted(os.listdir(pasta)):
+            if arquivo.lower().endswith('.jpg'):
+                itens.append((cpf, os.path.join(cpf, arquivo)))
+    return itens
+
+
+def _stamp(caminho: str) -> str:
+    st = os.stat(caminho)
+    return f'{st.st_mtime_ns}:{st.st_size}'
+
+
+def stratified_folds(labels: np.ndarray, k: int) -> np.ndarray:
+    """Fold de cada imagem: posição dentro da própria identidade módulo k."""
+    folds = np.empty(len(labels), dtype=np.int32)
+    contagem: Dict[int, int] = {}
+    for i, lab in enumerate(labels.tolist()):
+        n = contagem.get(lab, 0)
+        folds[i] = n % k
+        contagem[lab] = n + 1
+    return folds
+
+
+def _rate(num: int, den: int) -> Optional[float]:
+    return round(num / den, 6) if den else None
+
+
+class ThresholdCalibrator:
+    """Mantém histogramas/distâncias do dataset (memória + disco) e avalia limiares."""
+
+    def __init__(self, base_dir: str, cache_path: Optional[str] = CALIBRATION_CACHE_PATH):
+        self.base_dir = base_dir
+        self.cache_path = cache_path
+        self._lock = threading.Lock()
+        self._cache: Optional[Dict] = None
+
+    # --- Cache ---
+    def _read_cache(self) -> Optional[Dict]:
+        if self._cache is not None:
+            return self._cache
+        if not self.cache_path or not os.path.exists(self.cache_path):
+            return None
+        try:
+            with np.load(self.cache_path, allow_pickle=False) as npz:
+                if str(npz['params']) != _params_key():
+                    return None
+                return {
+                    'paths': [str(p) for p in npz['paths']],
+                    'stamps': [str(s) for s in npz['stamps']],
+                    'hist': npz['hist'],
+                    'dist': npz['dist'],
+                }
+        except Exception as e:
+            logger.warning(f"Cache de calibração ignorado ({self.cache_path}): {e}")
+            return None
+
+    def _write_cache(self, cache: Dict):
+        self._cache = cache
+        if not self.cache_path:
+            return
+        try:
+            os.makedirs(os.path.dirname(self.cache_path) or '.', exist_ok=True)
+            tmp = self.cache_path + '.tmp'
+            with open(tmp, 'wb') as f:
+                np.savez(f, params=np.array(_params_key()), paths=np.array(cache['paths']),
+                         stamps=np.array(cache['stamps']), hist=cache['hist'], dist=cache['dist'])
+            os.replace(tmp, self.cache_path)
+        except Exception as e:
+            logger.warning(f"Falha ao salvar cache de calibração: {e}")
+
+    def load(self) -> Dict:
+        """Retorna {'cpfs', 'labels', 'paths', 'dist', 'stats'} atualizando o cache se preciso."""
+        with self._lock:
+            itens = list_dataset_files(self.base_dir)
+            paths = [rel for _, rel in itens]
+            stamps = [_stamp(os.path.join(self.base_dir, rel)) for rel in paths]
+            cache = self._read_cache()
+            stats = {'histogramas_reusados': 0, 'histogramas_calculados': 0, 'distancias_reusadas': False}
+
+            if cache is not None and cache['paths'] == paths and cache['stamps'] == stamps:
+                hist, dist = cache['hist'], cache['dist']
+                stats['histogramas_reusados'] = len(paths)
+                stats['distancias_reusadas'] = True
+            else:
+                anteriores = {}
+                if cache is not None:
+                    anteriores = {(p, s): i for i, (p, s) in enumerate(zip(cache['paths'], cache['stamps']))}
+                linhas: List[Optional[np.ndarray]] = [None] * len(paths)
+                novos_idx, novas_imgs = [], []
+                for i, (rel, st) in enumerate(zip(paths, stamps)):
+                    j = anteriores.get((rel, st))
+                    if j is not None:
+                        linhas[i] = cache['hist'][j]
+                        continue
+                    img = load_face_image(os.path.join(self.base_dir, rel))
+                    if img is not None:
+                        novos_idx.append(i)
+                        novas_imgs.append(img)
+                for i, h in zip(novos_idx, compute_histograms(novas_imgs)):
+                    linhas[i] = h
+                stats['histogramas_reusados'] = len(paths) - len(novos_idx)
+                stats['histogramas_calculados'] = len(novos_idx)
+                # Imagens ilegíveis ficam de fora (como no treino)
+                validos = [i for i, h in enumerate(linhas) if h is not None]
+                itens = [itens[i] for i in validos]
+                paths = [paths[i] for i in validos]
+                stamps = [stamps[i] for i in validos]
+                hist = np.vstack([linhas[i] for i in validos]) if validos else np.zeros((0, 0), dtype=np.float32)
+                dist = pairwise_chi2_alt(hist)
+                self._write_cache({'paths': paths, 'stamps': stamps, 'hist': hist, 'dist': dist})
+
+            cpfs = sorted({cpf for cpf, _ in itens})
+            indice = {cpf: i for i, cpf in enumerate(cpfs)}
+            labels = np.array([indice[cpf] for cpf, _ in itens], dtype=np.int32)
+            return {'cpfs': cpfs, 'labels': labels, 'paths': paths, 'dist': dist, 'stats': stats}
+
+    # --- Avaliação ---
+    def evaluate(self, modo: str = 'loo', k: int = 5, far_alvo: float = 0.01, passos: int = 200,
+                 limite_atual: Optional[float] = None) -> Dict:
+        """Avalia o dataset (leave-one-out ou k-fold) e sugere o maior limiar com FAR <= far_alvo.
+        Lança ValueError para parâmetros inválidos ou dataset insuficiente.
+        """
+        if modo not in MODOS:
+            raise ValueError(f'modo deve ser um de {", ".join(MODOS)}')
+        k = int(k)
+        if modo == 'kfold' and k < 2:
+            raise ValueError('k deve ser >= 2')
+        far_alvo = float(far_alvo)
+        if not 0.0 <= far_alvo < 1.0:
+            raise ValueError('far deve estar em [0, 1)')
+        passos = max(10, min(2000, int(passos)))
+
+        inicio = time.perf_counter()
+        dados = self.load()
+        labels, dist = dados['labels'], dados['dist']
+        n = len(labels)
+        if len(dados['cpfs']) < 2:
+            raise ValueError('são necessárias ao menos 2 identidades cadastradas')
+
+        if modo == 'loo':
+            galeria = ~np.eye(n, dtype=bool)
+        else:
+            folds = stratified_folds(labels, k)
+            galeria = folds[:, None] != folds[None, :]
+        mesma = labels[:, None] == labels[None, :]
+
+        # Genuínos: vizinho mais próximo na galeria (só sondas com a própria identidade na galeria)
+        d_gal = np.where(galeria, dist, np.inf)
+        vizinho = d_gal.argmin(axis=1)
+        gen_ok = (galeria & mesma).any(axis=1)
+        gen_score = d_gal[np.arange(n), vizinho][gen_ok]
+        gen_correto = mesma[np.arange(n), vizinho][gen_ok]
+        # Impostores: identidade da sonda removida da galeria
+        imp_score = np.where(galeria & ~mesma, dist, np.inf).min(axis=1)
+        imp_score = imp_score[np.isfinite(imp_score)]
+        if gen_score.size == 0 or imp_score.size == 0:
+            raise ValueError('dataset insuficiente para avaliação (poucas imagens por identidade)')
+
+        def taxas(t: np.ndarray) -> Dict[str, np.ndarray]:
+            t = np.atleast_1d(np.asarray(t, dtype=np.float64))[:, None]
+            aceito = gen_score[None, :] <= t
+            return {
+                'far': (imp_score[None, :] <= t).mean(axis=1),
+                'frr': 1.0 - (aceito & gen_correto[None, :]).mean(axis=1),
+                'misid': (aceito & ~gen_correto[None, :]).mean(axis=1),
+            }
+
+        topo = float(max(gen_score.max(), imp_score.max())) * 1.05
+        limites = np.linspace(0.0, topo, passos)
+        curva = taxas(limites)
+
+        # Maior limiar com FAR <= alvo: logo abaixo do (m+1)-ésimo menor impostor
+        imp_ord = np.sort(imp_score)
+        m = int(np.floor(far_alvo * imp_ord.size + 1e-9))
+        if m >= imp_ord.size:
+            sugerido = topo
+        else:
+            sugerido = float(np.nextafter(imp_ord[m], -np.inf))
+        no_sugerido = taxas(sugerido)
+
+        diff = np.abs(curva['far'] - curva['frr'])
+        i_eer = int(diff.argmin())
+
+        resultado = {
+            'modo': modo,
+            'k': k if modo == 'kfold' else None,
+            'identidades': len(dados['cpfs']),
+            'imagens': int(n),
+            'sondas_genuinas': int(gen_score.size),
+            'sondas_impostoras': int(imp_score.size),
+            'far_alvo': far_alvo,
+            'limite_sugerido': round(sugerido, 3),
+            'no_limite_sugerido': {key: round(float(v[0]), 6) for key, v in no_sugerido.items()},
+            'eer': {
+                'limite': round(float(limites[i_eer]), 3),
+                'taxa': round(float((curva['far'][i_eer] + curva['frr'][i_eer]) / 2.0), 6),
+            },
+            'distancias': {
+                'genuinas': {
+                    'min': round(float(gen_score.min()), 3),
+                    'mediana': round(float(np.median(gen_score)), 3),
+                    'max': round(float(gen_score.max()), 3),
+                },
+                'impostoras': {
+                    'min': round(float(imp_score.min()), 3),
+                    'mediana': round(float(np.median(imp_score)), 3),
+                    'max': round(float(imp_score.max()), 3),
+                },
+                'confusoes_rank1': _rate(int((~gen_correto).sum()), int(gen_score.size)),
+            },
+            'curva': {
+                'limites': [round(float(v), 3) for v in limites],
+                'far': [round(float(v), 6) for v in curva['far']],
+                'frr': [round(float(v), 6) for v in curva['frr']],
+                'misid': [round(float(v), 6) for v in curva['misid']],
+            },
+            'cache': dados['stats'],
+        }
+        if limite_atual is not None:
+            atual = taxas(limite_atual)
+            resultado['limite_atual'] = {'limite': float(limite_atual),
+                                         **{key: round(float(v[0]), 6) for key, v in atual.items()}}
+        resultado['segundos'] = round(time.perf_counter() - inicio, 4)
+        return resultado
+
+    def evidence_samples(self) -> Dict:
+        """Distância e margem (2ª identidade menos a 1ª) por sonda, leave-one-out, como `predict_top2` as veria.
+        Genuínas: a identidade mais próxima é a da sonda. Impostoras: a mais próxima é outra, ou a
+        sonda com a própria identidade removida (pessoa não cadastrada). Margem NaN sem 2ª identidade.
+        """
+        dados = self.load()
+        labels, dist = dados['labels'], dados['dist']
+        vazio = {'distancia': np.zeros(0), 'margem': np.zeros(0)}
+        if len(dados['cpfs']) < 2:
+            return {'genuinas': vazio, 'impostoras': vazio, 'identidades': len(dados['cpfs'])}
+        n = len(labels)
+        d = dist.astype(np.float64, copy=True)
+        np.fill_diagonal(d, np.inf)
+        # Menor distância por identidade (imagens de cada CPF são contíguas, em ordem de label)
+        inicios = np.flatnonzero(np.r_[True, labels[1:] != labels[:-1]])
+        por_id = np.minimum.reduceat(d, inicios, axis=1)
+        linhas = np.arange(n)
+
+        def top2(m: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+            ordem = np.argsort(m, axis=1)[:, :2]
+            primeira = m[linhas, ordem[:, 0]]
+            segunda = m[linhas, ordem[:, 1]] if m.shape[1] > 1 else np.full(n, np.inf)
+            margem = np.where(np.isfinite(segunda), segunda - primeira, np.nan)
+            return ordem[:, 0], primeira, margem
+
+        mais_proxima, primeira, margem = top2(por_id)
+        com_propria = np.isfinite(por_id[linhas, labels])
+        genuina = com_propria & (mais_proxima == labels) & np.isfinite(primeira)
+        confundida = com_propria & (mais_proxima != labels) & np.isfinite(primeira)
+        sem_propria = por_id.copy()
+        sem_propria[linhas, labels] = np.inf
+        _, primeira_imp, margem_imp = top2(sem_propria)
+        fora = np.isfinite(primeira_imp)
+        return {
+            'genuinas': {'distancia': primeira[genuina], 'margem': margem[genuina]},
+            'impostoras': {
+                'distancia': np.concatenate([primeira[confundida], primeira_imp[fora]]),
+                'margem': np.concatenate([margem[confundida], margem_imp[fora]]),
+            },
+            'identidades': len(dados['cpfs']),
+        }
+
+
+# Instância global
+_calibrator: Optional[ThresholdCalibrator] = None
+
+
+def get_calibrator() -> ThresholdCalibrator:
+    """Retorna a instância singleton do calibrador (dataset em constants/rostos)"""
+    global _calibrator
+    if _calibrator is None:
+        base = os.path.join(os.path.dirname(__file__), '..', 'constants', 'rostos')
+        _calibrator = ThresholdCalibrator(os.path.abspath(base))
+    return _calibrator
@@ -6,9 +6,14 @@ import time
 import cv2
 import numpy as np
 import requests
-from typing import Optional, Callable
+from typing import Optional, Callable, List
 import logging
 
+from services.profiler import get_profiler
+from services.tracing import get_tracer
+from services.frame_recorder import get_recording_manager, ReplaySource
+from services.frame_store import LatestFrameStore, StoredFrame
+
 logger = logging.getLogger(__name__)
 
 
@@ -20,10 +25,16 @@ class ESP32CamClient:
         self.on_frame = on_frame
         self.running = False
         self.thread: Optional[threading.Thread] = None
-        self.last_frame: Optional[np.ndarray] = None
+        self.frames = LatestFrameStore()
         self.last_error: Optional[str] = None
         self.lock = threading.Lock()
+        # Recebem o JPEG bruto de cada frame, antes da decodificação (ex.: MJPEGBroadcaster)
+        self.jpeg_listeners: List[Callable[[bytes], None]] = []
         
+    def add_jpeg_listener(self, callback: Callable[[bytes], None]):
+        """Registra um callback chamado com os bytes de cada JPEG recebido"""
+        self.jpeg_listeners.append(callback)
+
     def start(self):
         """Inicia a captura de frames em thread separada"""
         if self.running:
@@ -40,10 +51,17 @@ class ESP32CamClient:
             self.thread.join(timeout=5)
         logger.info("ESP32-CAM client parado")
     
+    @property
+    def last_frame(self) -> Optional[np.ndarray]:
+        return self.frames.get()
+
     def get_frame(self) -> Optional[np.ndarray]:
-        """Retorna cópia do último frame capturado"""
-        with self.lock:
-            return self.last_frame.copy() if self.last_frame is not None else None
+        """Retorna o último frame capturado (somente leitura, sem cópia)"""
+        return self.frames.get()
+
+    def get_latest(self) -> Optional[StoredFrame]:
+        """Último frame com número de sequência (para pular frames já processados)"""
+        return self.frames.latest()
     
     def _capture_loop(self):
         """Loop principal de captura de frames"""
@@ -67,24 +85,15 @@ class ESP32CamClient:
                     if a != -1 and b != -1:
                         jpg = bytes_data[a:b+2]
                         bytes_data = bytes_data[b+2:]
-                        
-                        # Decodifica JPEG para numpy array
-                        frame = cv2.imdecode(
-                            np.frombuffer(jpg, dtype=np.uint8),
-                            cv2.IMREAD_COLOR
-                        )
-                        
-                        if frame is not None:
-                            with self.lock:
-                                self.last_frame = frame
-                                self.last_error = None
-                            
-                            # Callback se definido
-                            if self.on_frame:
-                                try:
-                                    self.on_frame(frame)
-                                except Exception as e:
-                                    logger.error(f"Erro no callback: {e}")
+                        get_recording_manager().record('esp32', jpg, self.stream_url)
+                        for listener in self.jpeg_listeners:
+                            try:
+                                listener(jpg)
+                            except Exception as e:
+                                logger.error(f"Erro no listener de JPEG: {e}")
+                        with get_tracer().trace('esp32_frame', cat='esp32', bytes=len(jpg)), \
+                                get_profiler().profile('esp32'):
+                            self._handle_jpeg(jpg)
             
             except Exception as e:
                 error_msg = f"Erro ao capturar do ESP32-CAM: {e}"
@@ -94,13 +103,39 @@ class ESP32CamClient:
                 # Aguarda antes de tentar reconectar
                 time.sleep(5)
 
+    def _handle_jpeg(self, jpg: bytes):
+        """Decodifica um JPEG do stream, atualiza o último frame e chama o callback"""
+        with get_tracer().span('imdecode', cat='esp32'):
+            frame = cv2.imdecode(
+                np.frombuffer(jpg, dtype=np.uint8),
+                cv2.IMREAD_COLOR
+            )
+        
+        if frame is not None:
+            self.frames.publish(frame)
+            with self.lock:
+                self.last_error = None
+            
+            # Callback se definido
+            if self.on_frame:
+                try:
+                    with get_tracer().span('on_frame', cat='esp32'):
+                        self.on_frame(frame)
+                except Exception as e:
+                    logger.error(f"Erro no callback: {e}")
+
 
 # Instância global (se habilitado)
 _esp32_client: Optional[ESP32CamClient] = None
 
 def get_esp32_client(stream_url: str = None, on_frame: Callable = None) -> Optional[ESP32CamClient]:
-    """Retorna a instância singleton do cliente ESP32"""
+    """Retorna a instância singleton do cliente ESP32.
+    Se `stream_url` for um arquivo `.frec`, reproduz a gravação (mesma interface).
+    """
     global _esp32_client
     if _esp32_client is None and stream_url:
-        _esp32_client = ESP32CamClient(stream_url, on_frame)
+        if stream_url.lower().endswith('.frec'):
+            _esp32_client = ReplaySource(stream_url, on_frame, realtime=True, loop=True)
+        else:
+            _esp32_client = ESP32CamClient(stream_url, on_frame)
     return _esp32_client
@@ -0,0 +1,152 @@
+"""Reconhecimento no servidor direto do stream da ESP32-CAM (CAMERA_MODE=esp32).
+
+Sem este modo o navegador busca um snapshot, converte para base64 e o envia
+de volta a `/api/process_frame` (dois saltos de rede e duas recodificações
+por frame). Aqui uma thread consome os frames que o `ESP32CamClient` já
+decodificou e os passa ao `FaceRecognitionService`; o navegador exibe o stream
+retransmitido e recebe apenas o estado (caixas, progresso de estabilidade) e
+as detecções.
+
+Os frames usam a galeria vinculada à câmera ESP32_CAMERA_ID (ou o serviço
+geral, sem vínculo), resolvida a cada frame.
+
+A thread lê sempre o frame mais recente (`wait_newer`) em vez de processar
+dentro de `on_frame`: o loop de captura nunca espera pelo reconhecimento e,
+se este for mais lento que a câmera, frames intermediários são pulados em
+vez de acumular atraso.
+"""
+from __future__ import annotations
+import atexit
+import logging
+import threading
+import time
+from typing import Callable, Dict, Optional
+
+from constants.config import ESP32_CAM_URL, ESP32_CAMERA_ID
+from services.esp32_client import get_esp32_client
+from services.event_bus import get_event_bus
+from services.gallery_shards import get_gallery_manager
+from services.metrics import FRAMES_TOTAL, ESP32_FRAME_DECISION_SECONDS, ESP32_FRAMES_SKIPPED_TOTAL
+from services.profiler import get_profiler
+from services.tracing import get_tracer
+
+logger = logging.getLogger(__name__)
+
+# Canal de /api/events com o estado e as detecções deste modo
+EVENT_CHANNEL = 'esp32'
+
+
+class ESP32RecognitionLoop:
+    """Thread que reconhece o último frame da fonte e publica o estado para a UI."""
+
+    def __init__(self, source, galleries, camera: Optional[str] = None, wait_timeout: float = 1.0):
+        self.source = source
+        self.galleries = galleries  # GalleryShardManager
+        self.camera = camera
+        self.wait_timeout = wait_timeout
+        self.running = False
+        self.thread: Optional[threading.Thread] = None
+        self._cond = threading.Condition()
+        self._state: Optional[Dict] = None
+        self._state_seq = 0
+        self._processed = 0
+        self._skipped = 0
+        self._last_error: Optional[str] = None
+        # Chamado com a detecção pendente criada pelo frame (ex.: publicar no barramento de eventos)
+        self.on_detection: Optional[Callable[[Dict], None]] = None
+
+    def start(self) -> 'ESP32RecognitionLoop':
+        if self.running:
+            return self
+        if not self.source.running:
+            self.source.start()
+        self.running = True
+        self.thread = threading.Thread(target=self._loop, daemon=True, name='esp32-recognition')
+        self.thread.start()
+        atexit.register(self.stop)
+        logger.info(f"Reconhecimento no servidor iniciado: {self.source.stream_url}")
+        return self
+
+    def stop(self):
+        self.running = False
+        if self.thread:
+            self.thread.join(timeout=5)
+
+    def _loop(self):
+        seq = 0
+        while self.running:
+            stored = self.source.frames.wait_newer(seq, self.wait_timeout)
+            if stored is None:
+                continue
+            if seq and stored.seq > seq + 1:
+                pulados = stored.seq - seq - 1
+                self._skipped += pulados
+                ESP32_FRAMES_SKIPPED_TOTAL.inc(pulados)
+            seq = stored.seq
+            try:
+                service = self.galleries.for_camera(self.camera)
+                with get_tracer().trace('esp32_recognition', cat='esp32', seq=seq), \
+                        get_profiler().profile('esp32'):
+                    # Frame somente leitura: só registra as caixas, sem desenhar
+                    found = service.detect_and_recognize(stored.image, draw=False)
+                FRAMES_TOTAL.inc()
+                atraso = max(0.0, time.time() - stored.timestamp)
+                ESP32_FRAME_DECISION_SECONDS.observe(atraso)
+                h, w = stored.image.shape[:2]
+                self._publish({
+                    'frame_seq': seq,
+                    'frame_size': [int(w), int(h)],
+                    'faces': service.get_last_boxes(),
+                    'ui': service.get_ui_status(),
+                    'decision_ms': round(atraso * 1000.0, 1),
+                })
+                if found and self.on_detection:
+                    self.on_detection(found)
+                self._processed += 1
+                self._last_error = None
+            except Exception as e:
+                logger.error(f"Erro no reconhecimento do frame ESP32: {e}")
+                self._last_error = str(e)
+
+    def _publish(self, state: Dict) -> None:
+        with self._cond:
+            self._state_seq += 1
+            state['seq'] = self._state_seq
+            state['timestamp'] = time.time()
+            self._state = state
+            self._cond.notify_all()
+        get_event_bus().publish(EVENT_CHANNEL, 'status', state, durable=False)
+
+    def state(self, since: int = 0, timeout: float = 0.0) -> Optional[Dict]:
+        """Último estado; com `timeout`, espera até haver um estado com seq maior que `since`."""
+        with self._cond:
+            if timeout > 0:
+                self._cond.wait_for(lambda: self._state is not None and self._state['seq'] > since, timeout)
+            return self._state
+
+    def status(self) -> Dict:
+        with self.source.lock:
+            erro_fonte = self.source.last_error
+        return {
+            'running': self.running,
+            'source': self.source.stream_url,
+            'source_error': erro_fonte,
+            'camera': self.camera,
+            'processed': self._processed,
+            'skipped': self._skipped,
+            'last_error': self._last_error,
+        }
+
+
+# Instância global
+_loop: Optional[ESP32RecognitionLoop] = None
+_loop_lock = threading.Lock()
+
+
+def get_esp32_recognition() -> ESP32RecognitionLoop:
+    """Retorna a instância singleton do reconhecimento sobre a câmera de ESP32_CAM_URL"""
+    global _loop
+    with _loop_lock:
+        if _loop is None:
+            _loop = ESP32RecognitionLoop(get_esp32_client(ESP32_CAM_URL), get_gallery_manager(), ESP32_CAMERA_ID)
+        return _loop
@@ -0,0 +1,193 @@
+"""Barramento de eventos em memória para Server-Sent Events (`/api/events`).
+
+Cada canal (sessão da página, ou `esp32` no reconhecimento no servidor) tem:
+ - um buffer circular de eventos duráveis (`detection`, `ponto`), reenviados
+   a quem reconecta com `Last-Event-ID`;
+ - o último evento de estado (`status`), que só vale enquanto é o mais
+   recente: não entra no buffer, só o atual é entregue.
+
+Os ids são globais e crescentes; no formato `<época>-<n>` a época muda a cada
+início do processo, então um `Last-Event-ID` de antes de um reinício faz o
+cliente receber tudo o que estiver no buffer em vez de ignorar eventos novos.
+Assinaturas novas (sem `Last-Event-ID` ou com um inválido) começam no fim do
+buffer: uma página recém-aberta não recebe detecções antigas, talvez já
+confirmadas, só o estado atual. O primeiro bloco do stream já traz o id do fim
+do buffer, para que uma reconexão antes de qualquer evento não perca nada.
+Todos os espectadores de um canal recebem os mesmos eventos (sem a leitura
+destrutiva de `/api/last_detection`).
+"""
+from __future__ import annotations
+import json
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Deque, Dict, Iterator, List, NamedTuple, Optional
+
+from constants.config import (
+    EVENTS_BUFFER_SIZE, EVENTS_HEARTBEAT_SECONDS, EVENTS_MAX_SUBSCRIBERS, EVENTS_CHANNEL_TTL_SECONDS
+)
+from services.metrics import EVENT_SUBSCRIBERS, EVENTS_PUBLISHED_TOTAL
+
+# Milissegundos que o navegador espera antes de reconectar
+RETRY_MS = 2000
+
+
+class Event(NamedTuple):
+    id: int
+    type: str
+    data: Dict
+    timestamp: float
+
+
+class _Channel:
+    def __init__(self, lock: threading.Lock, size: int):
+        self.cond = threading.Condition(lock)
+        self.events: Deque[Event] = deque(maxlen=size)
+        self.status: Optional[Event] = None
+        self.subscribers = 0
+        self.last_activity = time.monotonic()
+
+
+class EventBus:
+    """Canais com buffer circular + último estado; assinantes esperam na condição do próprio canal."""
+
+    def __init__(self, buffer_size: int = EVENTS_BUFFER_SIZE, heartbeat_seconds: float = EVENTS_HEARTBEAT_SECONDS,
+                 max_subscribers: int = EVENTS_MAX_SUBSCRIBERS, channel_ttl: float = EVENTS_CHANNEL_TTL_SECONDS):
+        self.buffer_size = max(1, int(buffer_size))
+        self.heartbeat_seconds = max(1.0, float(heartbeat_seconds))
+        self.max_subscribers = max(1, int(max_subscribers))
+        self.channel_ttl = float(channel_ttl)
+        self.epoch = format(int(time.time()), 'x')
+        self._lock = threading.Lock()
+        self._channels: 'OrderedDict[str, _Channel]' = OrderedDict()
+        self._next_id = 0
+        self._subscribers = 0
+
+    # --- Publicação ---
+    def _channel(self, canal: str) -> _Channel:
+        """Canal existente ou novo (chamar com o lock). Remove canais ociosos sem assinantes."""
+        ch = self._channels.get(canal)
+        if ch is None:
+            agora = time.monotonic()
+            for nome in [n for n, c in self._channels.items()
+                         if c.subscribers == 0 and agora - c.last_activity > self.channel_ttl]:
+                del self._channels[nome]
+            ch = self._channels[canal] = _Channel(self._lock, self.buffer_size)
+        ch.last_activity = time.monotonic()
+        return ch
+
+    def publish(self, canal: str, tipo: str, data: Dict, durable: bool = True) -> Event:
+        """Publica um evento. `durable=False` (estado): substitui o último estado e não entra no buffer."""
+        with self._lock:
+            self._next_id += 1
+            evento = Event(self._next_id, tipo, data, time.time())
+            ch = self._channel(canal)
+            if durable:
+                ch.events.append(evento)
+            else:
+                ch.status = evento
+            ch.cond.notify_all()
+        EVENTS_PUBLISHED_TOTAL.labels(type=tipo).inc()
+        return evento
+
+    def subscribers(self, canal: str) -> int:
+        with self._lock:
+            ch = self._channels.get(canal)
+            return ch.subscribers if ch is not None else 0
+
+    # --- Assinatura ---
+    def format_id(self, evento: Event) -> str:
+        return f'{self.epoch}-{evento.id}'
+
+    def parse_last_id(self, valor: Optional[str]) -> Optional[int]:
+        """Último id visto pelo cliente: None se ausente ou inválido (assinatura nova),
+        0 se de outra época do processo (reenvia o buffer inteiro)."""
+        if not valor:
+            return None
+        epoch, _, n = valor.strip().partition('-')
+        if not epoch or not n.isdigit():
+            return None
+        return int(n) if epoch == self.epoch else 0
+
+    def try_acquire(self) -> bool:
+        """Reserva a vaga de um assinante; False se `max_subscribers` já foi atingido.
+        A vaga é liberada quando o `stream()` correspondente termina."""
+        with self._lock:
+            if self._subscribers >= self.max_subscribers:
+                return False
+            self._subscribers += 1
+            EVENT_SUBSCRIBERS.set(self._subscribers)
+            return True
+
+    def _format(self, evento: Event, com_id: bool = True) -> str:
+        data = json.dumps(evento.data, ensure_ascii=False, default=str)
+        linha_id = f'id: {self.format_id(evento)}\n' if com_id else ''
+        return f'{linha_id}event: {evento.type}\ndata: {data}\n\n'
+
+    def stream(self, canal: str, last_event_id: Optional[str] = None) -> Iterator[str]:
+        """Gera o corpo `text/event-stream` de um assinante que já reservou a vaga com `try_acquire()`:
+        eventos após `last_event_id` (sem ele, só os publicados depois da assinatura), estado atual e novos."""
+        ultimo = self.parse_last_id(last_event_id)
+        ultimo_status = 0
+        with self._lock:
+            ch = self._channel(canal)
+            if ultimo is None:
+                ultimo = self._next_id
+            ch.subscribers += 1
+        try:
+            # Sem `data`, o bloco não gera evento no navegador, mas o `id` vira o Last-Event-ID da reconexão
+            yield f'retry: {RETRY_MS}\nid: {self.epoch}-{ultimo}\n\n'
+            while True:
+                with self._lock:
+                    ch.cond.wait_for(
+                        lambda: (ch.events and ch.events[-1].id > ultimo)
+                        or (ch.status is not None and ch.status.id > ultimo_status),
+                        self.heartbeat_seconds
+                    )
+                    novos: List[Event] = [e for e in ch.events if e.id > ultimo]
+                    status = ch.status if ch.status is not None and ch.status.id > ultimo_status else None
+                    ch.last_activity = time.monotonic()
+                if not novos and status is None:
+                    # Comentário SSE: mantém a conexão viva através de proxies
+                    yield ': ping\n\n'
+                    continue
+                if status is not None:
+                    ultimo_status = status.id
+                    novos.append(status)
+                # Em ordem de id: o último id recebido pelo navegador (Last-Event-ID) cobre tudo o que já foi enviado
+                for evento in sorted(novos, key=lambda e: e.id):
+                    if evento is not status:
+                        ultimo = evento.id
+                        yield self._format(evento)
+                    else:
+                        # Estado anterior ao ponto de partida: sem id, para não recuar o Last-Event-ID
+                        yield self._format(evento, com_id=evento.id > ultimo)
+        finally:
+            with self._lock:
+                ch.subscribers -= 1
+                self._subscribers -= 1
+                EVENT_SUBSCRIBERS.set(self._subscribers)
+
+    def status(self) -> Dict:
+        with self._lock:
+            return {
+                'epoch': self.epoch,
+                'channels': len(self._channels),
+                'subscribers': self._subscribers,
+                'max_subscribers': self.max_subscribers,
+                'last_event_id': self._next_id,
+            }
+
+
+# Instância global
+_bus: Optional[EventBus] = None
+_bus_lock = threading.Lock()
+
+
+def get_event_bus() -> EventBus:
+    """Retorna a instância singleton do barramento de eventos"""
+    global _bus
+    with _bus_lock:
+        if _bus is None:
+            _bus = EventBus()
+        return _bus
@@ -0,0 +1,163 @@
+"""Acúmulo sequencial de evidência para confirmar uma identidade.
+
+Sem isto o candidato precisa permanecer `stable_seconds` (5 s) na frente da
+câmera, por mais claros que sejam os frames. Aqui cada frame reconhecido
+contribui com o log da razão de verossimilhança genuíno/impostor, no estilo do
+teste sequencial de Wald (SPRT):
+
+    llr = log p(distância | genuíno) / p(distância | impostor)
+        + log p(margem | genuíno) / p(margem | impostor)
+
+onde `margem` é a distância da segunda identidade mais próxima menos a da
+primeira; as duas parcelas são somadas como se fossem independentes. As
+tabelas são ajustadas (`fit`) sobre as distâncias leave-one-out do dataset que
+a calibração do limiar já calcula (`ThresholdCalibrator.evidence_samples`):
+genuíno = vizinho mais próximo é a própria pessoa; impostor = pessoa fora do
+cadastro ou confundida com outra.
+Cada tabela usa faixas por quantil, suavização de Laplace e é forçada a ser
+monótona no sentido conservador (distância maior ou margem menor nunca valem
+mais). Cada frame é limitado a `max_per_frame` e a soma nunca fica abaixo de
+zero.
+
+A identidade é confirmada quando a soma alcança log((1 - α) / α), com α =
+`target_error`, e já houve ao menos `min_frames` frames. O α é nominal: ele
+supõe frames independentes, e frames seguidos do mesmo rosto são muito
+correlacionados (uma foto segurada diante da câmera repete o mesmo frame), então
+a taxa real de erro é maior; `min_frames` e o teto por frame limitam isso, e a
+evidência não substitui prova de vida. Sem ajuste (dataset com poucas
+identidades ou amostras) não há confirmação antecipada: vale só
+`stable_seconds`, que continua sendo o limite superior.
+"""
+from __future__ import annotations
+import bisect
+import math
+import threading
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from constants.config import (
+    EVIDENCE_ENABLED, EVIDENCE_TARGET_ERROR, EVIDENCE_BINS, EVIDENCE_MAX_PER_FRAME, EVIDENCE_MIN_FRAMES
+)
+
+# Amostras mínimas de cada classe para ajustar uma tabela
+_MIN_AMOSTRAS = 30
+
+
+def fit_llr_table(genuinas: np.ndarray, impostoras: np.ndarray, bins: int, limite: float,
+                  crescente: bool) -> Optional[Tuple[List[float], List[float]]]:
+    """Tabela (bordas internas, llr por faixa) do log p(x|genuíno)/p(x|impostor), ou None se faltar amostra.
+    `crescente`: o llr só pode crescer com x (margem); senão só pode decrescer (distância).
+    """
+    genuinas = genuinas[np.isfinite(genuinas)]
+    impostoras = impostoras[np.isfinite(impostoras)]
+    if genuinas.size < _MIN_AMOSTRAS or impostoras.size < _MIN_AMOSTRAS:
+        return None
+    todas = np.concatenate([genuinas, impostoras])
+    # Faixa i = (bordas[i-1], bordas[i]]; empates nos quantis deixariam faixas vazias, que são fundidas
+    bordas = np.unique(np.quantile(todas, np.linspace(0.0, 1.0, bins + 1)[1:-1]))
+    while True:
+        vazias = np.flatnonzero(np.bincount(np.searchsorted(bordas, todas), minlength=bordas.size + 1) == 0)
+        if not vazias.size:
+            break
+        bordas = np.delete(bordas, min(vazias[0], bordas.size - 1))
+    n = bordas.size + 1
+    cont_g = np.bincount(np.searchsorted(bordas, genuinas), minlength=n)
+    cont_i = np.bincount(np.searchsorted(bordas, impostoras), minlength=n)
+    p_g = (cont_g + 0.5) / (genuinas.size + 0.5 * n)
+    p_i = (cont_i + 0.5) / (impostoras.size + 0.5 * n)
+    llr = np.log(p_g / p_i)
+    # Monotonia conservadora: cada faixa vale no máximo o que valem as faixas "piores"
+    llr = np.minimum.accumulate(llr[::-1])[::-1] if crescente else np.minimum.accumulate(llr)
+    llr = np.clip(llr, -limite, limite)
+    return [float(b) for b in bordas], [float(v) for v in llr]
+
+
+class SequentialEvidence:
+    """Tabelas ajustadas e regra de decisão; a soma acumulada fica no próprio candidato."""
+
+    def __init__(self, enabled: bool = EVIDENCE_ENABLED, target_error: float = EVIDENCE_TARGET_ERROR,
+                 bins: int = EVIDENCE_BINS, max_per_frame: float = EVIDENCE_MAX_PER_FRAME,
+                 min_frames: int = EVIDENCE_MIN_FRAMES):
+        self._lock = threading.Lock()
+        self.bins = max(2, int(bins))
+        self.max_per_frame = max(0.0, float(max_per_frame))
+        self.min_frames = max(1, int(min_frames))
+        self.enabled = bool(enabled)
+        self.target_error = 0.01
+        self.boundary = 0.0
+        # (bordas, llr) de distância e margem; None até o ajuste
+        self._distance: Optional[Tuple[List[float], List[float]]] = None
+        self._margin: Optional[Tuple[List[float], List[float]]] = None
+        self._fit_info: Optional[Dict] = None
+        self.configure(target_error=target_error)
+
+    def configure(self, enabled: Optional[bool] = None, target_error: Optional[float] = None) -> None:
+        with self._lock:
+            if enabled is not None:
+                self.enabled = bool(enabled)
+            if target_error is not None:
+                self.target_error = min(0.2, max(1e-6, float(target_error)))
+                self.boundary = math.log((1.0 - self.target_error) / self.target_error)
+
+    def fit(self, amostras: Dict) -> bool:
+        """Ajusta as tabelas com {'genuinas'|'impostoras': {'distancia', 'margem'}} (arrays; margem NaN
+        sem 2ª identidade). Retorna se há tabela de distância (sem ela não há confirmação antecipada)."""
+        gen, imp = amostras['genuinas'], amostras['impostoras']
+        distancia = fit_llr_table(np.asarray(gen['distancia'], dtype=np.float64),
+                                  np.asarray(imp['distancia'], dtype=np.float64),
+                                  self.bins, self.max_per_frame, crescente=False)
+        margem = fit_llr_table(np.asarray(gen['margem'], dtype=np.float64),
+                               np.asarray(imp['margem'], dtype=np.float64),
+                               self.bins, self.max_per_frame, crescente=True) if distancia else None
+        with self._lock:
+            self._distance, self._margin = distancia, margem
+            self._fit_info = {
+                'genuinas': int(np.size(gen['distancia'])),
+                'impostoras': int(np.size(imp['distancia'])),
+                'identidades': amostras.get('identidades'),
+            }
+        return distancia is not None
+
+    @property
+    def fitted(self) -> bool:
+        return self._distance is not None
+
+    def frame_score(self, distance: float, second: Optional[float]) -> float:
+        """Contribuição de um frame reconhecido (`second` = distância da 2ª identidade, ou None); 0 sem ajuste."""
+        distancia, margem = self._distance, self._margin
+        if distancia is None:
+            return 0.0
+        bordas, llr = distancia
+        score = llr[bisect.bisect_left(bordas, distance)]
+        if second is not None and margem is not None:
+            bordas, llr = margem
+            score += llr[bisect.bisect_left(bordas, second - distance)]
+        return max(-self.max_per_frame, min(self.max_per_frame, score))
+
+    def update(self, total: float, distance: float, second: Optional[float]) -> float:
+        """Nova soma acumulada (nunca negativa)."""
+        return max(0.0, total + self.frame_score(distance, second))
+
+    def reached(self, total: float, frames: int) -> bool:
+        return self.enabled and self.fitted and frames >= self.min_frames and total >= self.boundary
+
+    def progress(self, total: float) -> float:
+        return min(1.0, total / self.boundary) if self.enabled and self.fitted and self.boundary > 0 else 0.0
+
+    def status(self) -> Dict:
+        def tabela(t):
+            return {'bordas': [round(b, 3) for b in t[0]], 'llr': [round(v, 3) for v in t[1]]} if t else None
+
+        with self._lock:
+            return {
+                'enabled': self.enabled,
+                'fitted': self.fitted,
+                'target_error': self.target_error,
+                'boundary': round(self.boundary, 3),
+                'max_per_frame': self.max_per_frame,
+                'min_frames': self.min_frames,
+                'samples': self._fit_info,
+                'distance_table': tabela(self._distance),
+                'margin_table': tabela(self._margin),
+            }
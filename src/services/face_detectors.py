@@ -0,0 +1,193 @@
+"""Detectores de face intercambiáveis (FACE_DETECTOR_BACKEND).
+
+ - `haar`: `haarcascade_frontalface_default.xml` (padrão; o que o sistema sempre usou).
+ - `lbp`: `lbpcascade_frontalface(_improved).xml`. Mais rápido que o Haar, um
+   pouco menos sensível. O wheel `opencv-python` não inclui as lbpcascades:
+   aponte FACE_DETECTOR_LBP_PATH para o XML (repositório do OpenCV,
+   `data/lbpcascades/`); sem isso o arquivo é procurado em `cv2.data`.
+ - `yunet`: `cv2.FaceDetectorYN` (rede neural), só com modelo ONNX local em
+   FACE_DETECTOR_YUNET_MODEL (ex.: `face_detection_yunet_2023mar.onnx`).
+
+Todos recebem o frame BGR (e, se já calculado, o cinza) e devolvem caixas
+`(x, y, w, h)` em coordenadas do frame. Uma única instância por processo
+(`get_face_detector()`) é compartilhada pelo serviço de reconhecimento, pelas
+rotas de cadastro e pelos workers do pool.
+"""
+from __future__ import annotations
+import logging
+import os
+import threading
+from abc import ABC, abstractmethod
+from typing import List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from constants.config import (
+    FACE_DETECTOR_BACKEND, FACE_DETECTOR_LBP_PATH, FACE_DETECTOR_YUNET_MODEL, FACE_DETECTOR_YUNET_SCORE
+)
+
+logger = logging.getLogger(__name__)
+
+BACKENDS = ('haar', 'lbp', 'yunet')
+HAAR_CASCADE_PATH = cv2.data.haarcascades + 'haarcascade_frontalface_default.xml'
+LBP_CASCADE_NAMES = ('lbpcascade_frontalface_improved.xml', 'lbpcascade_frontalface.xml')
+
+Box = Tuple[int, int, int, int]
+
+
+class FaceDetector(ABC):
+    """Interface: `detect(frame, gray=None, min_size=(60, 60))` -> [(x, y, w, h), ...]"""
+    name = ''
+
+    @abstractmethod
+    def detect(self, frame: np.ndarray, gray: Optional[np.ndarray] = None,
+               min_size: Tuple[int, int] = (60, 60)) -> List[Box]:
+        """Caixas das faces encontradas, em coordenadas do frame."""
+
+
+class CascadeDetector(FaceDetector):
+    """Classificador em cascata do OpenCV (Haar ou LBP) sobre a imagem em cinza."""
+
+    def __init__(self, name: str, path: Optional[str], scale_factor: float = 1.1, min_neighbors: int = 5):
+        if not path or not os.path.isfile(path):
+            raise ValueError(f'cascade {name} não encontrada: {path}')
+        self.name = name
+        self.path = path
+        self.scale_factor = scale_factor
+        self.min_neighbors = min_neighbors
+        # detectMultiScale guarda estado da chamada no classificador: uma instância por detecção
+        # simultânea (threads das requisições e do reconhecimento ESP32), reaproveitadas
+        self._livres = [self._load()]
+
+    def _load(self):
+        cascade = cv2.CascadeClassifier(self.path)
+        if cascade.empty():
+            raise ValueError(f'cascade {self.name} inválida: {self.path}')
+        return cascade
+
+    def detect(self, frame, gray=None, min_size=(60, 60)):
+        if gray is None:
+            gray = frame if frame.ndim == 2 else cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        try:
+            cascade = self._livres.pop()
+        except IndexError:
+            cascade = self._load()
+        try:
+            faces = cascade.detectMultiScale(gray, scaleFactor=self.scale_factor,
+                                             minNeighbors=self.min_neighbors, minSize=tuple(min_size))
+        finally:
+            self._livres.append(cascade)
+        return [(int(x), int(y), int(w), int(h)) for (x, y, w, h) in faces]
+
+
+class YuNetDetector(FaceDetector):
+    """`cv2.FaceDetectorYN` sobre o frame BGR. O tamanho de entrada acompanha o frame."""
+    name = 'yunet'
+
+    def __init__(self, model_path: Optional[str], score_threshold: float = 0.8, nms_threshold: float = 0.3):
+        if not hasattr(cv2, 'FaceDetectorYN'):
+            raise ValueError('cv2.FaceDetectorYN indisponível nesta versão do OpenCV')
+        if not model_path or not os.path.isfile(model_path):
+            raise ValueError(f'modelo YuNet não encontrado: {model_path}')
+        self.path = model_path
+        self._detector = cv2.FaceDetectorYN.create(model_path, '', (320, 320), score_threshold, nms_threshold, 5000)
+        self._size: Optional[Tuple[int, int]] = None
+        # setInputSize altera o estado do detector: uma detecção por vez
+        self._lock = threading.Lock()
+
+    def detect(self, frame, gray=None, min_size=(60, 60)):
+        if frame.ndim == 2:
+            frame = cv2.cvtColor(frame, cv2.COLOR_GRAY2BGR)
+        h, w = frame.shape[:2]
+        with self._lock:
+            if self._size != (w, h):
+                self._detector.setInputSize((w, h))
+                self._size = (w, h)
+            _, faces = self._detector.detect(frame)
+        if faces is None:
+            return []
+        caixas = []
+        for f in faces:
+            x, y = max(0, int(f[0])), max(0, int(f[1]))
+            bw, bh = min(w - x, int(f[2])), min(h - y, int(f[3]))
+            if bw >= min_size[0] and bh >= min_size[1]:
+                caixas.append((x, y, bw, bh))
+        return caixas
+
+
+def _find_lbp_cascade() -> Optional[str]:
+    if FACE_DETECTOR_LBP_PATH:
+        return FACE_DETECTOR_LBP_PATH
+    base = cv2.data.haarcascades
+    for pasta in (base, os.path.join(os.path.dirname(os.path.normpath(base)), 'lbpcascades')):
+        for nome in LBP_CASCADE_NAMES:
+            caminho = os.path.join(pasta, nome)
+            if os.path.isfile(caminho):
+                return caminho
+    return None
+
+
+def create_detector(backend: str) -> FaceDetector:
+    """Cria um detector do backend dado. ValueError se o backend não existir ou faltar o arquivo."""
+    backend = (backend or 'haar').lower()
+    if backend == 'haar':
+        return CascadeDetector('haar', HAAR_CASCADE_PATH)
+    if backend == 'lbp':
+        return CascadeDetector('lbp', _find_lbp_cascade())
+    if backend == 'yunet':
+        return YuNetDetector(FACE_DETECTOR_YUNET_MODEL, score_threshold=FACE_DETECTOR_YUNET_SCORE)
+    raise ValueError(f'backend de detecção deve ser um de {", ".join(BACKENDS)}')
+
+
+def available_backends() -> List[str]:
+    """Backends que podem ser criados com a configuração atual."""
+    disponiveis = []
+    for backend in BACKENDS:
+        try:
+            create_detector(backend)
+            disponiveis.append(backend)
+        except ValueError:
+            pass
+    return disponiveis
+
+
+def largest_face(faces: List[Box]) -> Optional[Box]:
+    """Maior caixa por área (ou None)."""
+    if len(faces) == 0:
+        return None
+    return max(faces, key=lambda f: f[2] * f[3])
+
+
+def crop_face(image: np.ndarray, bbox: Box, margin: float = 0.15, size: Tuple[int, int] = (200, 200)) -> Optional[np.ndarray]:
+    """Recorte do rosto com margem percentual, redimensionado para `size` (ou None se vazio).
+    É o recorte salvo no dataset pelo cadastro."""
+    x, y, w, h = bbox
+    mh = int(h * margin)
+    mw = int(w * margin)
+    x1 = max(0, x - mw)
+    y1 = max(0, y - mh)
+    x2 = min(image.shape[1], x + w + mw)
+    y2 = min(image.shape[0], y + h + mh)
+    recorte = image[y1:y2, x1:x2]
+    if recorte.size == 0:
+        return None
+    return cv2.resize(recorte, size)
+
+
+# Instância global
+_detector: Optional[FaceDetector] = None
+_detector_lock = threading.Lock()
+
+
+def get_face_detector() -> FaceDetector:
+    """Retorna o detector do processo (FACE_DETECTOR_BACKEND; cai para Haar se o backend não puder ser criado)"""
+    global _detector
+    with _detector_lock:
+        if _detector is None:
+            try:
+                _detector = create_detector(FACE_DETECTOR_BACKEND)
+            except ValueError as e:
+                logger.warning(f"Detector '{FACE_DETECTOR_BACKEND}' indisponível ({e}); usando haar")
+                _detector = create_detector('haar')
+        return _detector
@@ -2,69 +2,291 @@
 
 Responsabilidades:
  - Carregar imagens de rostos em `src/constants/rostos/<cpf>/*.jpg`
- - Treinar modelo LBPH
- - Detectar faces em frames e reconhecer por CPF
+ - Treinar modelo LBPH (ou atualizá-lo com fotos novas de uma pessoa, sem re-treinar)
+ - Detectar faces em frames e reconhecer por CPF (pulando frames sem movimento)
  - Expor dados da última detecção (para popup de confirmação)
+ - Pular o predict de rostos de baixa qualidade (ver `services/face_quality.py`)
+ - Verificação 1:1 contra uma identidade declarada (histogramas da pessoa em cache)
+ - Galerias (shards): uma instância por site/grupo, treinada só com os CPFs do roster e
+   com o modelo salvo em arquivo próprio (ver `services/gallery_shards.py`)
 
 Observações:
  - Reconhecimentos retornam menor confidence melhor. Limite ajustável.
  - Rosto desconhecido: desenha bounding box vermelha.
 """
 from __future__ import annotations
+import hashlib
+import json
+import logging
 import os
 import cv2
 import numpy as np
 import threading
+import multiprocessing as mp
 from datetime import datetime, timedelta
 import uuid
-from typing import Dict, Optional, Tuple, List
+from contextlib import contextmanager
+from typing import Dict, FrozenSet, Iterable, Iterator, Optional, Tuple, List
+
+from constants.config import (
+    RECOGNITION_WORKERS, RECOGNITION_SLOT_MAX_MB, RECOGNITION_POOL_TIMEOUT,
+    PENDING_DETECTION_TTL_SECONDS, PENDING_DETECTION_MAX, COOLDOWN_MAX_ENTRIES,
+    VERIFY_CACHE_MAX_PERSONS, VERIFY_CACHE_TTL_SECONDS
+)
+from services.metrics import (
+    FACES_DETECTED_TOTAL, RECOGNITIONS_TOTAL, PENDING_DETECTIONS_TOTAL, IDENTITY_CONFIRM_SECONDS, VERIFICATIONS_TOTAL,
+    GALLERY_TRAIN_SECONDS
+)
+from services.tracing import get_tracer, frame_stage
+from services.lbph import (
+    LBPH_PARAMS, load_face_image, preprocess_face, predict_top2, compute_histograms, chi2_alt_distances
+)
+from services.motion_gate import MotionGate
+from services.ttl_store import TTLStore
+from services.evidence import SequentialEvidence
+from services.face_detectors import get_face_detector, largest_face
+from services.face_quality import FaceQualityGate, get_face_quality
+
+logger = logging.getLogger(__name__)
 
-# Parâmetros LBPH (podem ser ajustados conforme qualidade do dataset)
-LBPH_PARAMS = dict(radius=2, neighbors=8, grid_x=8, grid_y=8)
 DEFAULT_CONFIDENCE_THRESHOLD = 85.0  # <= limite => reconhecido
 FACE_SIZE = (60, 60)
 
+
+def analyze_frame(frame, detector, recognizer, model_version: int = 0,
+                  quality: Optional[FaceQualityGate] = None) -> Dict:
+    """Detecção + predição sem estado (usada na thread da requisição ou nos workers do pool).
+    Retorna {'faces': [(x, y, w, h, label_id|None, confidence|None, segunda|None), ...],
+    'quality': [motivo|None, ...], 'model_version': ...}, onde `segunda` é a distância da segunda
+    identidade mais próxima (margem para a evidência sequencial) e `motivo` é o primeiro motivo de
+    rejeição pela porta de qualidade (rosto sem predict).
+    """
+    with frame_stage('cvtColor'):
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+    with frame_stage('detect_faces'):
+        faces = detector.detect(frame, gray, min_size=FACE_SIZE)
+    resultado = []
+    rejeicoes: List[Optional[str]] = []
+    for (x, y, w, h) in faces:
+        label_id = confidence = segunda = motivo = None
+        if recognizer is not None:
+            roi = gray[y:y+h, x:x+w]
+            if quality is not None and quality.enabled:
+                with frame_stage('quality'):
+                    q = quality.assess(roi, min(w, h))
+                motivo = None if q['ok'] else q['reasons'][0]
+            if motivo is None:
+                with frame_stage('roi_preprocess'):
+                    roi_gray = preprocess_face(roi)
+                with frame_stage('predict'):
+                    label_id, confidence, segunda = predict_top2(recognizer, roi_gray)
+        resultado.append((int(x), int(y), int(w), int(h), label_id, confidence, segunda))
+        rejeicoes.append(motivo)
+    return {'faces': resultado, 'quality': rejeicoes, 'model_version': model_version}
+
+
+class _ReadWriteLock:
+    """Leitores simultâneos (predict) ou um escritor (`recognizer.update` no mesmo objeto)."""
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._readers = 0
+        self._writer = False
+
+    @contextmanager
+    def read(self) -> Iterator[None]:
+        with self._cond:
+            self._cond.wait_for(lambda: not self._writer)
+            self._readers += 1
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._readers -= 1
+                if not self._readers:
+                    self._cond.notify_all()
+
+    @contextmanager
+    def write(self) -> Iterator[None]:
+        with self._cond:
+            self._cond.wait_for(lambda: not self._writer)
+            self._writer = True
+            self._cond.wait_for(lambda: not self._readers)
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._writer = False
+                self._cond.notify_all()
+
+
+def _roi_color(frame, bbox) -> np.ndarray:
+    x, y, w, h = bbox
+    return cv2.resize(frame[y:y+h, x:x+w], (200, 200))
+
+
 class FaceRecognitionService:
-    def __init__(self, base_dir: str):
+    def __init__(self, base_dir: str, roster: Optional[Iterable[str]] = None, name: str = '',
+                 model_path: Optional[str] = None):
         self.base_dir = base_dir  # caminho absoluto para src/constants/rostos
+        # Galeria: nome ('' = geral), CPFs admitidos (None = todos) e arquivo do modelo (None = só em memória)
+        self.name = name
+        self.roster: Optional[FrozenSet[str]] = frozenset(roster) if roster is not None else None
+        self.model_path = model_path
         self._lock = threading.Lock()
         self._recognizer = None
+        # Treinos/atualizações um por vez; predições em processo x update do modelo ativo
+        self._train_lock = threading.Lock()
+        self._model_rw = _ReadWriteLock()
         self._label_to_cpf: Dict[int, str] = {}
         self._cpf_to_label: Dict[str, int] = {}
         self._nomes: List[str] = []  # apenas referência
-        self._face_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_frontalface_default.xml')
+        self._detector = get_face_detector()
+        self._quality = get_face_quality()
         self.last_detection: Optional[Dict] = None  # {'cpf':..., 'confidence':..., 'timestamp':..., 'bbox':(x,y,w,h)}
         self.threshold: float = DEFAULT_CONFIDENCE_THRESHOLD
         # Estabilidade e cooldown
         self.stable_seconds: float = 5.0
         self.cooldown_seconds: float = 5.0
-        # Candidato atual: {'cpf':..., 'start': datetime, 'last': datetime, 'best_conf': float, 'bbox': (x,y,w,h)}
+        # Candidato atual: {'cpf':..., 'start': datetime, 'last': datetime, 'best_conf': float, 'bbox': (x,y,w,h),
+        #                   'evidence': float, 'frames': int}
         self._current_candidate: Optional[Dict] = None
-        # Cooldowns por CPF: cpf -> datetime quando pode disparar novamente
-        self._cooldowns: Dict[str, datetime] = {}
+        # Cooldowns por CPF: cpf -> datetime quando pode disparar novamente (expira junto com o cooldown)
+        self._cooldowns = TTLStore(self._store_name('cooldowns'), ttl_seconds=self.cooldown_seconds, max_entries=COOLDOWN_MAX_ENTRIES)
         # Detecções pendentes aguardando confirmação: id -> {cpf, roi_color, best_conf, timestamp, bbox}
-        self._pending: Dict[str, Dict] = {}
+        # Não confirmadas expiram; o limite descarta as mais antigas
+        self._pending = TTLStore(self._store_name('pending_detections'), ttl_seconds=PENDING_DETECTION_TTL_SECONDS,
+                                 max_entries=PENDING_DETECTION_MAX, sizeof=lambda d: d['roi_color'].nbytes)
         # Últimos dados para UI
         self._last_faces = 0
+        self._last_boxes: List[Dict] = []  # [{'bbox': [x, y, w, h], 'recognized': bool, 'quality'?: motivo}]
+        # Versão do modelo (incrementa a cada treino) e pool de processos opcional
+        self._model_version = 0
+        self._pool = None
+        # Porta de movimento: pula a detecção com a cena parada e ninguém rastreado
+        self._motion_gate = MotionGate()
+        # Evidência sequencial: confirma antes de stable_seconds quando os frames são claros
+        self._evidence = SequentialEvidence()
+        # Verificação 1:1: cpf -> histogramas LBPH (float32, uma linha por foto); limpo a cada treino
+        self._verify_cache = TTLStore(self._store_name('verify_histograms'), ttl_seconds=VERIFY_CACHE_TTL_SECONDS,
+                                      max_entries=VERIFY_CACHE_MAX_PERSONS, sizeof=lambda h: h.nbytes)
+
+    def _store_name(self, store: str) -> str:
+        return f'{store}@{self.name}' if self.name else store
 
     def train(self) -> int:
         """Treina (ou re-treina) o modelo LBPH lendo pastas por CPF.
         Retorna quantidade de rostos carregados.
         """
+        with self._train_lock, get_tracer().span('train', cat='model', shard=self.name), \
+                GALLERY_TRAIN_SECONDS.labels(shard=self.name or 'geral').time():
+            return self._train()
+
+    def train_or_load(self) -> int:
+        """Carrega o modelo salvo em `model_path` se as fotos não mudaram desde o treino; senão treina."""
+        if self.model_path:
+            with self._train_lock:
+                carregadas = self._load_model()
+            if carregadas is not None:
+                return carregadas
+        return self.train()
+
+    def add_images(self, cpf: str, images: List[np.ndarray]) -> int:
+        """Acrescenta fotos novas de `cpf` ao modelo ativo (`recognizer.update`), sem re-treinar a galeria.
+        `images`: cinza pré-processadas (`load_face_image`), já gravadas no dataset. Sem modelo ainda,
+        treina do zero. Retorna quantas fotos entraram (0 se o CPF não pertence à galeria).
+        """
+        if not images or (self.roster is not None and cpf not in self.roster):
+            return 0
+        with self._train_lock:
+            with self._lock:
+                recognizer = self._recognizer
+            if recognizer is not None:
+                label_id = self._cpf_to_label.get(cpf)
+                if label_id is None:
+                    label_id = max(self._label_to_cpf, default=-1) + 1
+                    self._label_to_cpf[label_id] = cpf
+                    self._cpf_to_label[cpf] = label_id
+                    self._nomes.append(cpf)
+                with get_tracer().span('update', cat='model', shard=self.name, images=len(images)), \
+                        self._model_rw.write():
+                    recognizer.update(list(images), np.full(len(images), label_id, dtype=np.int32))
+        if recognizer is None:
+            self.train()
+            return len(images)
+        # Nova versão: predições em andamento com a anterior são descartadas; o pool recebe o modelo
+        with self._model_rw.read():
+            self._set_recognizer(recognizer)
+        self._verify_cache.pop(cpf)
+        return len(images)
+
+    def set_roster(self, roster: Optional[Iterable[str]]) -> None:
+        """Troca os CPFs admitidos (vale a partir do próximo treino)."""
+        self.roster = frozenset(roster) if roster is not None else None
+
+    def _cpfs_to_train(self) -> List[str]:
+        if not os.path.isdir(self.base_dir):
+            os.makedirs(self.base_dir, exist_ok=True)
+        return [cpf for cpf in sorted(os.listdir(self.base_dir))
+                if os.path.isdir(os.path.join(self.base_dir, cpf)) and (self.roster is None or cpf in self.roster)]
+
+    def _dataset_fingerprint(self) -> str:
+        """Resumo (nome, tamanho, mtime) das fotos do treino: muda quando alguma foto entra, sai ou é alterada."""
+        h = hashlib.sha1()
+        for cpf in self._cpfs_to_train():
+            pasta = os.path.join(self.base_dir, cpf)
+            for arquivo in sorted(os.listdir(pasta)):
+                if arquivo.lower().endswith('.jpg'):
+                    st = os.stat(os.path.join(pasta, arquivo))
+                    h.update(f'{cpf}/{arquivo}:{st.st_size}:{st.st_mtime_ns}\n'.encode())
+        return h.hexdigest()
+
+    def _meta_path(self) -> str:
+        return os.path.splitext(self.model_path)[0] + '.json'
+
+    def _save_model(self, recognizer, fingerprint: str, imagens: int) -> None:
+        """Grava o modelo (`recognizer.write`) e o mapa label -> CPF com o resumo das fotos."""
+        try:
+            os.makedirs(os.path.dirname(self.model_path) or '.', exist_ok=True)
+            base, ext = os.path.splitext(self.model_path)
+            tmp = f'{base}.tmp{ext}'  # o OpenCV escolhe o formato pela extensão
+            recognizer.write(tmp)
+            os.replace(tmp, self.model_path)
+            with open(self._meta_path(), 'w', encoding='utf-8') as f:
+                json.dump({'fingerprint': fingerprint, 'images': imagens,
+                           'labels': {str(k): v for k, v in self._label_to_cpf.items()}}, f)
+        except (OSError, cv2.error) as e:
+            logger.error(f"Falha ao salvar modelo da galeria '{self.name}' em {self.model_path}: {e}")
+
+    def _load_model(self) -> Optional[int]:
+        """Carrega o modelo salvo se ainda corresponde às fotos. Retorna quantidade de rostos ou None."""
+        try:
+            with open(self._meta_path(), encoding='utf-8') as f:
+                meta = json.load(f)
+            if meta.get('fingerprint') != self._dataset_fingerprint():
+                return None
+            recognizer = cv2.face.LBPHFaceRecognizer_create(**LBPH_PARAMS)
+            recognizer.read(self.model_path)
+        except (OSError, ValueError, cv2.error):
+            return None
+        self._label_to_cpf = {int(k): v for k, v in meta['labels'].items()}
+        self._cpf_to_label = {v: k for k, v in self._label_to_cpf.items()}
+        self._nomes = sorted(self._cpf_to_label)
+        self._set_recognizer(recognizer)
+        self._verify_cache.clear()
+        return int(meta.get('images', 0))
+
+    def _train(self) -> int:
         imagens = []
         labels = []
         label_counter = 0
         self._label_to_cpf.clear()
         self._cpf_to_label.clear()
         self._nomes.clear()
+        fingerprint = self._dataset_fingerprint() if self.model_path else ''
 
-        if not os.path.isdir(self.base_dir):
-            os.makedirs(self.base_dir, exist_ok=True)
-
-        for cpf in sorted(os.listdir(self.base_dir)):
+        for cpf in self._cpfs_to_train():
             pasta = os.path.join(self.base_dir, cpf)
-            if not os.path.isdir(pasta):
-                continue
             if cpf not in self._cpf_to_label:
                 self._cpf_to_label[cpf] = label_counter
                 self._label_to_cpf[label_counter] = cpf
@@ -75,57 +297,167 @@ class FaceRecognitionService:
                 if not arquivo.lower().endswith('.jpg'):
                     continue
                 caminho = os.path.join(pasta, arquivo)
-                img_gray = cv2.imread(caminho, cv2.IMREAD_GRAYSCALE)
+                img_gray = load_face_image(caminho)
                 if img_gray is None:
                     continue
-                img_gray = cv2.resize(img_gray, (200, 200))
-                img_gray = cv2.equalizeHist(img_gray)
                 imagens.append(img_gray)
                 labels.append(label_id)
 
         if not imagens:
             # Sem dados - limpa recognizer
-            with self._lock:
-                self._recognizer = None
+            self._set_recognizer(None)
             return 0
 
         recognizer = cv2.face.LBPHFaceRecognizer_create(**LBPH_PARAMS)
         labels_np = np.array(labels, dtype=np.int32)
         recognizer.train(imagens, labels_np)
+        self._set_recognizer(recognizer)
+        self._verify_cache.clear()
+        if self.model_path:
+            self._save_model(recognizer, fingerprint, len(imagens))
+        return len(imagens)
+
+    def _set_recognizer(self, recognizer) -> None:
+        """Substitui o modelo ativo e o repassa aos workers do pool (se houver)."""
         with self._lock:
             self._recognizer = recognizer
-        return len(imagens)
+            self._model_version += 1
+            version = self._model_version
+        if self._pool is not None:
+            self._pool.publish_model(recognizer, version, self.name)
 
-    def detect_and_recognize(self, frame) -> None:
+    def attach_pool(self, pool) -> None:
+        """Passa a delegar detecção + predição ao pool de processos (RecognitionPool)."""
+        self._pool = pool
+        with self._lock:
+            recognizer = self._recognizer
+            version = self._model_version
+        pool.publish_model(recognizer, version, self.name)
+
+    def spawn_shard(self, name: str, roster: Iterable[str], model_path: Optional[str]) -> 'FaceRecognitionService':
+        """Serviço de uma galeria: só os CPFs de `roster`, modelo próprio em `model_path`.
+        Compartilha o pool de processos e a evidência sequencial; limiar e tempos seguem este serviço.
+        """
+        shard = FaceRecognitionService(self.base_dir, roster=roster, name=name, model_path=model_path)
+        shard._evidence = self._evidence
+        shard.sync_settings_from(self)
+        if self._pool is not None:
+            shard.attach_pool(self._pool)
+        return shard
+
+    def sync_settings_from(self, other: 'FaceRecognitionService') -> None:
+        """Copia limiar, tempos e ajustes da porta de movimento de `other` (serviço geral)."""
+        self.threshold = other.threshold
+        self.stable_seconds = other.stable_seconds
+        self.cooldown_seconds = other.cooldown_seconds
+        gate = other._motion_gate
+        if (self._motion_gate.enabled, self._motion_gate.threshold) != (gate.enabled, gate.threshold):
+            self._motion_gate.configure(enabled=gate.enabled, threshold=gate.threshold)
+
+    def unload(self) -> None:
+        """Descarta o modelo (inclusive nos workers do pool), ex.: galeria removida."""
+        self._set_recognizer(None)
+
+    def identities(self) -> int:
+        return len(self._label_to_cpf)
+
+    def model_version(self) -> int:
+        return self._model_version
+
+    def pool_status(self) -> Optional[Dict]:
+        return self._pool.status() if self._pool is not None else None
+
+    def motion_gate_status(self) -> Dict:
+        return self._motion_gate.status()
+
+    def configure_motion_gate(self, enabled: Optional[bool] = None, threshold: Optional[float] = None) -> Dict:
+        self._motion_gate.configure(enabled=enabled, threshold=threshold)
+        return self._motion_gate.status()
+
+    def evidence_status(self) -> Dict:
+        return self._evidence.status()
+
+    def configure_evidence(self, enabled: Optional[bool] = None, target_error: Optional[float] = None) -> Dict:
+        self._evidence.configure(enabled=enabled, target_error=target_error)
+        return self._evidence.status()
+
+    def fit_evidence(self) -> bool:
+        """Ajusta as tabelas da evidência sequencial às distâncias genuíno/impostor do dataset (calibração)."""
+        from services.calibration import get_calibrator
+        try:
+            ok = self._evidence.fit(get_calibrator().evidence_samples())
+        except Exception as e:
+            logger.error(f"Falha ao ajustar a evidência sequencial: {e}")
+            return False
+        if not ok:
+            logger.warning("Evidência sequencial sem ajuste (poucas identidades ou fotos): confirma só por tempo")
+        return ok
+
+    def start_evidence_fit(self) -> None:
+        """`fit_evidence` em segundo plano (na primeira vez calcula as distâncias de todo o dataset)."""
+        threading.Thread(target=self.fit_evidence, daemon=True, name='evidence-fit').start()
+
+    def detect_and_recognize(self, frame, draw: bool = True) -> Optional[Dict]:
         """Detecta faces e tenta reconhecer. Atualiza self.last_detection.
-        Desenha bounding boxes direto no frame.
+        Desenha bounding boxes direto no frame (draw=False: só registra as caixas, frame pode ser somente leitura).
+        Retorna a detecção criada neste frame (estabilidade atingida) ou None.
         """
-        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-        faces = self._face_cascade.detectMultiScale(gray, scaleFactor=1.1, minNeighbors=5, minSize=FACE_SIZE)
+        with get_tracer().span('detect_and_recognize', cat='frame'):
+            return self._detect_and_recognize(frame, draw)
+
+    def _detect_and_recognize(self, frame, draw: bool = True) -> Optional[Dict]:
+        tracking = self._current_candidate is not None or self._last_faces > 0
+        with frame_stage('motion_gate'):
+            processar = self._motion_gate.should_process(frame, tracking=tracking)
+        if not processar:
+            # Cena parada sem rosto no frame anterior: nada a detectar nem desenhar
+            self._last_boxes = []
+            return None
+        analysis = None
+        pool = self._pool
+        if pool is not None:
+            with frame_stage('recognition_pool'):
+                analysis = pool.analyze(frame, self.name)
+        if analysis is None:
+            # Sem pool (ou pool indisponível/saturado): processa na própria thread
+            analysis = self.analyze(frame)
+        return self.apply_analysis(frame, analysis, draw)
+
+    def analyze(self, frame) -> Dict:
+        """Parte sem estado do processamento (detecção + predição)."""
+        with self._lock:
+            recognizer = self._recognizer
+            version = self._model_version
+        with self._model_rw.read():
+            return analyze_frame(frame, self._detector, recognizer, version, self._quality)
+
+    def apply_analysis(self, frame, analysis: Dict, draw: bool = True) -> Optional[Dict]:
+        """Parte com estado: desenha as caixas e atualiza candidato, cooldowns e detecções pendentes."""
+        faces = analysis['faces']
+        rejeicoes = analysis.get('quality') or [None] * len(faces)
+        boxes: List[Dict] = []
         # atualiza contagem de faces para UI
         self._last_faces = int(len(faces))
+        FACES_DETECTED_TOTAL.inc(len(faces))
         found = None
 
-        with self._lock:
-            recognizer = self._recognizer
+        # Predições feitas com outra versão do modelo (re-treino em andamento) não valem
+        labels_validos = analysis.get('model_version') == self._model_version
 
         now = datetime.utcnow()
         # Se há candidato e passou muito tempo sem atualização, zera
         if self._current_candidate and (now - self._current_candidate['last']).total_seconds() > 1.5:
             self._current_candidate = None
 
-        for (x, y, w, h) in faces:
-            roi_gray = gray[y:y+h, x:x+w]
-            roi_gray = cv2.resize(roi_gray, (200, 200))
-            roi_gray = cv2.equalizeHist(roi_gray)
-            roi_color = frame[y:y+h, x:x+w]
-            roi_color = cv2.resize(roi_color, (200, 200))
-            if recognizer is not None:
-                label_id, confidence = recognizer.predict(roi_gray)
+        for (x, y, w, h, label_id, confidence, segunda), motivo in zip(faces, rejeicoes):
+            if label_id is not None and labels_validos:
                 if confidence <= self.threshold and label_id in self._label_to_cpf:
+                    RECOGNITIONS_TOTAL.inc()
                     cpf = self._label_to_cpf[label_id]
                     # Caixa verde para reconhecido (sem texto)
-                    cv2.rectangle(frame, (x, y), (x+w, y+h), (0, 180, 0), 2)
+                    boxes.append({'bbox': [x, y, w, h], 'recognized': True})
+                    if draw:
+                        cv2.rectangle(frame, (x, y), (x+w, y+h), (0, 180, 0), 2)
                     # Lógica de estabilidade e cooldown
                     cooldown_until = self._cooldowns.get(cpf)
                     if cooldown_until and now < cooldown_until:
@@ -140,8 +472,9 @@ class FaceRecognitionService:
                             'last': now,
                             'best_conf': confidence,
                             'bbox': (x, y, w, h),
-                            'roi': roi_gray.copy(),
-                            'roi_color': roi_color.copy()
+                            'roi_color': _roi_color(frame, (x, y, w, h)),
+                            'evidence': 0.0,
+                            'frames': 0
                         }
                     else:
                         # Atualiza existente
@@ -149,22 +482,24 @@ class FaceRecognitionService:
                         if confidence < cand['best_conf']:
                             cand['best_conf'] = confidence
                             cand['bbox'] = (x, y, w, h)
-                            cand['roi'] = roi_gray.copy()
-                            cand['roi_color'] = roi_color.copy()
-                    # Checa se já ficou estável o suficiente
+                            cand['roi_color'] = _roi_color(frame, (x, y, w, h))
                     cand = self._current_candidate
+                    cand['evidence'] = self._evidence.update(cand['evidence'], confidence, segunda)
+                    cand['frames'] += 1
+                    # Checa se já ficou estável o suficiente (evidência acumulada ou, no máximo, stable_seconds)
                     if cand and cand.get('cpf') == cpf:
                         elapsed = (now - cand['start']).total_seconds()
-                        if elapsed >= self.stable_seconds and self.last_detection is None:
+                        por_evidencia = self._evidence.reached(cand['evidence'], cand['frames'])
+                        if (por_evidencia or elapsed >= self.stable_seconds) and self.last_detection is None:
                             # Não salva imagem aqui. Apenas cria uma detecção pendente com ROI em memória.
                             det_id = str(uuid.uuid4())
-                            self._pending[det_id] = {
+                            self._pending.set(det_id, {
                                 'cpf': cpf,
-                                'roi_color': cand.get('roi_color', roi_color).copy(),
+                                'roi_color': cand['roi_color'].copy(),
                                 'best_conf': float(cand['best_conf']),
                                 'timestamp': now,
                                 'bbox': cand['bbox']
-                            }
+                            })
                             found = {
                                 'cpf': cpf,
                                 'confidence': float(cand['best_conf']),
@@ -172,19 +507,33 @@ class FaceRecognitionService:
                                 'bbox': cand['bbox'],
                                 'detection_id': det_id
                             }
+                            PENDING_DETECTIONS_TOTAL.inc()
+                            IDENTITY_CONFIRM_SECONDS.labels(by='evidence' if por_evidencia else 'timer').observe(elapsed)
                             # Define cooldown para este CPF
-                            self._cooldowns[cpf] = now + timedelta(seconds=self.cooldown_seconds)
+                            self._cooldowns.set(cpf, now + timedelta(seconds=self.cooldown_seconds),
+                                                ttl=self.cooldown_seconds)
                             # Limpa candidato atual
                             self._current_candidate = None
                 else:
                     # Desconhecido -> caixa vermelha (sem texto)
-                    cv2.rectangle(frame, (x, y), (x+w, y+h), (0, 0, 255), 2)
+                    boxes.append({'bbox': [x, y, w, h], 'recognized': False})
+                    if draw:
+                        cv2.rectangle(frame, (x, y), (x+w, y+h), (0, 0, 255), 2)
             else:
-                # Sem modelo -> caixa vermelha sem texto
-                cv2.rectangle(frame, (x, y), (x+w, y+h), (0, 0, 255), 2)
+                # Sem modelo ou rosto de baixa qualidade (sem predict) -> caixa vermelha sem texto
+                box = {'bbox': [x, y, w, h], 'recognized': False}
+                if motivo:
+                    box['quality'] = motivo
+                boxes.append(box)
+                if draw:
+                    cv2.rectangle(frame, (x, y), (x+w, y+h), (0, 0, 255), 2)
+
+        self._last_boxes = boxes
 
         if found and self.last_detection is None:
             self.last_detection = found
+            return found
+        return None
 
     def get_ui_status(self) -> Dict:
         """Retorna informações resumidas para UI: progresso de estabilidade e faces detectadas."""
@@ -196,7 +545,8 @@ class FaceRecognitionService:
         if tracking:
             cand = self._current_candidate
             elapsed = (now - cand['start']).total_seconds()
-            progress = max(0.0, min(1.0, elapsed / max(0.001, self.stable_seconds)))
+            progress = max(0.0, min(1.0, elapsed / max(0.001, self.stable_seconds)),
+                           self._evidence.progress(cand['evidence']))
             seconds_left = max(0.0, self.stable_seconds - elapsed)
             # cooldown não se aplica enquanto em tracking; calcula se existir registro
             cd = self._cooldowns.get(cand['cpf'])
@@ -210,6 +560,15 @@ class FaceRecognitionService:
             'cooldownActive': bool(cooldown_active)
         }
 
+    def memory_status(self) -> Dict:
+        """Ocupação do estado em memória (detecções pendentes, cooldowns e cache da verificação 1:1)."""
+        return {'pending_detections': self._pending.status(), 'cooldowns': self._cooldowns.status(),
+                'verify_histograms': self._verify_cache.status()}
+
+    def get_last_boxes(self) -> List[Dict]:
+        """Caixas do último frame processado (coordenadas do frame): [{'bbox': [x, y, w, h], 'recognized': bool}]"""
+        return list(self._last_boxes)
+
     def set_timing(self, stable_seconds: Optional[float] = None, cooldown_seconds: Optional[float] = None):
         if stable_seconds is not None:
             try:
@@ -230,6 +589,12 @@ class FaceRecognitionService:
         self.last_detection = None
         return data
 
+    def clear_last_detection(self, detection_id: str) -> None:
+        """Descarta a última detecção se for `detection_id` (já entregue por outro meio, ex.: SSE)."""
+        data = self.last_detection
+        if data is not None and data.get('detection_id') == detection_id:
+            self.last_detection = None
+
     def consume_detection(self, detection_id: str) -> Optional[Dict]:
         """Consome uma detecção pendente (remove do buffer) e retorna seus dados.
         Retorna dict com chaves: cpf, roi_color (np.ndarray BGR 200x200), best_conf, timestamp, bbox
@@ -253,8 +618,8 @@ class FaceRecognitionService:
         self.threshold = max(30.0, min(150.0, v))
         return self.threshold
 
-    def _detect_faces(self, gray):
-        return self._face_cascade.detectMultiScale(gray, scaleFactor=1.1, minNeighbors=5, minSize=FACE_SIZE)
+    def _detect_faces(self, frame, gray):
+        return self._detector.detect(frame, gray, min_size=FACE_SIZE)
 
     def debug_predict(self, frame) -> Dict:
         """Predição para depuração: retorna também quando acima do limiar.
@@ -262,12 +627,12 @@ class FaceRecognitionService:
         confiança e se seria reconhecido dado o limiar atual.
         """
         gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-        faces = self._detect_faces(gray)
-        if len(faces) == 0:
+        bbox = largest_face(self._detect_faces(frame, gray))
+        if bbox is None:
             return { 'found': False }
-        # maior face
-        x, y, w, h = max(faces, key=lambda f: f[2]*f[3])
+        x, y, w, h = bbox
         roi = gray[y:y+h, x:x+w]
+        qualidade = self._quality.assess(roi, min(w, h), use='debug')
         roi = cv2.resize(roi, (200, 200))
         roi = cv2.equalizeHist(roi)
         with self._lock:
@@ -277,8 +642,10 @@ class FaceRecognitionService:
                 'found': True,
                 'trained': False,
                 'bbox': [int(x), int(y), int(w), int(h)],
+                'quality': qualidade,
             }
-        label_id, confidence = recognizer.predict(roi)
+        with self._model_rw.read():
+            label_id, confidence, segunda = predict_top2(recognizer, roi)
         cpf = self._label_to_cpf.get(label_id)
         recognized = (confidence <= self.threshold) and (cpf is not None)
         return {
@@ -288,10 +655,64 @@ class FaceRecognitionService:
             'label_id': int(label_id),
             'cpf': cpf,
             'confidence': float(confidence),
+            'second_distance': segunda,
+            'margin': float(segunda - confidence) if segunda is not None else None,
+            'evidence_per_frame': round(self._evidence.frame_score(confidence, segunda), 3),
             'threshold': float(self.threshold),
-            'recognized': bool(recognized)
+            'recognized': bool(recognized),
+            'quality': qualidade,
         }
 
+    # --- Verificação 1:1 ---
+    def _person_histograms(self, cpf: str) -> Optional[np.ndarray]:
+        """Histogramas das fotos de `cpf` (cache por pessoa), ou None se não houver fotos."""
+        hists = self._verify_cache.get(cpf)
+        if hists is not None:
+            return hists
+        pasta = os.path.join(self.base_dir, cpf)
+        if not os.path.isdir(pasta):
+            return None
+        imagens = [img for img in (load_face_image(os.path.join(pasta, a))
+                                   for a in sorted(os.listdir(pasta)) if a.lower().endswith('.jpg'))
+                   if img is not None]
+        if not imagens:
+            return None
+        hists = compute_histograms(imagens)
+        self._verify_cache.set(cpf, hists)
+        return hists
+
+    def verify(self, frame, cpf: str) -> Dict:
+        """Compara a maior face do frame apenas com as fotos de `cpf` (custo O(fotos da pessoa)).
+        Retorna {'found', 'enrolled', 'verified', 'distance', 'threshold', 'bbox', 'images'}.
+        """
+        with get_tracer().span('verify', cat='frame'):
+            hists = self._person_histograms(cpf)
+            if hists is None:
+                return {'found': False, 'enrolled': False, 'verified': False}
+            gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+            with frame_stage('detect_faces'):
+                bbox = largest_face(self._detect_faces(frame, gray))
+            if bbox is None:
+                VERIFICATIONS_TOTAL.labels(result='no_face').inc()
+                return {'found': False, 'enrolled': True, 'verified': False}
+            x, y, w, h = bbox
+            with frame_stage('roi_preprocess'):
+                sonda = compute_histograms([preprocess_face(gray[y:y+h, x:x+w])])
+            with frame_stage('predict'):
+                distancia = float(chi2_alt_distances(sonda, hists).min())
+            limiar = float(self.threshold)
+            verificado = distancia <= limiar
+            VERIFICATIONS_TOTAL.labels(result='accept' if verificado else 'reject').inc()
+            return {
+                'found': True,
+                'enrolled': True,
+                'verified': bool(verificado),
+                'distance': round(distancia, 3),
+                'threshold': limiar,
+                'bbox': [int(x), int(y), int(w), int(h)],
+                'images': int(hists.shape[0]),
+            }
+
 
 # Instância global (singleton simples)
 _service_instance: Optional[FaceRecognitionService] = None
@@ -302,5 +723,16 @@ def get_face_service() -> FaceRecognitionService:
         base = os.path.join(os.path.dirname(__file__), '..', 'constants', 'rostos')
         base = os.path.abspath(base)
         _service_instance = FaceRecognitionService(base)
+        # Pool de processos: só no processo principal (workers importam este módulo)
+        if RECOGNITION_WORKERS > 0 and mp.parent_process() is None:
+            from services.recognition_pool import RecognitionPool
+            pool = RecognitionPool(
+                RECOGNITION_WORKERS,
+                slot_bytes=int(RECOGNITION_SLOT_MAX_MB * 1024 * 1024),
+                timeout=RECOGNITION_POOL_TIMEOUT,
+            ).start()
+            _service_instance.attach_pool(pool)
         _service_instance.train()  # Treino inicial
+        if mp.parent_process() is None:
+            _service_instance.start_evidence_fit()
     return _service_instance
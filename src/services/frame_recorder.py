@@ -0,0 +1,288 @@
+"""Gravação de frames recebidos e reprodução determinística.
+
+Formato `.frec` (little-endian; um arquivo novo por gravação):
+    cabeçalho: b'FREC' + versão (uint16)
+    registro:  timestamp (float64, epoch s) | len(session_id) (uint16) | len(jpeg) (uint32)
+               | session_id (utf-8) | bytes JPEG originais
+Os JPEGs são gravados exatamente como chegaram (sem re-encode). Um registro
+truncado no fim do arquivo (queda do processo) é ignorado na leitura.
+
+`ReplaySource` reproduz uma gravação com a mesma interface de `ESP32CamClient`
+(start/stop/get_frame/on_frame), em velocidade original ou máxima.
+"""
+from __future__ import annotations
+import logging
+import os
+import struct
+import threading
+import time
+from datetime import datetime
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from constants.config import FRAME_RECORD_DIR, FRAME_RECORD_MAX_MB
+from services.frame_store import LatestFrameStore, StoredFrame
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b'FREC'
+VERSION = 1
+_HEADER = struct.Struct('<4sH')
+_RECORD = struct.Struct('<dHI')
+
+FONTES = ('process_frame', 'esp32', 'todas')
+
+
+class FrameRecorder:
+    """Escreve registros JPEG + timestamp + sessão em um arquivo `.frec` novo.
+    Lança FileExistsError se `path` já existe (uma gravação por arquivo).
+    """
+
+    def __init__(self, path: str, max_bytes: Optional[int] = None, max_frames: Optional[int] = None):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.max_frames = max_frames
+        self.frames = 0
+        self._lock = threading.Lock()
+        self._file = open(path, 'xb')
+        self._file.write(_HEADER.pack(MAGIC, VERSION))
+        self.bytes = self._file.tell()
+
+    @property
+    def full(self) -> bool:
+        if self.max_frames is not None and self.frames >= self.max_frames:
+            return True
+        if self.max_bytes is not None and self.bytes >= self.max_bytes:
+            return True
+        return False
+
+    def write(self, jpeg: bytes, session_id: str = '', timestamp: Optional[float] = None) -> bool:
+        """Acrescenta um frame. Retorna False se o limite foi atingido ou o arquivo está fechado."""
+        sid = (session_id or '').encode('utf-8')[:0xFFFF]
+        ts = time.time() if timestamp is None else timestamp
+        with self._lock:
+            if self._file is None or self.full:
+                return False
+            self._file.write(_RECORD.pack(ts, len(sid), len(jpeg)))
+            self._file.write(sid)
+            self._file.write(jpeg)
+            self.frames += 1
+            self.bytes += _RECORD.size + len(sid) + len(jpeg)
+            return True
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+def read_recording(path: str) -> Iterator[Tuple[float, str, bytes]]:
+    """Itera (timestamp, session_id, jpeg) de um arquivo `.frec`."""
+    with open(path, 'rb') as f:
+        header = f.read(_HEADER.size)
+        if len(header) < _HEADER.size:
+            return
+        magic, version = _HEADER.unpack(header)
+        if magic != MAGIC:
+            raise ValueError(f'{path}: não é uma gravação .frec')
+        if version != VERSION:
+            raise ValueError(f'{path}: versão {version} não suportada')
+        while True:
+            raw = f.read(_RECORD.size)
+            if len(raw) < _RECORD.size:
+                return
+            ts, sid_len, jpg_len = _RECORD.unpack(raw)
+            sid = f.read(sid_len)
+            jpg = f.read(jpg_len)
+            if len(sid) < sid_len or len(jpg) < jpg_len:
+                # Registro incompleto no fim do arquivo
+                return
+            yield ts, sid.decode('utf-8', errors='replace'), jpg
+
+
+class ReplaySource:
+    """Fonte de frames a partir de uma gravação, com a interface de `ESP32CamClient`.
+    `realtime=True` respeita os intervalos originais; False reproduz na velocidade máxima.
+    """
+
+    def __init__(self, path: str, on_frame: Optional[Callable] = None, realtime: bool = True,
+                 loop: bool = False, session_id: Optional[str] = None):
+        self.path = path
+        self.stream_url = path
+        self.on_frame = on_frame
+        self.realtime = realtime
+        self.loop = loop
+        self.session_id = session_id
+        self.running = False
+        self.thread: Optional[threading.Thread] = None
+        self.frames = LatestFrameStore()
+        self.last_error: Optional[str] = None
+        self.frames_played = 0
+        self.lock = threading.Lock()
+        self.jpeg_listeners: List[Callable[[bytes], None]] = []
+
+    def add_jpeg_listener(self, callback: Callable[[bytes], None]):
+        """Registra um callback chamado com os bytes de cada JPEG reproduzido"""
+        self.jpeg_listeners.append(callback)
+
+    def start(self):
+        """Inicia a reprodução em thread separada"""
+        if self.running:
+            return
+        self.running = True
+        self.thread = threading.Thread(target=self._replay_loop, daemon=True)
+        self.thread.start()
+        logger.info(f"Replay iniciado: {self.path}")
+
+    def stop(self):
+        """Para a reprodução"""
+        self.running = False
+        if self.thread:
+            self.thread.join(timeout=5)
+        logger.info("Replay parado")
+
+    @property
+    def last_frame(self) -> Optional[np.ndarray]:
+        return self.frames.get()
+
+    def get_frame(self) -> Optional[np.ndarray]:
+        """Retorna o último frame reproduzido (somente leitura, sem cópia)"""
+        return self.frames.get()
+
+    def get_latest(self) -> Optional[StoredFrame]:
+        """Último frame com número de sequência (para pular frames já processados)"""
+        return self.frames.latest()
+
+    def _iter_records(self) -> Iterator[Tuple[float, str, bytes, np.ndarray]]:
+        for ts, sid, jpg in read_recording(self.path):
+            if self.session_id is not None and sid != self.session_id:
+                continue
+            frame = cv2.imdecode(np.frombuffer(jpg, dtype=np.uint8), cv2.IMREAD_COLOR)
+            if frame is not None:
+                yield ts, sid, jpg, frame
+
+    def iter_frames(self) -> Iterator[Tuple[float, str, np.ndarray]]:
+        """Itera (timestamp, session_id, frame BGR) sem threads, na velocidade máxima."""
+        for ts, sid, _jpg, frame in self._iter_records():
+            yield ts, sid, frame
+
+    def _replay_loop(self):
+        try:
+            while self.running:
+                primeiro_ts = None
+                inicio = time.monotonic()
+                for ts, _sid, jpg, frame in self._iter_records():
+                    if not self.running:
+                        return
+                    if self.realtime:
+                        if primeiro_ts is None:
+                            primeiro_ts = ts
+                        atraso = (ts - primeiro_ts) - (time.monotonic() - inicio)
+                        if atraso > 0:
+                            time.sleep(atraso)
+                    for listener in self.jpeg_listeners:
+                        try:
+                            listener(jpg)
+                        except Exception as e:
+                            logger.error(f"Erro no listener de JPEG: {e}")
+                    self.frames.publish(frame)
+                    with self.lock:
+                        self.last_error = None
+                    self.frames_played += 1
+                    if self.on_frame:
+                        try:
+                            self.on_frame(frame)
+                        except Exception as e:
+                            logger.error(f"Erro no callback: {e}")
+                if not self.loop:
+                    break
+        except Exception as e:
+            logger.warning(f"Erro no replay de {self.path}: {e}")
+            with self.lock:
+                self.last_error = str(e)
+        finally:
+            self.running = False
+
+
+class RecordingManager:
+    """Controla a gravação ativa (no máximo uma) a partir dos pontos de captura."""
+
+    def __init__(self, base_dir: str = FRAME_RECORD_DIR):
+        self.base_dir = base_dir
+        self._lock = threading.Lock()
+        self._recorder: Optional[FrameRecorder] = None
+        self._fonte: Optional[str] = None
+        self._iniciada_em: Optional[datetime] = None
+
+    def start(self, fonte: str = 'todas', nome: Optional[str] = None,
+              max_frames: Optional[int] = None, max_mb: float = FRAME_RECORD_MAX_MB) -> Dict:
+        """Inicia a gravação. Toda gravação tem limite de tamanho (`max_mb` > 0); `max_frames` é opcional."""
+        if fonte not in FONTES:
+            raise ValueError(f'fonte deve ser uma de {", ".join(FONTES)}')
+        if max_mb is None or not max_mb > 0:
+            raise ValueError('max_mb deve ser maior que zero')
+        if max_frames is not None and max_frames <= 0:
+            raise ValueError('max_frames deve ser maior que zero')
+        with self._lock:
+            if self._recorder is not None:
+                raise ValueError('já existe uma gravação ativa')
+            os.makedirs(self.base_dir, exist_ok=True)
+            ts = datetime.utcnow().strftime('%Y%m%d_%H%M%S')
+            base = ''.join(c for c in (nome or '') if c.isalnum() or c in '-_') or f'gravacao_{ts}'
+            # Nome já usado ganha sufixo _1, _2...: nunca acrescenta a uma gravação anterior
+            sufixo = 0
+            while True:
+                path = os.path.join(self.base_dir, f'{base}_{sufixo}.frec' if sufixo else f'{base}.frec')
+                try:
+                    self._recorder = FrameRecorder(path, max_bytes=int(max_mb * 1024 * 1024), max_frames=max_frames)
+                    break
+                except FileExistsError:
+                    sufixo += 1
+            self._fonte = fonte
+            self._iniciada_em = datetime.utcnow()
+        return self.status()
+
+    def stop(self) -> Dict:
+        with self._lock:
+            rec = self._recorder
+            self._recorder = None
+        if rec is None:
+            return {'ativa': False}
+        rec.close()
+        return {'ativa': False, 'arquivo': rec.path, 'frames': rec.frames, 'bytes': rec.bytes}
+
+    def status(self) -> Dict:
+        rec = self._recorder
+        if rec is None:
+            return {'ativa': False}
+        return {
+            'ativa': True,
+            'fonte': self._fonte,
+            'arquivo': rec.path,
+            'frames': rec.frames,
+            'bytes': rec.bytes,
+            'cheia': rec.full,
+            'iniciada_em': self._iniciada_em.isoformat() if self._iniciada_em else None,
+        }
+
+    def record(self, fonte: str, jpeg: bytes, session_id: str = '') -> None:
+        """Ponto de captura: grava o JPEG se houver gravação ativa para a fonte."""
+        rec = self._recorder
+        if rec is None or (self._fonte != 'todas' and self._fonte != fonte):
+            return
+        rec.write(jpeg, session_id)
+
+
+# Instância global
+_recording_manager: Optional[RecordingManager] = None
+
+
+def get_recording_manager() -> RecordingManager:
+    """Retorna a instância singleton do gerenciador de gravações"""
+    global _recording_manager
+    if _recording_manager is None:
+        _recording_manager = RecordingManager()
+    return _recording_manager
@@ -0,0 +1,80 @@
+"""Armazenamento do último frame sem cópias.
+
+Cada frame publicado vira somente leitura (`flags.writeable = False`) e é
+trocado por referência; leitores recebem o próprio array, sem `copy()` e sem
+segurar lock durante a leitura. Quem precisar desenhar no frame faz a sua
+cópia explicitamente. Cada publicação recebe um número de sequência para que
+consumidores pulem frames já processados (`get_if_newer` / `wait_newer`).
+"""
+from __future__ import annotations
+import threading
+import time
+from typing import Dict, NamedTuple, Optional
+
+import numpy as np
+
+
+class StoredFrame(NamedTuple):
+    image: np.ndarray   # somente leitura
+    seq: int
+    timestamp: float    # epoch (s)
+
+
+class LatestFrameStore:
+    """Guarda apenas o frame mais recente; publicação e leitura O(1), sem memcpy."""
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._latest: Optional[StoredFrame] = None
+        self._seq = 0
+
+    def publish(self, frame: np.ndarray) -> StoredFrame:
+        """Publica `frame` (que passa a ser somente leitura: o chamador não deve mais alterá-lo)."""
+        frame.flags.writeable = False
+        with self._cond:
+            self._seq += 1
+            stored = StoredFrame(frame, self._seq, time.time())
+            self._latest = stored
+            self._cond.notify_all()
+        return stored
+
+    def latest(self) -> Optional[StoredFrame]:
+        return self._latest
+
+    def get(self) -> Optional[np.ndarray]:
+        """Último frame (somente leitura) ou None."""
+        stored = self._latest
+        return stored.image if stored is not None else None
+
+    @property
+    def seq(self) -> int:
+        return self._seq
+
+    def get_if_newer(self, seq: int) -> Optional[StoredFrame]:
+        """Último frame se a sequência for maior que `seq`; senão None."""
+        stored = self._latest
+        return stored if stored is not None and stored.seq > seq else None
+
+    def wait_newer(self, seq: int, timeout: Optional[float] = None) -> Optional[StoredFrame]:
+        """Bloqueia até existir frame com sequência maior que `seq` (ou timeout → None)."""
+        with self._cond:
+            self._cond.wait_for(lambda: self._latest is not None and self._latest.seq > seq, timeout)
+            return self.get_if_newer(seq)
+
+    def clear(self):
+        with self._cond:
+            self._latest = None
+
+
+# Lojas nomeadas do processo (ex.: 'reconhecimento', 'registro')
+_stores: Dict[str, LatestFrameStore] = {}
+_stores_lock = threading.Lock()
+
+
+def get_frame_store(nome: str) -> LatestFrameStore:
+    """Retorna (criando se preciso) a loja de frames com o nome dado"""
+    with _stores_lock:
+        store = _stores.get(nome)
+        if store is None:
+            store = _stores[nome] = LatestFrameStore()
+        return store
@@ -0,0 +1,193 @@
+"""Galerias (shards) de reconhecimento por site ou grupo.
+
+Cada site só admite o próprio quadro de pessoas, mas o serviço geral compara
+cada rosto com todos os CPFs cadastrados. Aqui cada galeria do banco
+(`Galeria`, membros em `galerias_usuarios`) ganha seu próprio
+`FaceRecognitionService`, treinado só com as fotos dos seus membros e com o
+modelo salvo em `GALLERY_MODEL_DIR/<nome>.yml`. O custo do `predict` por face
+e do re-treino cai na proporção do tamanho da galeria, e cada galeria treina
+sem tocar nas outras.
+
+Câmeras são vinculadas a uma galeria no banco (`CameraGaleria`); uma sessão
+pode também escolher a galeria pelo nome. Câmeras sem vínculo usam o serviço
+geral (todos os usuários), como antes.
+
+Vínculos e membros são relidos do banco a cada `GALLERY_REFRESH_SECONDS` (em
+segundo plano) e logo após alterações pela API. Galerias com membros
+alterados são re-treinadas; na inicialização o modelo salvo é reaproveitado
+se as fotos não mudaram.
+"""
+from __future__ import annotations
+import logging
+import os
+import re
+import threading
+import time
+from typing import Dict, FrozenSet, List, Optional
+
+from constants.config import GALLERY_MODEL_DIR, GALLERY_REFRESH_SECONDS
+from models.db import get_db
+from models.models import Galeria, CameraGaleria
+from services.face_recognition_service import FaceRecognitionService, get_face_service
+
+logger = logging.getLogger(__name__)
+
+# Nome da galeria também nomeia o arquivo do modelo
+NOME_VALIDO = re.compile(r'^[a-z0-9][a-z0-9_-]{0,63}$')
+
+
+class GalleryShardManager:
+    """Um `FaceRecognitionService` por galeria do banco + resolução câmera -> galeria."""
+
+    def __init__(self, default_service: FaceRecognitionService, model_dir: str = GALLERY_MODEL_DIR,
+                 refresh_seconds: float = GALLERY_REFRESH_SECONDS):
+        self.default = default_service
+        self.model_dir = model_dir
+        self.refresh_seconds = float(refresh_seconds)
+        self._lock = threading.Lock()
+        self._reload_lock = threading.Lock()
+        self._shards: Dict[str, FaceRecognitionService] = {}
+        self._cameras: Dict[str, str] = {}
+        self._loaded_at = 0.0
+        self._refreshing = False
+        self._last_error: Optional[str] = None
+
+    # --- Sincronização com o banco ---
+    def reload(self) -> List[str]:
+        """Relê galerias, membros e câmeras; cria/treina galerias novas e re-treina as com membros alterados.
+        Retorna os nomes das galerias treinadas (ou carregadas do arquivo).
+        """
+        with self._reload_lock:
+            with get_db() as db:
+                rosters: Dict[str, FrozenSet[str]] = {
+                    g.nome: frozenset(u.cpf for u in g.usuarios) for g in db.query(Galeria).all()
+                }
+                cameras = {c.camera: c.galeria.nome for c in db.query(CameraGaleria).all()}
+            treinar: List[FaceRecognitionService] = []
+            with self._lock:
+                for nome in [n for n in self._shards if n not in rosters]:
+                    self._shards.pop(nome).unload()
+                for nome, roster in rosters.items():
+                    shard = self._shards.get(nome)
+                    if shard is None:
+                        caminho = os.path.join(self.model_dir, f'{nome}.yml')
+                        shard = self._shards[nome] = self.default.spawn_shard(nome, roster, caminho)
+                        treinar.append(shard)
+                    elif shard.roster != roster:
+                        shard.set_roster(roster)
+                        treinar.append(shard)
+                self._cameras = cameras
+                self._loaded_at = time.monotonic()
+            # Fora do lock: as outras galerias continuam atendendo frames durante o treino
+            for shard in treinar:
+                imagens = shard.train_or_load()
+                logger.info(f"Galeria '{shard.name}': {shard.identities()} pessoa(s), {imagens} foto(s)")
+            self._last_error = None
+            return [s.name for s in treinar]
+
+    def _maybe_refresh(self) -> None:
+        if self.refresh_seconds <= 0 or time.monotonic() - self._loaded_at < self.refresh_seconds:
+            return
+        with self._lock:
+            if self._refreshing:
+                return
+            self._refreshing = True
+        threading.Thread(target=self._refresh, daemon=True, name='gallery-refresh').start()
+
+    def _refresh(self) -> None:
+        try:
+            self.reload()
+        except Exception as e:
+            logger.error(f"Falha ao reler galerias do banco: {e}")
+            self._last_error = str(e)
+            self._loaded_at = time.monotonic()
+        finally:
+            self._refreshing = False
+
+    # --- Resolução ---
+    def get(self, nome: str) -> FaceRecognitionService:
+        """Serviço da galeria `nome` (KeyError se não existir)."""
+        with self._lock:
+            shard = self._shards[nome]
+        shard.sync_settings_from(self.default)
+        return shard
+
+    def for_camera(self, camera: Optional[str] = None, galeria: Optional[str] = None) -> FaceRecognitionService:
+        """Serviço para um frame: galeria explícita (KeyError se não existir), a vinculada à câmera
+        ou o serviço geral."""
+        self._maybe_refresh()
+        nome = galeria or (self._cameras.get(camera) if camera else None)
+        if not nome:
+            return self.default
+        return self.get(nome)
+
+    def services(self) -> List[FaceRecognitionService]:
+        with self._lock:
+            return [self.default] + list(self._shards.values())
+
+    def train(self, nome: Optional[str] = None) -> Dict[str, int]:
+        """Re-treina uma galeria (ou, sem nome, o serviço geral e todas as galerias)."""
+        alvos = [self.get(nome)] if nome else self.services()
+        return {s.name or 'geral': s.train() for s in alvos}
+
+    def add_images(self, cpf: str, images) -> Dict[str, int]:
+        """Atualiza, sem re-treino, o modelo geral e o de cada galeria da qual `cpf` é membro."""
+        atualizados = {}
+        for service in self.services():
+            n = service.add_images(cpf, images)
+            if n:
+                atualizados[service.name or 'geral'] = n
+        return atualizados
+
+    # --- Detecções pendentes (ficam no serviço que as criou) ---
+    def consume_detection(self, detection_id: str) -> Optional[Dict]:
+        for service in self.services():
+            det = service.consume_detection(detection_id)
+            if det is not None:
+                return det
+        return None
+
+    def clear_last_detection(self, detection_id: str) -> None:
+        for service in self.services():
+            service.clear_last_detection(detection_id)
+
+    def status(self) -> Dict:
+        with self._lock:
+            shards = dict(self._shards)
+            cameras = dict(self._cameras)
+        return {
+            'model_dir': self.model_dir,
+            'last_error': self._last_error,
+            'galerias': {
+                nome: {
+                    'identities': s.identities(),
+                    'roster': len(s.roster or ()),
+                    'trained': s.is_trained(),
+                    'model_version': s.model_version(),
+                    'model_file': s.model_path,
+                    'cameras': sorted(c for c, g in cameras.items() if g == nome),
+                }
+                for nome, s in sorted(shards.items())
+            },
+        }
+
+
+# Instância global
+_manager: Optional[GalleryShardManager] = None
+_manager_lock = threading.Lock()
+
+
+def get_gallery_manager() -> GalleryShardManager:
+    """Retorna a instância singleton das galerias (carregadas do banco na primeira chamada)"""
+    global _manager
+    with _manager_lock:
+        if _manager is None:
+            _manager = GalleryShardManager(get_face_service())
+            try:
+                _manager.reload()
+            except Exception as e:
+                # Banco sem as tabelas de galerias (migração pendente): só o serviço geral
+                logger.error(f"Galerias indisponíveis: {e}")
+                _manager._last_error = str(e)
+                _manager._loaded_at = time.monotonic()
+        return _manager
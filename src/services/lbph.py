@@ -0,0 +1,93 @@
+"""Utilitários LBPH compartilhados: pré-processamento, histogramas e distâncias.
+
+Os histogramas são extraídos pelo próprio `cv2.face.LBPHFaceRecognizer`
+(`getHistograms()`), garantindo que as distâncias calculadas aqui sejam as
+mesmas que `predict()` retorna como "confidence" (qui-quadrado alternativo,
+`HISTCMP_CHISQR_ALT`).
+"""
+from __future__ import annotations
+from typing import Optional, Sequence, Tuple
+
+import cv2
+import numpy as np
+
+# Parâmetros LBPH (podem ser ajustados conforme qualidade do dataset)
+LBPH_PARAMS = dict(radius=2, neighbors=8, grid_x=8, grid_y=8)
+FACE_IMAGE_SIZE = (200, 200)
+
+_TINY = np.float32(np.finfo(np.float32).tiny)
+
+
+def preprocess_face(img_gray: np.ndarray) -> np.ndarray:
+    """Redimensiona para 200x200 e equaliza histograma (mesmo pré-processamento do treino)."""
+    img_gray = cv2.resize(img_gray, FACE_IMAGE_SIZE)
+    return cv2.equalizeHist(img_gray)
+
+
+def load_face_image(path: str) -> Optional[np.ndarray]:
+    """Lê uma imagem do dataset em escala de cinza já pré-processada, ou None."""
+    img_gray = cv2.imread(path, cv2.IMREAD_GRAYSCALE)
+    if img_gray is None:
+        return None
+    return preprocess_face(img_gray)
+
+
+def compute_histograms(images: Sequence[np.ndarray]) -> np.ndarray:
+    """Histogramas LBPH (uma linha float32 por imagem pré-processada)."""
+    if len(images) == 0:
+        return np.zeros((0, 0), dtype=np.float32)
+    recognizer = cv2.face.LBPHFaceRecognizer_create(**LBPH_PARAMS)
+    recognizer.train(list(images), np.zeros(len(images), dtype=np.int32))
+    return np.vstack([h.reshape(1, -1) for h in recognizer.getHistograms()]).astype(np.float32)
+
+
+def _chi2_alt_row(x: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """Distâncias de um histograma `x` para cada linha de `b` (operações in-place)."""
+    soma = x + b
+    dif = x - b
+    np.multiply(dif, dif, out=dif)
+    # Histogramas são não negativos: soma == 0 implica dif == 0, então o termo é 0
+    np.maximum(soma, _TINY, out=soma)
+    np.divide(dif, soma, out=dif)
+    return 2.0 * dif.sum(axis=1)
+
+
+def chi2_alt_distances(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """Matriz (len(a), len(b)) de distâncias qui-quadrado alternativas:
+    d(x, y) = 2 * Σ (x - y)² / (x + y), ignorando bins com x + y == 0.
+    """
+    a = np.asarray(a, dtype=np.float32)
+    b = np.asarray(b, dtype=np.float32)
+    out = np.empty((a.shape[0], b.shape[0]), dtype=np.float32)
+    for i in range(a.shape[0]):
+        out[i] = _chi2_alt_row(a[i], b)
+    return out
+
+
+def pairwise_chi2_alt(h: np.ndarray) -> np.ndarray:
+    """Matriz simétrica de distâncias entre todas as linhas de `h` (diagonal 0).
+    Calcula só o triângulo superior e descarta bins vazios em todo o conjunto.
+    """
+    h = np.asarray(h, dtype=np.float32)
+    n = h.shape[0]
+    out = np.zeros((n, n), dtype=np.float32)
+    if n < 2:
+        return out
+    h = np.ascontiguousarray(h[:, h.any(axis=0)])
+    for i in range(n - 1):
+        out[i, i + 1:] = _chi2_alt_row(h[i], h[i + 1:])
+    return out + out.T
+
+
+def predict_top2(recognizer, img: np.ndarray) -> Tuple[int, float, Optional[float]]:
+    """Como `predict()`, mas retorna também a distância da segunda identidade mais próxima
+    (`None` se o modelo só tem uma). Usa `predict_collect`, que percorre as mesmas amostras.
+    """
+    collector = cv2.face.StandardCollector_create()
+    recognizer.predict_collect(img, collector)
+    label = int(collector.getMinLabel())
+    segunda = None
+    for outro, dist in collector.getResults(False):
+        if outro != label and (segunda is None or dist < segunda):
+            segunda = dist
+    return label, float(collector.getMinDist()), (float(segunda) if segunda is not None else None)
@@ -0,0 +1,360 @@
+"""Métricas em processo (contadores, gauges e histogramas) no formato Prometheus.
+
+Implementação mínima e thread-safe, sem dependências externas: as métricas
+ficam em memória e são expostas em texto pelo endpoint `/metrics`.
+
+Uso:
+    with FRAME_STAGE_SECONDS.labels(stage='imdecode').time():
+        frame = cv2.imdecode(...)
+    FRAMES_TOTAL.inc()
+"""
+from __future__ import annotations
+import math
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+# Buckets (em segundos) adequados a etapas de poucos ms até ~1 s
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+
+def _format_value(v: float) -> str:
+    if v == math.inf:
+        return '+Inf'
+    if float(v).is_integer():
+        return str(int(v))
+    return repr(float(v))
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: Optional[Tuple[str, str]] = None) -> str:
+    pares = list(zip(names, values))
+    if extra:
+        pares.append(extra)
+    if not pares:
+        return ''
+    inner = ','.join('{}="{}"'.format(k, str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+                     for k, v in pares)
+    return '{' + inner + '}'
+
+
+class _CounterChild:
+    def __init__(self):
+        self._value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0):
+        with self._lock:
+            self._value += amount
+
+    @property
+    def value(self) -> float:
+        return self._value
+
+
+class _GaugeChild(_CounterChild):
+    def set(self, value: float):
+        with self._lock:
+            self._value = float(value)
+
+    def dec(self, amount: float = 1.0):
+        self.inc(-amount)
+
+
+class _HistogramChild:
+    def __init__(self, buckets: Sequence[float]):
+        self._buckets = tuple(buckets)
+        self._counts = [0] * len(self._buckets)
+        self._sum = 0.0
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        with self._lock:
+            self._sum += value
+            self._count += 1
+            for i, limite in enumerate(self._buckets):
+                if value <= limite:
+                    self._counts[i] += 1
+                    break
+
+    @contextmanager
+    def time(self) -> Iterator[None]:
+        """Mede a duração do bloco (perf_counter) e registra em segundos."""
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - inicio)
+
+    def snapshot(self) -> Tuple[List[Tuple[float, int]], float, int]:
+        """Retorna ([(le, acumulado)], soma, contagem) incluindo +Inf."""
+        with self._lock:
+            acumulado = 0
+            pares = []
+            for limite, c in zip(self._buckets, self._counts):
+                acumulado += c
+                pares.append((limite, acumulado))
+            pares.append((math.inf, self._count))
+            return pares, self._sum, self._count
+
+
+class _Metric:
+    """Família de métricas com rótulos opcionais. Sem rótulos, delega ao filho padrão."""
+    kind = ''
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], object] = {}
+        self._lock = threading.Lock()
+        if not self.labelnames:
+            # Sem rótulos: série única exposta desde o início (valor 0)
+            self._children[()] = self._new_child()
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def labels(self, **labels):
+        key = tuple(str(labels[n]) for n in self.labelnames)
+        child = self._children.get(key)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(key, self._new_child())
+        return child
+
+    def _default(self):
+        return self.labels()
+
+    def render(self) -> List[str]:
+        linhas = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.kind}']
+        with self._lock:
+            items = list(self._children.items())
+        for key, child in sorted(items):
+            linhas.extend(self._render_child(key, child))
+        return linhas
+
+    def _render_child(self, key, child) -> List[str]:
+        return [f'{self.name}{_format_labels(self.labelnames, key)} {_format_value(child.value)}']
+
+
+class Counter(_Metric):
+    kind = 'counter'
+
+    def _new_child(self):
+        return _CounterChild()
+
+    def inc(self, amount: float = 1.0):
+        self._default().inc(amount)
+
+
+class Gauge(_Metric):
+    kind = 'gauge'
+
+    def _new_child(self):
+        return _GaugeChild()
+
+    def set(self, value: float):
+        self._default().set(value)
+
+    def inc(self, amount: float = 1.0):
+        self._default().inc(amount)
+
+    def dec(self, amount: float = 1.0):
+        self._default().dec(amount)
+
+
+class Histogram(_Metric):
+    kind = 'histogram'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames)
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+    def observe(self, value: float):
+        self._default().observe(value)
+
+    def time(self):
+        return self._default().time()
+
+    def _render_child(self, key, child) -> List[str]:
+        pares, soma, contagem = child.snapshot()
+        linhas = []
+        for limite, acumulado in pares:
+            labels = _format_labels(self.labelnames, key, ('le', _format_value(limite)))
+            linhas.append(f'{self.name}_bucket{labels} {acumulado}')
+        base = _format_labels(self.labelnames, key)
+        linhas.append(f'{self.name}_sum{base} {_format_value(soma)}')
+        linhas.append(f'{self.name}_count{base} {contagem}')
+        return linhas
+
+
+class MetricsRegistry:
+    """Registro de métricas; `render()` gera o texto de exposição Prometheus."""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            existente = self._metrics.get(metric.name)
+            if existente is not None:
+                return existente
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        linhas: List[str] = []
+        for m in metrics:
+            linhas.extend(m.render())
+        return '\n'.join(linhas) + '\n'
+
+
+# Registro global e métricas do caminho de processamento de frames
+REGISTRY = MetricsRegistry()
+
+FRAME_STAGE_SECONDS = REGISTRY.histogram(
+    'face_frame_stage_seconds',
+    'Latência por etapa do processamento de frame (segundos)',
+    ['stage']
+)
+FRAME_TOTAL_SECONDS = REGISTRY.histogram(
+    'face_frame_seconds',
+    'Latência total de /api/process_frame (segundos)'
+)
+FRAMES_TOTAL = REGISTRY.counter(
+    'face_frames_total',
+    'Frames processados para reconhecimento'
+)
+FACES_DETECTED_TOTAL = REGISTRY.counter(
+    'face_faces_detected_total',
+    'Faces detectadas nos frames processados'
+)
+RECOGNITIONS_TOTAL = REGISTRY.counter(
+    'face_recognitions_total',
+    'Faces reconhecidas abaixo do limiar'
+)
+PENDING_DETECTIONS_TOTAL = REGISTRY.counter(
+    'face_pending_detections_total',
+    'Detecções pendentes criadas (estabilidade atingida)'
+)
+DB_COMMIT_SECONDS = REGISTRY.histogram(
+    'face_db_commit_seconds',
+    'Latência de commit no banco de dados (segundos)',
+    ['operation']
+)
+
+FRAMES_DROPPED_TOTAL = REGISTRY.counter(
+    'face_frames_dropped_total',
+    'Frames descartados porque a sessão já tinha um frame em processamento',
+    ['endpoint']
+)
+FRAMES_IN_FLIGHT = REGISTRY.gauge(
+    'face_frames_in_flight',
+    'Frames em processamento no momento'
+)
+FRAME_INTERVAL_HINT_SECONDS = REGISTRY.gauge(
+    'face_frame_interval_hint_seconds',
+    'Último intervalo recomendado aos clientes entre frames (segundos)'
+)
+MOTION_GATE_FRAMES_TOTAL = REGISTRY.counter(
+    'face_motion_gate_frames_total',
+    'Frames avaliados pela porta de movimento (processed = seguiram para a detecção)',
+    ['result']
+)
+MJPEG_VIEWERS = REGISTRY.gauge(
+    'face_mjpeg_viewers',
+    'Espectadores conectados ao stream MJPEG retransmitido'
+)
+MJPEG_FRAMES_SENT_TOTAL = REGISTRY.counter(
+    'face_mjpeg_frames_sent_total',
+    'Frames JPEG enviados aos espectadores do stream MJPEG'
+)
+MJPEG_SNAPSHOTS_TOTAL = REGISTRY.counter(
+    'face_mjpeg_snapshots_total',
+    'Snapshots servidos a partir do último JPEG da câmera (cache, wait = aguardou frame novo, unavailable)',
+    ['result']
+)
+ESP32_FRAME_DECISION_SECONDS = REGISTRY.histogram(
+    'face_esp32_frame_to_decision_seconds',
+    'Tempo entre a chegada do frame da ESP32-CAM e o fim do reconhecimento no servidor (segundos)'
+)
+ESP32_FRAMES_SKIPPED_TOTAL = REGISTRY.counter(
+    'face_esp32_frames_skipped_total',
+    'Frames da ESP32-CAM pulados porque o reconhecimento no servidor estava ocupado'
+)
+EVENT_SUBSCRIBERS = REGISTRY.gauge(
+    'face_event_subscribers',
+    'Conexões SSE abertas em /api/events'
+)
+EVENTS_PUBLISHED_TOTAL = REGISTRY.counter(
+    'face_events_published_total',
+    'Eventos publicados no barramento de eventos',
+    ['type']
+)
+STORE_ENTRIES = REGISTRY.gauge(
+    'face_store_entries',
+    'Entradas nos armazenamentos em memória com TTL (detecções pendentes, cooldowns)',
+    ['store']
+)
+STORE_BYTES = REGISTRY.gauge(
+    'face_store_bytes',
+    'Bytes ocupados pelos valores dos armazenamentos em memória com TTL',
+    ['store']
+)
+STORE_EVICTIONS_TOTAL = REGISTRY.counter(
+    'face_store_evictions_total',
+    'Entradas removidas dos armazenamentos em memória (ttl = expiradas, lru = limite de tamanho)',
+    ['store', 'reason']
+)
+IDENTITY_CONFIRM_SECONDS = REGISTRY.histogram(
+    'face_identity_confirm_seconds',
+    'Tempo do primeiro frame do candidato até a detecção (by = evidence: evidência sequencial, timer: stable_seconds)',
+    ['by'],
+    buckets=(0.1, 0.25, 0.5, 1.0, 2.0, 3.0, 5.0, 7.5, 10.0, 15.0)
+)
+VERIFICATIONS_TOTAL = REGISTRY.counter(
+    'face_verifications_total',
+    'Verificações 1:1 contra uma identidade declarada (accept, reject, no_face)',
+    ['result']
+)
+GALLERY_TRAIN_SECONDS = REGISTRY.histogram(
+    'face_gallery_train_seconds',
+    'Duração do treino do modelo por galeria (shard = nome da galeria, geral = todos os usuários)',
+    ['shard'],
+    buckets=(0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+)
+
+FACE_QUALITY_TOTAL = REGISTRY.counter(
+    'face_quality_total',
+    'Rostos avaliados pela porta de qualidade (use = predict|enroll; result = ok ou o primeiro motivo de rejeição)',
+    ['use', 'result']
+)
+
+BURST_FRAMES_TOTAL = REGISTRY.counter(
+    'face_burst_frames_total',
+    'Frames avaliados pelo cadastro em rajada (accepted, similar = pose repetida, low_quality, no_face)',
+    ['result']
+)
+
+
+def render_metrics() -> str:
+    return REGISTRY.render()
@@ -0,0 +1,157 @@
+"""Retransmissão do stream da ESP32-CAM para vários espectadores.
+
+A ESP32-CAM aguenta um ou dois clientes. Aqui o servidor mantém uma única
+conexão MJPEG com a câmera (`ESP32CamClient`) e guarda os bytes do último
+JPEG recebido. Cada espectador de `/api/espcam/stream` recebe esses mesmos
+bytes (sem decodificar nem recodificar) e `/api/espcam/snapshot` devolve o
+último JPEG em cache. Espectadores lentos simplesmente pulam frames: cada
+um sempre envia o mais recente disponível.
+"""
+from __future__ import annotations
+import threading
+import time
+from typing import Dict, Iterator, NamedTuple, Optional
+
+from constants.config import ESP32_CAM_URL, MJPEG_MAX_VIEWERS, MJPEG_SNAPSHOT_MAX_AGE, MJPEG_WAIT_TIMEOUT
+from services.esp32_client import get_esp32_client
+from services.metrics import MJPEG_VIEWERS, MJPEG_FRAMES_SENT_TOTAL, MJPEG_SNAPSHOTS_TOTAL
+
+BOUNDARY = 'frame'
+
+
+class JpegFrame(NamedTuple):
+    data: bytes
+    seq: int
+    timestamp: float  # epoch (s)
+
+
+class MJPEGBroadcaster:
+    """Último JPEG de uma fonte (`ESP32CamClient` ou `ReplaySource`) servido a N espectadores."""
+
+    def __init__(self, source, max_viewers: int = MJPEG_MAX_VIEWERS,
+                 snapshot_max_age: float = MJPEG_SNAPSHOT_MAX_AGE, wait_timeout: float = MJPEG_WAIT_TIMEOUT):
+        self.source = source
+        self.max_viewers = max(1, int(max_viewers))
+        self.snapshot_max_age = float(snapshot_max_age)
+        self.wait_timeout = float(wait_timeout)
+        self._cond = threading.Condition()
+        self._latest: Optional[JpegFrame] = None
+        self._seq = 0
+        self._viewers = 0
+        self._frames_sent = 0
+        self._snapshots = 0
+        source.add_jpeg_listener(self._on_jpeg)
+
+    def ensure_started(self) -> None:
+        """Abre a conexão com a câmera se ainda não estiver aberta (idempotente)."""
+        if not self.source.running:
+            self.source.start()
+
+    def _on_jpeg(self, jpg: bytes) -> None:
+        with self._cond:
+            self._seq += 1
+            self._latest = JpegFrame(jpg, self._seq, time.time())
+            self._cond.notify_all()
+
+    def latest(self) -> Optional[JpegFrame]:
+        return self._latest
+
+    def wait_newer(self, seq: int, timeout: Optional[float] = None) -> Optional[JpegFrame]:
+        """Bloqueia até existir JPEG com sequência maior que `seq` (ou timeout → None)."""
+        with self._cond:
+            self._cond.wait_for(lambda: self._latest is not None and self._latest.seq > seq, timeout)
+            atual = self._latest
+            return atual if atual is not None and atual.seq > seq else None
+
+    def snapshot(self) -> Optional[JpegFrame]:
+        """Último JPEG; se estiver mais velho que `snapshot_max_age`, espera o próximo."""
+        self.ensure_started()
+        atual = self._latest
+        if atual is not None and time.time() - atual.timestamp <= self.snapshot_max_age:
+            resultado = 'cache'
+        else:
+            novo = self.wait_newer(atual.seq if atual is not None else 0, self.wait_timeout)
+            if novo is not None:
+                atual, resultado = novo, 'wait'
+            else:
+                resultado = 'cache' if atual is not None else 'unavailable'
+        MJPEG_SNAPSHOTS_TOTAL.labels(result=resultado).inc()
+        if atual is not None:
+            with self._cond:
+                self._snapshots += 1
+        return atual
+
+    def try_acquire(self) -> bool:
+        """Reserva a vaga de um espectador; False se `max_viewers` já foi atingido.
+        A vaga é liberada quando o `stream()` correspondente termina."""
+        with self._cond:
+            if self._viewers >= self.max_viewers:
+                return False
+            self._viewers += 1
+            MJPEG_VIEWERS.set(self._viewers)
+            return True
+
+    def stream(self, max_fps: float = 0.0) -> Iterator[bytes]:
+        """Gera as partes de um `multipart/x-mixed-replace` (boundary `BOUNDARY`) para um espectador
+        que já reservou a vaga com `try_acquire()`."""
+        self.ensure_started()
+        intervalo = 1.0 / max_fps if max_fps and max_fps > 0 else 0.0
+        try:
+            seq = 0
+            enviado_em = 0.0
+            while True:
+                if intervalo:
+                    espera = enviado_em + intervalo - time.monotonic()
+                    if espera > 0:
+                        time.sleep(espera)
+                frame = self.wait_newer(seq, self.wait_timeout)
+                if frame is None:
+                    # Câmera parada: reenvia o último frame para manter a conexão viva
+                    frame = self._latest
+                    if frame is None:
+                        continue
+                seq = frame.seq
+                enviado_em = time.monotonic()
+                yield (f'--{BOUNDARY}\r\nContent-Type: image/jpeg\r\n'
+                       f'Content-Length: {len(frame.data)}\r\n\r\n').encode('ascii')
+                yield frame.data
+                yield b'\r\n'
+                MJPEG_FRAMES_SENT_TOTAL.inc()
+                with self._cond:
+                    self._frames_sent += 1
+        finally:
+            with self._cond:
+                self._viewers -= 1
+                MJPEG_VIEWERS.set(self._viewers)
+
+    def status(self) -> Dict:
+        atual = self._latest
+        with self.source.lock:
+            erro = self.source.last_error
+        with self._cond:
+            return {
+                'source': self.source.stream_url,
+                'running': bool(self.source.running),
+                'last_error': erro,
+                'frames_received': self._seq,
+                'last_frame_age_seconds': round(time.time() - atual.timestamp, 3) if atual is not None else None,
+                'last_frame_bytes': len(atual.data) if atual is not None else None,
+                'viewers': self._viewers,
+                'max_viewers': self.max_viewers,
+                'frames_sent': self._frames_sent,
+                'snapshots': self._snapshots,
+            }
+
+
+# Instância global
+_broadcaster: Optional[MJPEGBroadcaster] = None
+_broadcaster_lock = threading.Lock()
+
+
+def get_mjpeg_broadcaster() -> MJPEGBroadcaster:
+    """Retorna a instância singleton da retransmissão da câmera configurada em ESP32_CAM_URL"""
+    global _broadcaster
+    with _broadcaster_lock:
+        if _broadcaster is None:
+            _broadcaster = MJPEGBroadcaster(get_esp32_client(ESP32_CAM_URL))
+        return _broadcaster
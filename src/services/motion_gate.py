@@ -0,0 +1,112 @@
+"""Porta de movimento antes da detecção de faces.
+
+Cada frame é reduzido para uma miniatura em tons de cinza (ex.: 32x24) e
+comparado com um fundo em média móvel (`cv2.accumulateWeighted`) pela
+diferença absoluta média. Abaixo do limiar a cena é considerada parada e o
+chamador pode pular o Haar cascade. O fundo continua sendo atualizado em todo
+frame, então mudanças lentas de iluminação não disparam a detecção.
+
+Mesmo com a cena parada, um frame é liberado a cada `max_skip_seconds` para
+que alguém que tenha parado na frente da câmera não passe despercebido.
+"""
+from __future__ import annotations
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from constants.config import (
+    MOTION_GATE_ENABLED, MOTION_GATE_THRESHOLD, MOTION_GATE_SIZE, MOTION_GATE_ALPHA, MOTION_GATE_MAX_SKIP_SECONDS
+)
+from services.metrics import MOTION_GATE_FRAMES_TOTAL
+
+
+class MotionGate:
+    """Decide se um frame tem mudança suficiente para valer a detecção."""
+
+    def __init__(self, enabled: bool = MOTION_GATE_ENABLED, threshold: float = MOTION_GATE_THRESHOLD,
+                 size: int = MOTION_GATE_SIZE, alpha: float = MOTION_GATE_ALPHA,
+                 max_skip_seconds: float = MOTION_GATE_MAX_SKIP_SECONDS):
+        self.enabled = bool(enabled)
+        self.threshold = float(threshold)
+        self.size = max(8, int(size))
+        self.alpha = min(1.0, max(0.001, float(alpha)))
+        self.max_skip_seconds = max(0.0, float(max_skip_seconds))
+        self._lock = threading.Lock()
+        self._background: Optional[np.ndarray] = None
+        self._shape: Optional[Tuple[int, ...]] = None
+        self._last_processed = 0.0
+        self._last_score: Optional[float] = None
+        self._processed = 0
+        self._skipped = 0
+
+    def _thumbnail(self, frame: np.ndarray) -> np.ndarray:
+        h, w = frame.shape[:2]
+        largura = self.size
+        altura = max(1, round(largura * h / max(1, w)))
+        small = cv2.resize(frame, (largura, altura), interpolation=cv2.INTER_AREA)
+        if small.ndim == 3:
+            small = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+        return small.astype(np.float32)
+
+    def should_process(self, frame: np.ndarray, tracking: bool = False) -> bool:
+        """True se o frame deve passar pela detecção.
+        `tracking`: há rosto/candidato ativo (nunca pula nesse caso, só atualiza o fundo).
+        """
+        if not self.enabled:
+            return True
+        small = self._thumbnail(frame)
+        agora = time.monotonic()
+        with self._lock:
+            if self._background is None or self._shape != frame.shape:
+                # Primeiro frame (ou troca de resolução/fonte): reinicia o fundo e processa
+                self._background = small
+                self._shape = frame.shape
+                score = None
+                processar = True
+            else:
+                score = float(cv2.mean(cv2.absdiff(small, self._background))[0])
+                cv2.accumulateWeighted(small, self._background, self.alpha)
+                processar = (
+                    tracking
+                    or score >= self.threshold
+                    or agora - self._last_processed >= self.max_skip_seconds
+                )
+            self._last_score = score
+            if processar:
+                self._last_processed = agora
+                self._processed += 1
+            else:
+                self._skipped += 1
+        MOTION_GATE_FRAMES_TOTAL.labels(result='processed' if processar else 'skipped').inc()
+        return processar
+
+    def configure(self, enabled: Optional[bool] = None, threshold: Optional[float] = None) -> None:
+        with self._lock:
+            if enabled is not None:
+                self.enabled = bool(enabled)
+                self._background = None
+            if threshold is not None:
+                self.threshold = max(0.0, float(threshold))
+
+    def reset(self) -> None:
+        with self._lock:
+            self._background = None
+            self._shape = None
+
+    def status(self) -> Dict:
+        with self._lock:
+            total = self._processed + self._skipped
+            return {
+                'enabled': self.enabled,
+                'threshold': self.threshold,
+                'size': self.size,
+                'alpha': self.alpha,
+                'max_skip_seconds': self.max_skip_seconds,
+                'last_score': round(self._last_score, 3) if self._last_score is not None else None,
+                'processed': self._processed,
+                'skipped': self._skipped,
+                'skip_ratio': round(self._skipped / total, 4) if total else 0.0,
+            }
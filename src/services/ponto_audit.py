@@ -0,0 +1,265 @@
+"""Auditoria em lote das fotos de registro de ponto (`foto_registro_path`).
+
+Confere cada foto guardada de um ponto contra a identidade declarada (o CPF do
+registro) e contra todo o cadastro:
+
+ - Galeria: histogramas LBPH das fotos de cadastro (`rostos/<cpf>/*.jpg`),
+   sem as fotos de confirmação (`confirm_*.jpg`), que são justamente o que está
+   sob auditoria. Opcionalmente restrita aos membros de uma galeria.
+ - Sonda: a foto do ponto. As fotos gravadas pelo sistema já são o recorte do
+   rosto (até `_MAX_LADO_RECORTE` px) e são usadas inteiras, como no
+   `predict` original; imagens maiores (frames completos) passam pela
+   detecção e usam a maior face.
+ - Comparação em lote: os histogramas de um bloco de registros são calculados
+   de uma vez e comparados com a galeria inteira numa matriz de distâncias
+   (qui-quadrado alternativo, a "confidence" do `predict`); a menor distância
+   por CPF dá a identidade prevista e a distância da identidade declarada.
+
+Blocos de `AUDIT_CHUNK_SIZE` registros rodam em paralelo (processos na CLI,
+threads no servidor; OpenCV e NumPy liberam o GIL) e os resultados saem na
+ordem de entrada, um dict por registro, à medida que ficam prontos.
+
+Status por registro: `ok`, `mismatch` (outra pessoa cadastrada fica dentro do
+limiar e mais próxima que a declarada), `unverified` (a declarada fica acima
+do limiar), `not_enrolled` (CPF declarado sem fotos de cadastro), `no_face` e
+`missing_photo`.
+"""
+from __future__ import annotations
+import multiprocessing as mp
+import os
+import time
+from collections import deque
+from datetime import datetime
+from multiprocessing.pool import ThreadPool
+from typing import Dict, Iterable, Iterator, List, Optional
+
+import cv2
+import numpy as np
+
+from constants.config import AUDIT_WORKERS, AUDIT_CHUNK_SIZE
+from models.db import get_db
+from models.models import Galeria
+from services.calibration import list_dataset_files
+from services.face_detectors import get_face_detector, largest_face
+from services.lbph import load_face_image, preprocess_face, compute_histograms, chi2_alt_distances
+
+# `foto_registro_path` é relativo a src/
+SRC_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+AUDIT_STATUS = ('ok', 'mismatch', 'unverified', 'not_enrolled', 'no_face', 'missing_photo')
+AUDIT_COLUMNS = [
+    'id', 'usuario_id', 'cpf', 'data_hora', 'foto_registro_path', 'status', 'mismatch',
+    'predicted_cpf', 'distance', 'claimed_distance',
+]
+
+# Recortes gravados por /api/confirmar_ponto têm 200x200; acima disso é um frame a detectar
+_MAX_LADO_RECORTE = 400
+
+# Galeria, limiar e detector de cada processo worker (criado em _init_worker); threads recebem o seu por tarefa
+_contexto: Optional[Dict] = None
+
+
+# --- Galeria ---
+def _hist_chunk(caminhos: List[str]):
+    """(histogramas das fotos legíveis, máscara de legíveis) de um bloco de fotos de cadastro."""
+    imagens = [load_face_image(c) for c in caminhos]
+    return compute_histograms([img for img in imagens if img is not None]), [img is not None for img in imagens]
+
+
+def build_gallery(base_dir: str, cpfs: Optional[Iterable[str]] = None, pool=None,
+                  chunk_size: int = AUDIT_CHUNK_SIZE) -> Dict:
+    """Histogramas das fotos de cadastro (sem `confirm_*`), agrupados por CPF.
+    Retorna {'hists': (n, d) float32, 'cpfs': [cpf por grupo], 'inicios': início de cada grupo,
+    'posicao': cpf -> grupo, 'fotos'}.
+    """
+    filtro = set(cpfs) if cpfs is not None else None
+    itens = [(cpf, rel) for cpf, rel in list_dataset_files(base_dir)
+             if not os.path.basename(rel).startswith('confirm_') and (filtro is None or cpf in filtro)]
+    caminhos = [os.path.join(base_dir, rel) for _, rel in itens]
+    blocos = [caminhos[i:i + chunk_size] for i in range(0, len(caminhos), chunk_size)]
+    partes = pool.map(_hist_chunk, blocos) if pool is not None else [_hist_chunk(b) for b in blocos]
+    # Fotos ilegíveis ficam de fora (mesmo critério do treino)
+    legiveis = [ok for _, mascara in partes for ok in mascara]
+    itens = [item for item, ok in zip(itens, legiveis) if ok]
+    linhas = [h for h, _ in partes if len(h)]
+    hists = np.vstack(linhas) if linhas else np.zeros((0, 0), dtype=np.float32)
+    nomes: List[str] = []
+    inicios: List[int] = []
+    for i, (cpf, _) in enumerate(itens):
+        if not nomes or nomes[-1] != cpf:
+            nomes.append(cpf)
+            inicios.append(i)
+    return {'hists': hists, 'cpfs': nomes, 'inicios': np.array(inicios, dtype=np.intp),
+            'posicao': {cpf: j for j, cpf in enumerate(nomes)}, 'fotos': len(itens)}
+
+
+def gallery_members(nome: str) -> List[str]:
+    """CPFs dos membros da galeria `nome` (KeyError se não existir)."""
+    with get_db() as db:
+        galeria = db.query(Galeria).filter(Galeria.nome == nome).first()
+        if galeria is None:
+            raise KeyError(nome)
+        return [u.cpf for u in galeria.usuarios]
+
+
+# --- Registros (workers) ---
+def _init_worker(galeria: Dict, limiar: float) -> None:
+    global _contexto
+    cv2.setNumThreads(1)
+    _contexto = {'galeria': galeria, 'limiar': float(limiar), 'detector': get_face_detector()}
+
+
+def _probe(registro: Dict, detector):
+    """Imagem pré-processada do rosto do registro, ou o status que impede a comparação."""
+    rel = registro.get('foto_registro_path')
+    imagem = cv2.imread(os.path.join(SRC_DIR, rel), cv2.IMREAD_GRAYSCALE) if rel else None
+    if imagem is None:
+        return None, 'missing_photo'
+    if max(imagem.shape[:2]) <= _MAX_LADO_RECORTE:
+        return preprocess_face(imagem), None
+    bbox = largest_face(detector.detect(imagem, imagem))
+    if bbox is None:
+        return None, 'no_face'
+    x, y, w, h = bbox
+    return preprocess_face(imagem[y:y+h, x:x+w]), None
+
+
+def _audit_chunk(registros: List[Dict], contexto: Optional[Dict] = None) -> List[Dict]:
+    """Tarefa do pool: audita um bloco de registros com uma única matriz de distâncias."""
+    contexto = contexto or _contexto
+    galeria, limiar = contexto['galeria'], contexto['limiar']
+    saidas = []
+    sondas, indices = [], []
+    for registro in registros:
+        img, status = _probe(registro, contexto['detector'])
+        saidas.append(_result(registro, status))
+        if img is not None:
+            sondas.append(img)
+            indices.append(len(saidas) - 1)
+    if not sondas or not galeria['cpfs']:
+        for i in indices:
+            saidas[i]['status'] = 'not_enrolled'
+        return saidas
+    dist = chi2_alt_distances(compute_histograms(sondas), galeria['hists'])
+    # Menor distância por CPF (fotos de cada CPF são contíguas na galeria)
+    por_cpf = np.minimum.reduceat(dist, galeria['inicios'], axis=1)
+    melhores = por_cpf.argmin(axis=1)
+    for linha, i in enumerate(indices):
+        saida = saidas[i]
+        j = int(melhores[linha])
+        saida['predicted_cpf'] = galeria['cpfs'][j]
+        saida['distance'] = round(float(por_cpf[linha, j]), 3)
+        declarada = galeria['posicao'].get(saida['cpf'])
+        if declarada is None:
+            saida['status'] = 'not_enrolled'
+            continue
+        saida['claimed_distance'] = round(float(por_cpf[linha, declarada]), 3)
+        if saida['predicted_cpf'] != saida['cpf'] and saida['distance'] <= limiar:
+            saida['status'] = 'mismatch'
+            saida['mismatch'] = True
+        elif saida['claimed_distance'] > limiar:
+            saida['status'] = 'unverified'
+        else:
+            saida['status'] = 'ok'
+    return saidas
+
+
+def _result(registro: Dict, status: Optional[str]) -> Dict:
+    data_hora = registro.get('data_hora')
+    return {
+        'id': registro.get('id'),
+        'usuario_id': registro.get('usuario_id'),
+        'cpf': registro.get('cpf'),
+        'data_hora': data_hora.isoformat() if isinstance(data_hora, datetime) else data_hora,
+        'foto_registro_path': registro.get('foto_registro_path'),
+        'status': status,
+        'mismatch': False,
+        'predicted_cpf': None,
+        'distance': None,
+        'claimed_distance': None,
+    }
+
+
+# --- Fontes de registros ---
+def records_from_paths(caminhos: Iterable) -> Iterator[Dict]:
+    """Registros a partir de caminhos (relativos a src/ ou absolutos) ou dicts {caminho, cpf?}.
+    Sem CPF, o declarado é a pasta da foto (`rostos/<cpf>/confirm_*.jpg`).
+    ValueError para caminhos fora de `constants/rostos`.
+    """
+    raiz = os.path.realpath(os.path.join(SRC_DIR, 'constants', 'rostos'))
+    for item in caminhos:
+        caminho, cpf = (item.get('caminho'), item.get('cpf')) if isinstance(item, dict) else (item, None)
+        absoluto = os.path.realpath(os.path.join(SRC_DIR, str(caminho or '')))
+        if os.path.commonpath([absoluto, raiz]) != raiz:
+            raise ValueError(f'caminho fora de constants/rostos: {caminho}')
+        yield {
+            'foto_registro_path': os.path.relpath(absoluto, SRC_DIR),
+            'cpf': ''.join(filter(str.isdigit, str(cpf))) if cpf else os.path.basename(os.path.dirname(absoluto)),
+        }
+
+
+# --- Execução ---
+class PontoAuditor:
+    """Audita registros em paralelo (blocos de `chunk_size`) contra a galeria de cadastro."""
+
+    def __init__(self, base_dir: str, threshold: float, workers: int = AUDIT_WORKERS,
+                 chunk_size: int = AUDIT_CHUNK_SIZE, processes: bool = True,
+                 cpfs: Optional[Iterable[str]] = None):
+        self.base_dir = base_dir
+        self.threshold = float(threshold)
+        self.workers = int(workers) if workers and workers > 0 else (os.cpu_count() or 1)
+        self.chunk_size = max(1, int(chunk_size))
+        self.processes = processes
+        self.cpfs = list(cpfs) if cpfs is not None else None
+        self.stats: Dict = {}
+
+    def _pool(self, initializer=None, initargs=()):
+        if not self.processes:
+            return ThreadPool(self.workers, initializer=initializer, initargs=initargs)
+        metodos = mp.get_all_start_methods()
+        ctx = mp.get_context('fork' if 'fork' in metodos else 'spawn')
+        return ctx.Pool(self.workers, initializer=initializer, initargs=initargs)
+
+    def run(self, registros: Iterable[Dict]) -> Iterator[Dict]:
+        """Gera um resultado por registro, na ordem de entrada. `stats` fica completo ao fim da iteração."""
+        inicio = time.perf_counter()
+        with self._pool() as pool:
+            galeria = build_gallery(self.base_dir, self.cpfs, pool, self.chunk_size)
+        t_galeria = time.perf_counter() - inicio
+        contagem = {s: 0 for s in AUDIT_STATUS}
+        total = 0
+        # Processos recebem a galeria uma vez (initializer); threads, a cada tarefa (sem cópia)
+        contexto = None if self.processes else {'galeria': galeria, 'limiar': self.threshold,
+                                                 'detector': get_face_detector()}
+        pool = self._pool(_init_worker, (galeria, self.threshold)) if self.processes else self._pool()
+        with pool:
+            # Janela de blocos em andamento: a leitura dos registros acompanha o processamento
+            pendentes: deque = deque()
+            bloco: List[Dict] = []
+            for registro in registros:
+                bloco.append(registro)
+                if len(bloco) >= self.chunk_size:
+                    pendentes.append(pool.apply_async(_audit_chunk, (bloco, contexto)))
+                    bloco = []
+                while len(pendentes) > 2 * self.workers:
+                    for r in pendentes.popleft().get():
+                        contagem[r['status']] += 1
+                        total += 1
+                        yield r
+            if bloco:
+                pendentes.append(pool.apply_async(_audit_chunk, (bloco, contexto)))
+            while pendentes:
+                for r in pendentes.popleft().get():
+                    contagem[r['status']] += 1
+                    total += 1
+                    yield r
+        segundos = time.perf_counter() - inicio
+        self.stats = {
+            'registros': total,
+            'status': contagem,
+            'galeria': {'pessoas': len(galeria['cpfs']), 'fotos': galeria['fotos'], 'segundos': round(t_galeria, 3)},
+            'limiar': self.threshold,
+            'workers': self.workers,
+            'segundos': round(segundos, 3),
+            'registros_por_minuto': round(total * 60.0 / max(segundos - t_galeria, 1e-9), 1),
+        }
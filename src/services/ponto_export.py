@@ -0,0 +1,151 @@
+"""Exportação em streaming dos registros de ponto (`pontos_usuarios`).
+
+Os registros são lidos com cursor do lado do servidor (`yield_per` /
+`stream_results`) e convertidos em CSV ou JSONL em lotes, de modo que o uso de
+memória fica constante independentemente do tamanho do período exportado.
+Com `incluir_arquivo=True` a consulta também percorre `pontos_usuarios_arquivo`
+(registros antigos movidos por `services/archive_service.py`).
+"""
+from __future__ import annotations
+import csv
+import io
+import json
+from datetime import datetime, date, timedelta
+from itertools import chain
+from typing import Dict, Iterable, Iterator, Optional, Tuple
+
+from sqlalchemy import select
+
+from models.db import get_db
+from models.models import Usuario, PontoUsuario, PontoUsuarioArquivo
+
+# Quantidade de linhas buscadas do cursor (e serializadas) por lote
+EXPORT_BATCH_SIZE = 1000
+
+EXPORT_COLUMNS = [
+    'id', 'usuario_id', 'nome', 'cpf', 'matricula', 'data_hora',
+    'confianca', 'dispositivo', 'observacao', 'foto_registro_path'
+]
+
+EXPORT_FORMATS = {
+    'csv': 'text/csv',
+    'jsonl': 'application/x-ndjson',
+}
+
+
+def parse_periodo(inicio: Optional[str], fim: Optional[str]) -> Tuple[Optional[datetime], Optional[datetime]]:
+    """Converte os limites do período (ISO 8601) em datetimes.
+    `inicio` é inclusivo. `fim` só com data (YYYY-MM-DD) inclui o dia inteiro;
+    com horário, é usado como limite exclusivo.
+    Lança ValueError se algum valor for inválido.
+    """
+    dt_inicio = None
+    dt_fim = None
+    if inicio:
+        dt_inicio = datetime.fromisoformat(inicio.strip())
+    if fim:
+        fim = fim.strip()
+        dt_fim = datetime.fromisoformat(fim)
+        if len(fim) == 10:
+            # Somente data: inclui o dia inteiro
+            dt_fim = datetime.combine(date.fromisoformat(fim), datetime.min.time()) + timedelta(days=1)
+    if dt_inicio and dt_fim and dt_fim <= dt_inicio:
+        raise ValueError('fim deve ser posterior ao início')
+    return dt_inicio, dt_fim
+
+
+def _build_select(tabela, inicio: Optional[datetime], fim: Optional[datetime], cpf: Optional[str], usuario_id: Optional[int]):
+    """Monta o SELECT sobre `PontoUsuario` ou `PontoUsuarioArquivo` (mesmas colunas).
+    No arquivo, `id` é o `id_original` do ponto, não a chave da tabela de arquivo.
+    """
+    id_ponto = tabela.id_original if tabela is PontoUsuarioArquivo else tabela.id
+    stmt = select(
+        id_ponto.label('id'),
+        tabela.usuario_id,
+        Usuario.nome,
+        Usuario.cpf,
+        Usuario.matricula,
+        tabela.data_hora,
+        tabela.confianca,
+        tabela.dispositivo,
+        tabela.observacao,
+        tabela.foto_registro_path,
+    ).join(Usuario, Usuario.id == tabela.usuario_id)
+    if inicio is not None:
+        stmt = stmt.where(tabela.data_hora >= inicio)
+    if fim is not None:
+        stmt = stmt.where(tabela.data_hora < fim)
+    if cpf:
+        stmt = stmt.where(Usuario.cpf == cpf)
+    if usuario_id is not None:
+        stmt = stmt.where(tabela.usuario_id == usuario_id)
+    return stmt.order_by(tabela.data_hora, tabela.id)
+
+
+def _iter_tabela(tabela, inicio, fim, cpf, usuario_id, batch_size) -> Iterator[Dict]:
+    stmt = _build_select(tabela, inicio, fim, cpf, usuario_id)
+    with get_db() as db:
+        result = db.execute(stmt, execution_options={'yield_per': batch_size, 'stream_results': True})
+        for row in result:
+            yield dict(row._mapping)
+
+
+def iter_pontos(inicio: Optional[datetime] = None, fim: Optional[datetime] = None,
+                cpf: Optional[str] = None, usuario_id: Optional[int] = None,
+                batch_size: int = EXPORT_BATCH_SIZE, incluir_arquivo: bool = False) -> Iterator[Dict]:
+    """Itera os registros de ponto filtrados, um dict por linha.
+    Usa cursor do servidor: apenas `batch_size` linhas ficam em memória por vez.
+    A sessão é aberta e fechada dentro do gerador.
+    Com `incluir_arquivo`, os registros arquivados (sempre mais antigos que os da
+    tabela principal) vêm primeiro, preservando a ordem por `data_hora`.
+    """
+    principal = _iter_tabela(PontoUsuario, inicio, fim, cpf, usuario_id, batch_size)
+    if not incluir_arquivo:
+        return principal
+    arquivo = _iter_tabela(PontoUsuarioArquivo, inicio, fim, cpf, usuario_id, batch_size)
+    return chain(arquivo, principal)
+
+
+def _serialize_value(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+def iter_csv(rows: Iterable[Dict], batch_size: int = EXPORT_BATCH_SIZE) -> Iterator[str]:
+    """Gera o CSV em blocos de texto (cabeçalho + `batch_size` linhas por bloco)."""
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    writer.writerow(EXPORT_COLUMNS)
+    pendentes = 0
+    for row in rows:
+        writer.writerow(['' if row[c] is None else _serialize_value(row[c]) for c in EXPORT_COLUMNS])
+        pendentes += 1
+        if pendentes >= batch_size:
+            yield buf.getvalue()
+            buf.seek(0)
+            buf.truncate(0)
+            pendentes = 0
+    yield buf.getvalue()
+
+
+def iter_jsonl(rows: Iterable[Dict], batch_size: int = EXPORT_BATCH_SIZE) -> Iterator[str]:
+    """Gera JSON Lines (um objeto por linha) em blocos de `batch_size` linhas."""
+    linhas = []
+    for row in rows:
+        linhas.append(json.dumps({c: _serialize_value(row[c]) for c in EXPORT_COLUMNS}, ensure_ascii=False))
+        if len(linhas) >= batch_size:
+            yield '\n'.join(linhas) + '\n'
+            linhas = []
+    if linhas:
+        yield '\n'.join(linhas) + '\n'
+
+
+def export_pontos(formato: str, inicio: Optional[datetime] = None, fim: Optional[datetime] = None,
+                  cpf: Optional[str] = None, usuario_id: Optional[int] = None,
+                  incluir_arquivo: bool = False) -> Iterator[str]:
+    """Retorna gerador de blocos de texto no formato pedido ('csv' ou 'jsonl')."""
+    rows = iter_pontos(inicio, fim, cpf, usuario_id, incluir_arquivo=incluir_arquivo)
+    if formato == 'jsonl':
+        return iter_jsonl(rows)
+    return iter_csv(rows)
@@ -0,0 +1,250 @@
+"""Profiling sob demanda do caminho quente (`/api/process_frame` e loop do ESP32).
+
+Uma sessão de profiling é ligada por um endpoint administrativo e encerra
+sozinha após N execuções do alvo ou T segundos. Modos:
+ - 'cprofile':    cProfile em cada execução do alvo; resultado `.pstats`
+ - 'amostragem':  thread que amostra as pilhas das threads dentro do alvo a
+                  cada `intervalo_ms`; resultado em pilhas colapsadas (flamegraph)
+ - 'tracemalloc': snapshot no início e no fim; resultado é o diff por linha
+
+Sem sessão ativa, os pontos de instrumentação custam apenas uma comparação.
+"""
+from __future__ import annotations
+import cProfile
+import functools
+import io
+import marshal
+import os
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, Iterator, Optional, Set, Tuple
+
+MODOS = ('cprofile', 'amostragem', 'tracemalloc')
+ALVOS = ('process_frame', 'esp32')
+
+# Limites de segurança para sessões disparadas remotamente
+MAX_REQUISICOES = 10000
+MAX_SEGUNDOS = 600.0
+TRACEMALLOC_FRAMES = 25
+TRACEMALLOC_TOP = 50
+
+
+class _Sessao:
+    def __init__(self, modo: str, alvo: str, requisicoes: Optional[int], segundos: Optional[float],
+                 intervalo_ms: float):
+        self.modo = modo
+        self.alvo = alvo
+        self.requisicoes = requisicoes
+        self.segundos = segundos
+        self.intervalo = max(0.001, intervalo_ms / 1000.0)
+        self.inicio = time.monotonic()
+        self.iniciada_em = datetime.utcnow()
+        self.executadas = 0
+        self.ativa = True
+        self.stats: Optional[pstats.Stats] = None
+        self.pilhas: Counter = Counter()
+        self.amostras = 0
+        self.threads_no_alvo: Set[int] = set()
+        self.snapshot_inicial: Optional[tracemalloc.Snapshot] = None
+        self.relatorio: Optional[str] = None
+        self.parar_tracemalloc = False
+
+    def expirada(self) -> bool:
+        if self.segundos is not None and time.monotonic() - self.inicio >= self.segundos:
+            return True
+        if self.requisicoes is not None and self.executadas >= self.requisicoes:
+            return True
+        return False
+
+
+class LiveProfiler:
+    """Controla no máximo uma sessão de profiling por vez."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._sessao: Optional[_Sessao] = None
+        self._timer: Optional[threading.Timer] = None
+
+    # --- Controle ---
+    def start(self, modo: str, alvo: str = 'process_frame', requisicoes: Optional[int] = None,
+              segundos: Optional[float] = None, intervalo_ms: float = 5.0) -> Dict:
+        """Inicia sessão. Exige `requisicoes` e/ou `segundos` (limitados por MAX_*).
+        Lança ValueError para parâmetros inválidos ou sessão já ativa.
+        """
+        if modo not in MODOS:
+            raise ValueError(f'modo deve ser um de {", ".join(MODOS)}')
+        if alvo not in ALVOS:
+            raise ValueError(f'alvo deve ser um de {", ".join(ALVOS)}')
+        if requisicoes is None and segundos is None:
+            raise ValueError('informe requisicoes e/ou segundos')
+        if requisicoes is not None:
+            requisicoes = max(1, min(MAX_REQUISICOES, int(requisicoes)))
+        if segundos is not None:
+            segundos = max(0.1, min(MAX_SEGUNDOS, float(segundos)))
+        with self._lock:
+            if self._sessao is not None and self._sessao.ativa:
+                raise ValueError('já existe uma sessão de profiling ativa')
+            sessao = _Sessao(modo, alvo, requisicoes, segundos, intervalo_ms)
+            if modo == 'tracemalloc':
+                if not tracemalloc.is_tracing():
+                    tracemalloc.start(TRACEMALLOC_FRAMES)
+                    sessao.parar_tracemalloc = True
+                sessao.snapshot_inicial = tracemalloc.take_snapshot()
+            self._sessao = sessao
+        if modo == 'amostragem':
+            threading.Thread(target=self._sampling_loop, args=(sessao,), daemon=True,
+                             name='profiler-amostragem').start()
+        if segundos is not None:
+            self._timer = threading.Timer(segundos, self._finish, args=(sessao,))
+            self._timer.daemon = True
+            self._timer.start()
+        return self.status()
+
+    def stop(self) -> Dict:
+        """Encerra a sessão ativa antes do limite (o resultado parcial fica disponível)."""
+        sessao = self._sessao
+        if sessao is not None:
+            self._finish(sessao)
+        return self.status()
+
+    def status(self) -> Dict:
+        sessao = self._sessao
+        if sessao is None:
+            return {'ativa': False}
+        return {
+            'ativa': sessao.ativa,
+            'modo': sessao.modo,
+            'alvo': sessao.alvo,
+            'requisicoes': sessao.requisicoes,
+            'segundos': sessao.segundos,
+            'executadas': sessao.executadas,
+            'amostras': sessao.amostras,
+            'iniciada_em': sessao.iniciada_em.isoformat(),
+            'decorrido': round(time.monotonic() - sessao.inicio, 3),
+            'resultado_disponivel': (not sessao.ativa),
+        }
+
+    def result(self) -> Optional[Tuple[bytes, str, str]]:
+        """Retorna (conteúdo, nome_arquivo, mimetype) da última sessão encerrada, ou None."""
+        sessao = self._sessao
+        if sessao is None or sessao.ativa:
+            return None
+        ts = sessao.iniciada_em.strftime('%Y%m%d_%H%M%S')
+        if sessao.modo == 'cprofile':
+            stats = sessao.stats.stats if sessao.stats is not None else {}
+            return marshal.dumps(stats), f'profile_{sessao.alvo}_{ts}.pstats', 'application/octet-stream'
+        if sessao.modo == 'amostragem':
+            linhas = [f'{pilha} {n}' for pilha, n in sessao.pilhas.most_common()]
+            texto = '\n'.join(linhas) + ('\n' if linhas else '')
+            return texto.encode('utf-8'), f'profile_{sessao.alvo}_{ts}.folded', 'text/plain'
+        return (sessao.relatorio or '').encode('utf-8'), f'tracemalloc_{sessao.alvo}_{ts}.txt', 'text/plain'
+
+    # --- Instrumentação ---
+    @contextmanager
+    def profile(self, alvo: str) -> Iterator[None]:
+        """Envolve uma execução do alvo. Sem sessão ativa para o alvo, não faz nada."""
+        sessao = self._sessao
+        if sessao is None or not sessao.ativa or sessao.alvo != alvo:
+            yield
+            return
+        tid = threading.get_ident()
+        prof = None
+        if sessao.modo == 'cprofile':
+            prof = cProfile.Profile()
+            try:
+                prof.enable()
+            except ValueError:
+                # Outro profiler já ativo nesta thread
+                prof = None
+        elif sessao.modo == 'amostragem':
+            with self._lock:
+                sessao.threads_no_alvo.add(tid)
+        try:
+            yield
+        finally:
+            if prof is not None:
+                prof.disable()
+            with self._lock:
+                sessao.threads_no_alvo.discard(tid)
+                if sessao.ativa:
+                    if prof is not None:
+                        if sessao.stats is None:
+                            sessao.stats = pstats.Stats(prof)
+                        else:
+                            sessao.stats.add(prof)
+                    sessao.executadas += 1
+            if sessao.expirada():
+                self._finish(sessao)
+
+    def profiled(self, alvo: str):
+        """Decorator equivalente a `with profile(alvo):` em torno da função."""
+        def decorator(fn):
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                with self.profile(alvo):
+                    return fn(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    # --- Internos ---
+    def _finish(self, sessao: _Sessao):
+        with self._lock:
+            if not sessao.ativa:
+                return
+            sessao.ativa = False
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+        if sessao.modo == 'tracemalloc' and sessao.snapshot_inicial is not None:
+            final = tracemalloc.take_snapshot()
+            diff = final.compare_to(sessao.snapshot_inicial, 'lineno')
+            out = io.StringIO()
+            atual, pico = tracemalloc.get_traced_memory()
+            out.write(f'# tracemalloc diff ({sessao.executadas} execuções de {sessao.alvo})\n')
+            out.write(f'# memória rastreada: atual={atual} bytes, pico={pico} bytes\n')
+            for stat in diff[:TRACEMALLOC_TOP]:
+                out.write(f'{stat}\n')
+            sessao.relatorio = out.getvalue()
+            sessao.snapshot_inicial = None
+            if sessao.parar_tracemalloc:
+                tracemalloc.stop()
+
+    def _sampling_loop(self, sessao: _Sessao):
+        while sessao.ativa:
+            time.sleep(sessao.intervalo)
+            with self._lock:
+                tids = set(sessao.threads_no_alvo)
+            if not tids:
+                if sessao.expirada():
+                    self._finish(sessao)
+                continue
+            frames = sys._current_frames()
+            for tid in tids:
+                frame = frames.get(tid)
+                if frame is None:
+                    continue
+                pilha = []
+                while frame is not None:
+                    code = frame.f_code
+                    pilha.append(f'{os.path.basename(code.co_filename)}:{code.co_name}')
+                    frame = frame.f_back
+                sessao.pilhas[';'.join(reversed(pilha))] += 1
+                sessao.amostras += 1
+
+
+# Instância global
+_profiler: Optional[LiveProfiler] = None
+
+
+def get_profiler() -> LiveProfiler:
+    """Retorna a instância singleton do profiler sob demanda"""
+    global _profiler
+    if _profiler is None:
+        _profiler = LiveProfiler()
+    return _profiler
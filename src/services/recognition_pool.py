@@ -0,0 +1,352 @@
+"""Pool de processos para detecção + predição com frames em memória compartilhada.
+
+O processo web copia cada frame para um slot `multiprocessing.shared_memory`
+(um memcpy, sem pickle do array) e envia ao worker menos ocupado apenas
+(id, slot, shape). Cada worker tem seu próprio detector de faces e modelo
+LBPH, roda `analyze_frame` sobre uma view do slot e devolve a lista de faces
+(poucos bytes). A parte com estado (candidato, cooldowns, detecções
+pendentes, desenho das caixas) continua no processo web.
+
+Modelos novos são publicados gravando o LBPH em arquivo (`recognizer.write`)
+e enviando (galeria, versão, caminho) para a fila de cada worker; como a fila é
+FIFO, frames enviados depois da publicação já usam o modelo novo. Cada worker
+guarda um modelo por galeria e cada frame indica a galeria a usar.
+
+Se não houver slot livre, worker vivo ou resposta dentro do timeout,
+`analyze()` retorna None e o chamador processa o frame na própria thread
+(sem esperar por slot: pool ocupado é fallback imediato).
+
+Workers que morrem são recriados com o modelo atual de cada galeria, e os
+frames que estavam com eles são respondidos com erro e seus slots devolvidos.
+
+Os workers são criados com `forkserver` (ou `spawn`), nunca com `fork`: a
+recriação acontece com o processo web cheio de threads (requisições,
+despachante, cliente da ESP32, SSE), e um fork herdaria locks presos por elas.
+O worker só precisa deste módulo; o `__main__` do processo web (app.py, que
+inicializa banco, modelos e câmeras no import) não é reexecutado no filho.
+"""
+from __future__ import annotations
+import atexit
+import contextlib
+import itertools
+import logging
+import multiprocessing as mp
+import os
+import queue
+import shutil
+import sys
+import tempfile
+import threading
+import types
+from multiprocessing import shared_memory
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Quantidade de arquivos de modelo mantidos (o worker pode ainda estar lendo o anterior)
+_MODEL_FILES_KEPT = 2
+# Intervalo com que o despachante confere se algum worker morreu
+_REAP_INTERVAL = 1.0
+
+
+@contextlib.contextmanager
+def _sem_main():
+    """Esconde o `__main__` enquanto um worker é iniciado, para o filho não reexecutar o script principal."""
+    principal = sys.modules['__main__']
+    sys.modules['__main__'] = types.ModuleType('__main__')
+    try:
+        yield
+    finally:
+        sys.modules['__main__'] = principal
+
+
+def _worker_main(idx: int, slot_names: List[str], tasks, results):
+    """Loop do worker: mensagens ('model', galeria, versão, caminho|None) e ('frame', req_id, slot, shape, galeria)."""
+    import cv2
+    from services.face_recognition_service import analyze_frame
+    from services.face_detectors import get_face_detector
+    from services.face_quality import get_face_quality
+    from services.lbph import LBPH_PARAMS
+
+    detector = get_face_detector()
+    quality = get_face_quality()
+    slots = [shared_memory.SharedMemory(name=nome) for nome in slot_names]
+    # Um modelo por galeria ('' = geral): galeria -> (recognizer, versão)
+    models: Dict[str, Tuple] = {}
+    try:
+        while True:
+            msg = tasks.get()
+            if msg is None:
+                break
+            if msg[0] == 'model':
+                _, shard, version, caminho = msg
+                recognizer = None
+                if caminho is not None:
+                    try:
+                        recognizer = cv2.face.LBPHFaceRecognizer_create(**LBPH_PARAMS)
+                        recognizer.read(caminho)
+                    except Exception as e:
+                        logger.error(f"Worker {idx}: falha ao carregar modelo {caminho}: {e}")
+                        recognizer = None
+                if recognizer is None and shard:
+                    models.pop(shard, None)  # galeria removida ou vazia
+                else:
+                    models[shard] = (recognizer, version)
+                continue
+            _, req_id, slot, shape, shard = msg
+            try:
+                frame = np.ndarray(shape, dtype=np.uint8, buffer=slots[slot].buf)
+                recognizer, version = models.get(shard, (None, 0))
+                results.put((req_id, analyze_frame(frame, detector, recognizer, version, quality)))
+                del frame  # libera a view antes de o slot ser reutilizado
+            except Exception as e:
+                results.put((req_id, e.__class__.__name__ + f': {e}'))
+    finally:
+        for shm in slots:
+            shm.close()
+
+
+class RecognitionPool:
+    """N processos worker + slots de memória compartilhada para frames."""
+
+    def __init__(self, workers: int, slots: Optional[int] = None, slot_bytes: int = 8 * 1024 * 1024,
+                 timeout: float = 5.0, start_method: Optional[str] = None):
+        self.workers = max(1, int(workers))
+        self.slot_bytes = int(slot_bytes)
+        self.timeout = float(timeout)
+        n_slots = int(slots) if slots else 2 * self.workers
+        metodos = mp.get_all_start_methods()
+        self._ctx = mp.get_context(start_method or ('forkserver' if 'forkserver' in metodos else 'spawn'))
+        if self._ctx.get_start_method() == 'forkserver':
+            # Servidor já com as dependências do worker importadas: cada worker novo nasce pronto
+            self._ctx.set_forkserver_preload(['services.recognition_pool', 'services.face_recognition_service'])
+        self._slots = [shared_memory.SharedMemory(create=True, size=self.slot_bytes) for _ in range(n_slots)]
+        self._free: queue.Queue = queue.Queue()
+        for i in range(n_slots):
+            self._free.put(i)
+        self._results = self._ctx.Queue()
+        self._tasks = [self._ctx.Queue() for _ in range(self.workers)]
+        self._procs: List = []
+        self._in_flight = [0] * self.workers
+        self._pending: Dict[int, Dict] = {}
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self._model_dir = tempfile.mkdtemp(prefix='face_pool_')
+        self._model_files: Dict[str, List[str]] = {}
+        self._model_versions: Dict[str, int] = {}
+        self._model_lock = threading.Lock()  # publicações de galerias diferentes podem ocorrer em paralelo
+        self._processed = 0
+        self._fallbacks = 0
+        self._errors = 0
+        self._restarts = 0
+        self._restart_lock = threading.Lock()
+        self._closed = False
+        self._dispatcher: Optional[threading.Thread] = None
+
+    def start(self) -> 'RecognitionPool':
+        for i in range(self.workers):
+            self._procs.append(self._spawn(i))
+        self._dispatcher = threading.Thread(target=self._dispatch_loop, daemon=True, name='recognition-pool')
+        self._dispatcher.start()
+        atexit.register(self.close)
+        logger.info(f"Pool de reconhecimento iniciado: {self.workers} worker(s), {len(self._slots)} slot(s)")
+        return self
+
+    def _spawn(self, idx: int):
+        proc = self._ctx.Process(target=_worker_main,
+                                 args=(idx, [shm.name for shm in self._slots], self._tasks[idx], self._results),
+                                 name=f'recognition-worker-{idx}', daemon=True)
+        if self._ctx.get_start_method() == 'fork':
+            proc.start()
+        else:
+            with _sem_main():
+                proc.start()
+        return proc
+
+    def _reap(self) -> None:
+        """Devolve os slots dos frames de workers mortos e recria esses workers com os modelos atuais."""
+        if self._closed or not self._procs or all(p.is_alive() for p in self._procs):
+            return
+        if not self._restart_lock.acquire(blocking=False):
+            return  # outra thread já está recriando
+        try:
+            with self._model_lock:
+                for idx, proc in enumerate(self._procs):
+                    if proc.is_alive() or self._closed:
+                        continue
+                    logger.error(f"Worker {idx} morreu (exitcode {proc.exitcode}); recriando")
+                    livres = []
+                    with self._lock:
+                        for req_id, entrada in list(self._pending.items()):
+                            if entrada['worker'] != idx or entrada.get('respondida'):
+                                continue
+                            entrada['respondida'] = True
+                            entrada['result'] = f'worker {idx} morreu durante o frame'
+                            if entrada.get('abandonada'):
+                                del self._pending[req_id]
+                            entrada['event'].set()
+                            livres.append(entrada['slot'])
+                        self._in_flight[idx] = 0
+                        # Fila nova: mensagens antigas eram do worker morto
+                        antiga = self._tasks[idx]
+                        self._tasks[idx] = self._ctx.Queue()
+                    antiga.cancel_join_thread()
+                    antiga.close()
+                    for slot in livres:
+                        self._free.put(slot)
+                    for shard, arquivos in self._model_files.items():
+                        if arquivos:
+                            self._tasks[idx].put(('model', shard, self._model_versions.get(shard, 0), arquivos[-1]))
+                    self._procs[idx] = self._spawn(idx)
+                    self._restarts += 1
+        finally:
+            self._restart_lock.release()
+
+    # --- Modelo ---
+    def publish_model(self, recognizer, version: int, shard: str = '') -> None:
+        """Grava o modelo da galeria `shard` em arquivo e o envia a todos os workers (None = sem modelo)."""
+        caminho = None
+        with self._model_lock:
+            if recognizer is not None:
+                caminho = os.path.join(self._model_dir, f'lbph_{shard or "geral"}_{version}.yml')
+                recognizer.write(caminho)
+                arquivos = self._model_files.setdefault(shard, [])
+                arquivos.append(caminho)
+                while len(arquivos) > _MODEL_FILES_KEPT:
+                    antigo = arquivos.pop(0)
+                    try:
+                        os.remove(antigo)
+                    except OSError:
+                        pass
+            if recognizer is None and shard:
+                # Galeria removida ou vazia: descarta os arquivos e a versão dela
+                for antigo in self._model_files.pop(shard, []):
+                    try:
+                        os.remove(antigo)
+                    except OSError:
+                        pass
+                self._model_versions.pop(shard, None)
+            else:
+                self._model_versions[shard] = version
+            for q in self._tasks:
+                q.put(('model', shard, version, caminho))
+
+    # --- Frames ---
+    def analyze(self, frame: np.ndarray, shard: str = '') -> Optional[Dict]:
+        """Envia o frame a um worker e aguarda o resultado de `analyze_frame` com o modelo da galeria
+        `shard`, ou None (fallback)."""
+        if self._closed or frame.dtype != np.uint8 or frame.nbytes > self.slot_bytes:
+            return self._fallback()
+        self._reap()
+        vivos = [i for i, p in enumerate(self._procs) if p.is_alive()]
+        if not vivos:
+            return self._fallback()
+        try:
+            slot = self._free.get_nowait()
+        except queue.Empty:
+            return self._fallback()
+        destino = np.ndarray(frame.shape, dtype=np.uint8, buffer=self._slots[slot].buf)
+        destino[...] = frame
+        del destino
+        req_id = next(self._ids)
+        evento = threading.Event()
+        with self._lock:
+            worker = min(vivos, key=lambda i: self._in_flight[i])
+            self._in_flight[worker] += 1
+            self._pending[req_id] = {'event': evento, 'slot': slot, 'worker': worker, 'result': None}
+            # Sob o lock: _reap pode trocar a fila de um worker recriado
+            self._tasks[worker].put(('frame', req_id, slot, frame.shape, shard))
+        evento.wait(self.timeout)
+        with self._lock:
+            entrada = self._pending[req_id]
+            if not evento.is_set():
+                # O slot só volta ao pool quando o worker responder (ou _reap o dar como morto)
+                entrada['abandonada'] = True
+                entrada = None
+            else:
+                del self._pending[req_id]
+        if entrada is None:
+            return self._fallback()
+        resultado = entrada['result']
+        if not isinstance(resultado, dict):
+            with self._lock:
+                self._errors += 1
+            logger.error(f"Erro no worker {worker}: {resultado}")
+            return self._fallback()
+        return resultado
+
+    def _fallback(self) -> None:
+        with self._lock:
+            self._fallbacks += 1
+        return None
+
+    def _dispatch_loop(self):
+        while not self._closed:
+            try:
+                msg = self._results.get(timeout=_REAP_INTERVAL)
+            except queue.Empty:
+                self._reap()
+                continue
+            except (EOFError, OSError):
+                break
+            if msg is None:
+                break
+            req_id, resultado = msg
+            with self._lock:
+                entrada = self._pending.get(req_id)
+                if entrada is None or entrada.get('respondida'):
+                    continue  # já devolvido por _reap
+                entrada['respondida'] = True
+                self._in_flight[entrada['worker']] -= 1
+                self._processed += 1
+                entrada['result'] = resultado
+                if entrada.get('abandonada'):
+                    del self._pending[req_id]
+                entrada['event'].set()
+            self._free.put(entrada['slot'])
+
+    # --- Status / encerramento ---
+    def status(self) -> Dict:
+        with self._lock:
+            return {
+                'workers': self.workers,
+                'workers_alive': sum(1 for p in self._procs if p.is_alive()),
+                'slots': len(self._slots),
+                'slots_free': self._free.qsize(),
+                'slot_bytes': self.slot_bytes,
+                'in_flight': list(self._in_flight),
+                'processed': self._processed,
+                'fallbacks': self._fallbacks,
+                'errors': self._errors,
+                'restarts': self._restarts,
+                'model_version': self._model_versions.get(''),
+                'shard_model_versions': {k: v for k, v in self._model_versions.items() if k},
+                'start_method': self._ctx.get_start_method(),
+            }
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        for q in self._tasks:
+            try:
+                q.put(None)
+            except Exception:
+                pass
+        for proc in self._procs:
+            proc.join(timeout=2)
+            if proc.is_alive():
+                proc.terminate()
+        try:
+            self._results.put(None)
+        except Exception:
+            pass
+        for shm in self._slots:
+            try:
+                shm.close()
+                shm.unlink()
+            except Exception:
+                pass
+        shutil.rmtree(self._model_dir, ignore_errors=True)
@@ -8,28 +8,37 @@ from datetime import datetime, timedelta
 from typing import Dict, Optional
 import numpy as np
 
+from services.frame_store import LatestFrameStore, StoredFrame
+
 class CameraSession:
     """Representa uma sessão de câmera de um cliente"""
     def __init__(self, session_id: str, source_type: str = 'browser'):
         self.session_id = session_id
         self.source_type = source_type  # 'browser', 'esp32'
-        self.last_frame: Optional[np.ndarray] = None
+        self.frames = LatestFrameStore()
         self.last_update = datetime.utcnow()
         self.metadata = {}
         self.lock = threading.Lock()
         
     def update_frame(self, frame: np.ndarray, metadata: dict = None):
-        """Atualiza o frame da sessão"""
+        """Atualiza o frame da sessão (o frame passa a ser somente leitura)"""
+        self.frames.publish(frame)
         with self.lock:
-            self.last_frame = frame
             self.last_update = datetime.utcnow()
             if metadata:
                 self.metadata.update(metadata)
     
+    @property
+    def last_frame(self) -> Optional[np.ndarray]:
+        return self.frames.get()
+
     def get_frame(self) -> Optional[np.ndarray]:
-        """Retorna cópia do último frame"""
-        with self.lock:
-            return self.last_frame.copy() if self.last_frame is not None else None
+        """Retorna o último frame (somente leitura, sem cópia)"""
+        return self.frames.get()
+
+    def get_latest(self) -> Optional[StoredFrame]:
+        """Último frame com número de sequência (para pular frames já processados)"""
+        return self.frames.latest()
     
     def is_active(self, timeout_seconds: int = 300) -> bool:
         """Verifica se a sessão ainda está ativa"""
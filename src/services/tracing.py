@@ -0,0 +1,167 @@
+"""Tracing leve por frame com exportação no formato Chrome `trace_event`.
+
+Cada frame recebe um trace id (`tracer.trace(...)`), e os spans registrados
+durante o processamento (decodificação, detecção, predição, commits no banco,
+treino do modelo, loop do ESP32...) vão para um buffer circular limitado. O
+buffer pode ser baixado como JSON e aberto em `chrome://tracing` ou no Perfetto,
+mostrando a sobreposição entre a thread de captura, as threads do Flask e `train()`.
+
+Desligado, `span()` custa apenas uma checagem de flag.
+"""
+from __future__ import annotations
+import functools
+import os
+import threading
+import time
+import uuid
+from collections import deque
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional
+
+from constants.config import TRACE_ENABLED, TRACE_BUFFER_SIZE
+from services.metrics import FRAME_STAGE_SECONDS, DB_COMMIT_SECONDS
+
+
+class Tracer:
+    """Registra spans (eventos 'X' do trace_event) em um buffer circular."""
+
+    def __init__(self, capacity: int = TRACE_BUFFER_SIZE, enabled: bool = TRACE_ENABLED):
+        self.enabled = enabled
+        self._events: deque = deque(maxlen=max(1, int(capacity)))
+        # Nome por thread id, só de threads que registraram spans (podado junto com o buffer)
+        self._thread_names: Dict[int, str] = {}
+        self._local = threading.local()
+        self._pid = os.getpid()
+
+    # --- Contexto de trace ---
+    def current_trace_id(self) -> Optional[str]:
+        return getattr(self._local, 'trace_id', None)
+
+    @contextmanager
+    def trace(self, name: str, cat: str = 'frame', trace_id: Optional[str] = None, **args) -> Iterator[Optional[str]]:
+        """Abre um trace (ex.: um frame) na thread atual e registra um span raiz.
+        Spans abertos dentro do bloco herdam o trace id.
+        """
+        if not self.enabled:
+            yield None
+            return
+        anterior = self.current_trace_id()
+        tid = trace_id or uuid.uuid4().hex[:16]
+        self._local.trace_id = tid
+        try:
+            with self.span(name, cat=cat, **args):
+                yield tid
+        finally:
+            self._local.trace_id = anterior
+
+    @contextmanager
+    def span(self, name: str, cat: str = 'app', **args) -> Iterator[None]:
+        """Mede o bloco e registra um evento completo ('X') com o trace id atual."""
+        if not self.enabled:
+            yield
+            return
+        inicio = time.perf_counter_ns()
+        try:
+            yield
+        finally:
+            fim = time.perf_counter_ns()
+            self._record(name, cat, inicio, fim, args)
+
+    def _record(self, name: str, cat: str, inicio_ns: int, fim_ns: int, args: Dict):
+        thread = threading.current_thread()
+        tid = thread.native_id or threading.get_ident()
+        # O servidor Flask cria uma thread por requisição (e ids são reaproveitados): o nome é
+        # sempre atualizado e, passando do dobro do que cabe no buffer, ficam só os das threads que
+        # ainda têm eventos nele (poda amortizada: ao menos `capacity` threads novas entre podas)
+        self._thread_names[tid] = thread.name
+        if len(self._thread_names) > 2 * self._events.maxlen:
+            self._prune_thread_names()
+        trace_id = self.current_trace_id()
+        if trace_id:
+            args = dict(args, trace_id=trace_id)
+        # deque com maxlen: append é atômico e descarta o evento mais antigo
+        self._events.append({
+            'name': name,
+            'cat': cat,
+            'ph': 'X',
+            'ts': inicio_ns / 1000.0,
+            'dur': (fim_ns - inicio_ns) / 1000.0,
+            'pid': self._pid,
+            'tid': tid,
+            'args': args,
+        })
+
+    def traced(self, name: str, cat: str = 'frame'):
+        """Decorator: cada chamada da função abre um novo trace."""
+        def decorator(fn):
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                with self.trace(name, cat=cat):
+                    return fn(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    # --- Controle / exportação ---
+    def set_enabled(self, enabled: bool):
+        self.enabled = bool(enabled)
+
+    def _prune_thread_names(self):
+        vivos = {e['tid'] for e in list(self._events)}
+        vivos.add(threading.current_thread().native_id or threading.get_ident())
+        self._thread_names = {tid: nome for tid, nome in list(self._thread_names.items()) if tid in vivos}
+
+    def clear(self):
+        self._events.clear()
+        self._thread_names = {}
+
+    def events(self):
+        """Cópia dos eventos atualmente no buffer (mais antigos primeiro)."""
+        return list(self._events)
+
+    def to_chrome_trace(self) -> Dict:
+        """Retorna o buffer no formato JSON do trace_event (chrome://tracing / Perfetto)."""
+        eventos = self.events()
+        meta = [{
+            'name': 'process_name', 'ph': 'M', 'pid': self._pid, 'tid': 0,
+            'args': {'name': 'face-recognition'}
+        }]
+        tids = {e['tid'] for e in eventos}
+        for tid, nome in list(self._thread_names.items()):
+            if tid not in tids:
+                continue
+            meta.append({'name': 'thread_name', 'ph': 'M', 'pid': self._pid, 'tid': tid, 'args': {'name': nome}})
+        return {'traceEvents': meta + eventos, 'displayTimeUnit': 'ms'}
+
+    def status(self) -> Dict:
+        return {
+            'enabled': self.enabled,
+            'events': len(self._events),
+            'capacity': self._events.maxlen,
+            'threads': len(self._thread_names),
+        }
+
+
+# Instância global
+_tracer: Optional[Tracer] = None
+
+
+def get_tracer() -> Tracer:
+    """Retorna a instância singleton do tracer"""
+    global _tracer
+    if _tracer is None:
+        _tracer = Tracer()
+    return _tracer
+
+
+@contextmanager
+def frame_stage(stage: str) -> Iterator[None]:
+    """Etapa do processamento de frame: alimenta o histograma por etapa e o trace."""
+    with FRAME_STAGE_SECONDS.labels(stage=stage).time(), get_tracer().span(stage, cat='frame'):
+        yield
+
+
+@contextmanager
+def db_commit(operation: str) -> Iterator[None]:
+    """Commit no banco: alimenta o histograma de commits e o trace."""
+    with DB_COMMIT_SECONDS.labels(operation=operation).time(), get_tracer().span(f'db_commit:{operation}', cat='db'):
+        yield
@@ -0,0 +1,133 @@
+"""Dicionário limitado com expiração (TTL) e descarte LRU.
+
+Usado no estado em memória do reconhecimento que antes só crescia:
+detecções pendentes (cada uma com um recorte 200x200x3 que fica na memória
+até ser confirmado) e cooldowns por CPF. Cada entrada expira após seu TTL;
+acima de `max_entries` a usada há mais tempo é descartada. A varredura de
+expirados é amortizada: roda dentro das próprias operações, no máximo a cada
+`sweep_interval` segundos, sem thread extra.
+
+Quantidade de entradas e bytes ocupados vão para `/metrics`
+(`face_store_entries{store}`, `face_store_bytes{store}`).
+"""
+from __future__ import annotations
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+from services.metrics import STORE_ENTRIES, STORE_BYTES, STORE_EVICTIONS_TOTAL
+
+
+class TTLStore:
+    """Mapa chave -> valor com TTL por entrada, limite de tamanho (LRU) e varredura amortizada."""
+
+    def __init__(self, name: str, ttl_seconds: float, max_entries: int,
+                 sizeof: Optional[Callable[[Any], int]] = None, sweep_interval: Optional[float] = None):
+        self.name = name
+        self.ttl_seconds = float(ttl_seconds)
+        self.max_entries = max(1, int(max_entries))
+        self.sizeof = sizeof
+        self.sweep_interval = float(sweep_interval) if sweep_interval is not None else max(1.0, min(30.0, self.ttl_seconds / 4))
+        self._lock = threading.Lock()
+        self._data: 'OrderedDict[Hashable, Tuple[Any, float, int]]' = OrderedDict()  # chave -> (valor, expira_em, bytes)
+        self._bytes = 0
+        self._last_sweep = time.monotonic()
+        self._entries_gauge = STORE_ENTRIES.labels(store=name)
+        self._bytes_gauge = STORE_BYTES.labels(store=name)
+
+    # --- Operações ---
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        agora = time.monotonic()
+        tamanho = int(self.sizeof(value)) if self.sizeof else 0
+        expira = agora + (self.ttl_seconds if ttl is None else float(ttl))
+        with self._lock:
+            self._remove(key)
+            self._data[key] = (value, expira, tamanho)
+            self._bytes += tamanho
+            while len(self._data) > self.max_entries:
+                antiga = next(iter(self._data))
+                self._remove(antiga)
+                STORE_EVICTIONS_TOTAL.labels(store=self.name, reason='lru').inc()
+            self._maybe_sweep(agora)
+            self._update_gauges()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        agora = time.monotonic()
+        with self._lock:
+            self._maybe_sweep(agora)
+            entrada = self._data.get(key)
+            if entrada is None:
+                return default
+            if entrada[1] <= agora:
+                self._remove(key)
+                STORE_EVICTIONS_TOTAL.labels(store=self.name, reason='ttl').inc()
+                self._update_gauges()
+                return default
+            self._data.move_to_end(key)
+            return entrada[0]
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        agora = time.monotonic()
+        with self._lock:
+            entrada = self._data.get(key)
+            if entrada is None:
+                return default
+            self._remove(key)
+            self._update_gauges()
+            return entrada[0] if entrada[1] > agora else default
+
+    def __contains__(self, key: Hashable) -> bool:
+        return self.get(key, _MISSING) is not _MISSING
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._data)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self._bytes = 0
+            self._update_gauges()
+
+    def sweep(self) -> int:
+        """Remove as entradas expiradas agora. Retorna quantas saíram."""
+        with self._lock:
+            removidas = self._sweep(time.monotonic())
+            self._update_gauges()
+            return removidas
+
+    # --- Internos (chamar com o lock) ---
+    def _remove(self, key: Hashable) -> None:
+        entrada = self._data.pop(key, None)
+        if entrada is not None:
+            self._bytes -= entrada[2]
+
+    def _maybe_sweep(self, agora: float) -> None:
+        if agora - self._last_sweep >= self.sweep_interval:
+            self._sweep(agora)
+
+    def _sweep(self, agora: float) -> int:
+        self._last_sweep = agora
+        expiradas = [k for k, (_, expira, _) in self._data.items() if expira <= agora]
+        for k in expiradas:
+            self._remove(k)
+        if expiradas:
+            STORE_EVICTIONS_TOTAL.labels(store=self.name, reason='ttl').inc(len(expiradas))
+        return len(expiradas)
+
+    def _update_gauges(self) -> None:
+        self._entries_gauge.set(len(self._data))
+        self._bytes_gauge.set(self._bytes)
+
+    def status(self) -> Dict:
+        with self._lock:
+            return {
+                'entries': len(self._data),
+                'bytes': self._bytes,
+                'max_entries': self.max_entries,
+                'ttl_seconds': self.ttl_seconds,
+            }
+
+
+_MISSING = object()
@@ -3,6 +3,7 @@
 // Requires:
 //  - local: #video-stream, #canvas (hidden capture), optional #processed-frame
 //  - espcam: #raw-stream (img), #overlay (canvas)
+// data-mode="server" (CAMERA_MODE=esp32): o servidor reconhece direto do stream; a página só desenha as caixas recebidas
 
 const body = document.body;
 const source = body.dataset.source || 'local';
@@ -14,6 +15,47 @@ const stabText = document.getElementById('stability-text');
 
 let processing = false;
 
+// Identifica este cliente para o backpressure por sessão no servidor
+const sessionId = (window.crypto && crypto.randomUUID) ? crypto.randomUUID() : (Date.now().toString(36) + Math.random().toString(36).slice(2));
+
+// Galeria do quiosque: ?camera=<id> (vínculo cadastrado no servidor) ou ?galeria=<nome>
+const pageParams = new URLSearchParams(window.location.search);
+const gallery = { camera: pageParams.get('camera') || undefined, galeria: pageParams.get('galeria') || undefined };
+const galleryQuery = new URLSearchParams(Object.entries(gallery).filter(([, v]) => v)).toString();
+
+// Canal de eventos: a própria sessão, ou 'esp32' quando o servidor reconhece direto do stream
+const serverSide = isEsp && body.dataset.mode === 'server';
+const channel = serverSide ? 'esp32' : sessionId;
+
+// Eventos do servidor (SSE em /api/events); sem suporte ou se a conexão nunca abrir, cai para polling
+const events = (function(){
+  const fallbacks = [];
+  let es = null, opened = false, failures = 0, fellBack = false;
+  function fallback(){
+    if(fellBack) return; fellBack = true;
+    if(es){ es.close(); }
+    fallbacks.forEach(fn=>fn());
+  }
+  if(body.dataset.page === 'recognition' && window.EventSource){
+    es = new EventSource('/api/events?canal='+encodeURIComponent(channel));
+    es.onopen = ()=>{ opened = true; failures = 0; };
+    // Depois de aberta, o próprio EventSource reconecta (com Last-Event-ID); só desiste se nunca abriu
+    es.onerror = ()=>{ if(es.readyState === EventSource.CLOSED || (!opened && ++failures >= 3)) fallback(); };
+  } else {
+    setTimeout(fallback, 0);
+  }
+  return {
+    on(type, fn){ es && es.addEventListener(type, e=>{ let d; try{ d = JSON.parse(e.data); }catch(err){ return; } fn(d); }); },
+    onFallback(fn){ if(fellBack) fn(); else fallbacks.push(fn); }
+  };
+})();
+
+// Atraso até o próximo frame: segue next_interval_ms do servidor (descontando o tempo já gasto)
+function nextDelay(data, startedAt, fallbackMs){
+  const hint = data && typeof data.next_interval_ms === 'number' ? data.next_interval_ms : fallbackMs;
+  return Math.max(0, hint - (performance.now() - startedAt));
+}
+
 function updateStability(ui){
   if(!ui){ stabWrap && (stabWrap.style.display = 'none'); return; }
   if(ui.tracking){
@@ -28,7 +70,7 @@ function updateStability(ui){
   }
 }
 
-// Modal polling (common)
+// Modal de confirmação (common): detecções por SSE, polling como fallback
 (function setupModalPolling(){
   const modal = document.getElementById('confirm-modal');
   const mNome = document.getElementById('m-nome');
@@ -61,10 +103,23 @@ function updateStability(ui){
     if(btnCancel){ btnCancel.disabled = false; }
   }
 
+  function showDetection(data){
+    // Já há uma confirmação aberta: ignora até ela ser fechada
+    if(data && data.found && !detCache){ detCache=data; openModal(data); }
+  }
+  events.on('detection', showDetection);
+  // Ponto confirmado em outra tela do mesmo canal: fecha o popup da mesma detecção
+  events.on('ponto', function(p){
+    if(detCache && p.detection_id && p.detection_id === detCache.detection_id){
+      mStatus.textContent = 'Ponto registrado com sucesso!';
+      setTimeout(closeModal, 1000);
+    }
+  });
+
   async function pollDetection(){
-    try{ const r = await fetch('/api/last_detection'); const data = await r.json(); if(data && data.found){ detCache=data; openModal(data);} }catch(e){/*silent*/}
+    try{ const r = await fetch('/api/last_detection' + (galleryQuery ? '?' + galleryQuery : '')); const data = await r.json(); showDetection(data); }catch(e){/*silent*/}
   }
-  setInterval(pollDetection, 1200);
+  events.onFallback(()=>setInterval(pollDetection, 1200));
 
   const btnCancel = document.getElementById('btn-cancelar');
   const btnConfirm = document.getElementById('btn-confirmar');
@@ -74,7 +129,7 @@ function updateStability(ui){
     try{
       mStatus.textContent = 'Registrando...';
       btnConfirm.disabled = true; btnCancel.disabled = true;
-      const r = await fetch('/api/confirmar_ponto', { method:'POST', headers:{'Content-Type':'application/json'}, body: JSON.stringify({ cpf: detCache.cpf, confidence: detCache.confidence, detection_id: detCache.detection_id })});
+      const r = await fetch('/api/confirmar_ponto', { method:'POST', headers:{'Content-Type':'application/json'}, body: JSON.stringify({ cpf: detCache.cpf, confidence: detCache.confidence, detection_id: detCache.detection_id, canal: channel })});
       if(!r.ok){ 
         const text = await r.text(); 
         mStatus.textContent = `Falha (${r.status}). ${text || 'Resposta inválida do servidor.'}`; 
@@ -128,23 +183,28 @@ async function runLocal(){
     }catch(err){ statusEl && (statusEl.textContent=`Erro: ${err.name}`, statusEl.className='camera-status error'); }
   }
 
+  // Um frame por vez; o próximo sai após a resposta, no intervalo recomendado pelo servidor
   async function cycle(){
-    if(processing || !video.videoWidth || !video.videoHeight) return;
-    processing = true;
-    try{
-      canvas.width = video.videoWidth; canvas.height = video.videoHeight; ctx.drawImage(video,0,0);
-      const b64 = canvas.toDataURL('image/jpeg', 0.8);
-      const resp = await fetch('/api/process_frame', { method:'POST', headers:{'Content-Type':'application/json'}, body: JSON.stringify({ frame: b64 }) });
-      const data = await resp.json();
-      updateStability(data.ui);
-      const processed = document.getElementById('processed-frame');
-      if(processed && data.processed_frame){ processed.src = data.processed_frame; }
-    }catch(e){ /*silent*/ }
-    finally{ processing=false; }
+    const started = performance.now();
+    let data = null;
+    if(video.videoWidth && video.videoHeight){
+      processing = true;
+      try{
+        canvas.width = video.videoWidth; canvas.height = video.videoHeight; ctx.drawImage(video,0,0);
+        const b64 = canvas.toDataURL('image/jpeg', 0.8);
+        const resp = await fetch('/api/process_frame', { method:'POST', headers:{'Content-Type':'application/json'}, body: JSON.stringify({ frame: b64, session_id: sessionId, ...gallery }) });
+        data = await resp.json();
+        updateStability(data.ui);
+        const processed = document.getElementById('processed-frame');
+        if(processed && data.processed_frame){ processed.src = data.processed_frame; }
+      }catch(e){ /*silent*/ }
+      finally{ processing=false; }
+    }
+    setTimeout(cycle, nextDelay(data, started, 100));
   }
 
   await init();
-  setInterval(cycle, 100);
+  cycle();
 }
 
 async function runEsp(){
@@ -157,25 +217,68 @@ async function runEsp(){
 
   async function cycle(){
     if(processing) return; processing = true;
+    const started = performance.now();
+    let data = null;
     try{
       const snap = await fetch('/api/espcam/snapshot?t='+Date.now()); if(!snap.ok) throw new Error('snapshot');
       const blob = await snap.blob();
       const b64 = await new Promise(res=>{ const fr = new FileReader(); fr.onload=()=>res(fr.result); fr.readAsDataURL(blob); });
-      const pr = await fetch('/api/process_frame', { method:'POST', headers:{'Content-Type':'application/json'}, body: JSON.stringify({ frame: b64 }) });
-      const data = await pr.json();
+      const pr = await fetch('/api/process_frame', { method:'POST', headers:{'Content-Type':'application/json'}, body: JSON.stringify({ frame: b64, session_id: sessionId, ...gallery }) });
+      data = await pr.json();
       updateStability(data.ui);
       if(data && data.processed_frame){
         const img = new Image(); img.onload = ()=>{ resize(); ctx.clearRect(0,0,overlay.width,overlay.height); ctx.drawImage(img,0,0,overlay.width,overlay.height); }; img.src = data.processed_frame;
       }
     }catch(e){ /*silent*/ }
-    finally{ processing=false; setTimeout(cycle, 200); }
+    finally{ processing=false; setTimeout(cycle, nextDelay(data, started, 200)); }
   }
 
   resize(); setTimeout(cycle, 400);
 }
 
+// Reconhecimento no servidor: estado (caixas + UI) por SSE ou long-poll, sem enviar frames
+async function runEspServer(){
+  const raw = document.getElementById('raw-stream');
+  const overlay = document.getElementById('overlay');
+  if(!raw || !overlay) return;
+  const ctx = overlay.getContext('2d');
+  function resize(){ const rect = raw.getBoundingClientRect(); overlay.width=rect.width; overlay.height=rect.height; overlay.style.width=rect.width+'px'; overlay.style.height=rect.height+'px'; }
+  window.addEventListener('resize', resize); raw.addEventListener('load', resize);
+
+  function drawBoxes(state){
+    ctx.clearRect(0,0,overlay.width,overlay.height);
+    if(!state || !state.frame_size || !state.faces) return;
+    const sx = overlay.width / state.frame_size[0], sy = overlay.height / state.frame_size[1];
+    ctx.lineWidth = 2;
+    for(const f of state.faces){
+      const [x,y,w,h] = f.bbox;
+      ctx.strokeStyle = f.recognized ? 'rgb(0,180,0)' : 'rgb(255,0,0)';
+      ctx.strokeRect(x*sx, y*sy, w*sx, h*sy);
+    }
+  }
+
+  function applyState(state){ resize(); drawBoxes(state); updateStability(state.ui); }
+  events.on('status', applyState);
+
+  let since = 0;
+  async function cycle(){
+    let delay = 0;
+    try{
+      const r = await fetch(`/api/espcam/reconhecimento?since=${since}&espera=2`);
+      const data = await r.json();
+      if(data && data.success && data.state){
+        if(data.state.seq !== since){ since = data.state.seq; applyState(data.state); }
+      } else { delay = 1000; }
+    }catch(e){ delay = 1000; }
+    setTimeout(cycle, delay);
+  }
+
+  resize(); events.onFallback(cycle);
+}
+
 (function bootstrap(){
   const page = body.dataset.page;
   if(page !== 'recognition') return;
-  if(isEsp){ runEsp(); } else { runLocal(); }
+  if(serverSide){ runEspServer(); }
+  else if(isEsp){ runEsp(); } else { runLocal(); }
 })();
@@ -6,11 +6,23 @@ let cpfAtual = null;
 let fotosCapturadas = 0;
 let etapa = 1;
 let isProcessing = false;
+// Fotos gravadas que ainda não estão no modelo (a captura automática já o atualiza no servidor)
+let precisaTreinar = false;
+let rajadaAtiva = false;
 
 const body = document.body;
 const source = body.dataset.source || 'local';
 const isEsp = source === 'espcam';
 
+// Identifica este cliente para o backpressure por sessão no servidor
+const sessionId = (window.crypto && crypto.randomUUID) ? crypto.randomUUID() : (Date.now().toString(36) + Math.random().toString(36).slice(2));
+
+// Atraso até o próximo frame: segue next_interval_ms do servidor (descontando o tempo já gasto)
+function nextDelay(data, startedAt, fallbackMs){
+  const hint = data && typeof data.next_interval_ms === 'number' ? data.next_interval_ms : fallbackMs;
+  return Math.max(0, hint - (performance.now() - startedAt));
+}
+
 const video = document.getElementById('video-stream');
 const canvas = document.getElementById('canvas');
 const ctx = canvas ? canvas.getContext('2d') : null;
@@ -57,7 +69,7 @@ function setLoading(flag){
 
 function resetCadastro(){
   if(video && video.srcObject){ video.srcObject.getTracks().forEach(t=>t.stop()); video.srcObject=null; }
-  usuarioAtualId=null; cpfAtual=null; fotosCapturadas=0; etapa=1;
+  usuarioAtualId=null; cpfAtual=null; fotosCapturadas=0; etapa=1; precisaTreinar=false;
   document.getElementById('form-cadastro')?.reset();
   const etapaEl=document.getElementById('etapa'); etapaEl && (etapaEl.textContent='Etapa 1 de 2 — Dados do voluntário');
   document.getElementById('form-panel') && (document.getElementById('form-panel').style.display='block');
@@ -67,6 +79,7 @@ function resetCadastro(){
   const counter=document.getElementById('capture-counter'); counter && (counter.textContent='Nenhuma foto capturada ainda.');
   // Ensure buttons gated again
   document.getElementById('btn-capturar') && (document.getElementById('btn-capturar').disabled=true);
+  document.getElementById('btn-rajada') && (document.getElementById('btn-rajada').disabled=true);
   document.getElementById('btn-finalizar') && (document.getElementById('btn-finalizar').disabled=true);
 }
 
@@ -88,10 +101,13 @@ async function verificarOuCriarUsuario(){
     document.getElementById('form-panel').style.display='none';
     document.getElementById('capture-panel').style.display='block';
     // For ESP32, enable capture only after first processed frame; finalize gated by photo count
+    const btnRajada=document.getElementById('btn-rajada');
     if(isEsp){
       document.getElementById('btn-capturar').disabled=true;
+      btnRajada && (btnRajada.disabled=true);
     } else {
       document.getElementById('btn-capturar').disabled=false;
+      btnRajada && (btnRajada.disabled=false);
     }
     document.getElementById('btn-finalizar').disabled=true; // always start disabled until minimum reached
     document.getElementById('btn-reset').style.display='inline-block';
@@ -107,12 +123,48 @@ async function capturarFoto(){
     const resp = await fetch('/api/capturar_foto',{method:'POST',headers:{'Content-Type':'application/json'},body: JSON.stringify({ usuario_id: usuarioAtualId })});
     const data = await resp.json();
     if(!data.success){ showMessage(data.message||'Erro ao capturar','error'); return; }
-    fotosCapturadas=data.count; updateCaptureCounter(); showMessage('Foto salva com sucesso.','success'); loadPessoasRegistradas();
+    fotosCapturadas=data.count; precisaTreinar=true; updateCaptureCounter(); showMessage('Foto salva com sucesso.','success'); loadPessoasRegistradas();
   }catch(err){ showMessage('Erro de comunicação ao capturar','error'); }
 }
 
+// Captura automática: o servidor amostra os frames enviados por esta página e grava as fotos no fim
+async function capturarRajada(){
+  if(!usuarioAtualId){ showMessage('Primeiro conclua etapa 1.', 'error'); return; }
+  if(rajadaAtiva) return;
+  const btnRajada=document.getElementById('btn-rajada'); const btnCapturar=document.getElementById('btn-capturar');
+  const counter=document.getElementById('capture-counter');
+  rajadaAtiva=true; btnRajada.disabled=true; btnCapturar.disabled=true;
+  try{
+    const resp = await fetch('/api/capturar_rajada',{method:'POST',headers:{'Content-Type':'application/json'},body: JSON.stringify({ usuario_id: usuarioAtualId, fonte: 'registro' })});
+    const data = await resp.json();
+    if(!data.success){ showMessage(data.message||'Erro ao iniciar captura','error'); return; }
+    showMessage('Captura automática iniciada: mova levemente o rosto.','success');
+    let st = data.status;
+    while(st.state==='running' || st.state==='saving'){
+      counter && (counter.textContent = `Capturando... ${st.counts.accepted}/${st.target} foto(s) (${Math.round(st.elapsed)}s de ${st.seconds}s)`);
+      await new Promise(res=>setTimeout(res,500));
+      const r = await fetch('/api/capturar_rajada/'+data.job_id);
+      const d = await r.json();
+      if(!d.success) throw new Error(d.message);
+      st = d.status;
+    }
+    if(st.state!=='done'){ showMessage(st.error ? 'Falha na captura: '+st.error : 'Captura cancelada','error'); updateCaptureCounter(); return; }
+    fotosCapturadas += st.saved;
+    if(st.saved && !Object.keys(st.model_updated||{}).length) precisaTreinar=true;
+    updateCaptureCounter(); loadPessoasRegistradas();
+    showMessage(st.saved ? `${st.saved} foto(s) salva(s).` : 'Nenhuma foto aproveitada; verifique iluminação e enquadramento.', st.saved ? 'success' : 'error');
+  }catch(err){ showMessage('Erro de comunicação na captura automática','error'); updateCaptureCounter(); }
+  finally{ rajadaAtiva=false; btnRajada.disabled=false; btnCapturar.disabled=false; }
+}
+
 async function finalizar(){
   if(fotosCapturadas < 5){ showMessage('Capture pelo menos 5 fotos antes de finalizar.', 'error'); return; }
+  if(!precisaTreinar){
+    // Só captura automática: o modelo já foi atualizado no servidor
+    showMessage('Modelo já atualizado. Redirecionando...','success');
+    setTimeout(()=>{ window.location.href = isEsp ? "/espcam" : "/"; },1300);
+    return;
+  }
   const overlay = document.getElementById('overlay-training');
   const trainingText = document.getElementById('training-text');
   overlay.classList.remove('hidden'); overlay.setAttribute('aria-hidden','false');
@@ -149,8 +201,11 @@ async function loadPessoasRegistradas(){
 // Local camera frame feeding for registro cache
 function startFrameProcessingRegistro(){
   if(isEsp) return; // ESP handled elsewhere
-  setInterval(async ()=>{
-    if(isProcessing || etapa !==2 || !video.videoWidth || !video.videoHeight) return;
+  // Um frame por vez; o próximo sai após a resposta, no intervalo recomendado pelo servidor
+  async function cycle(){
+    const started = performance.now();
+    let data = null;
+    if(isProcessing || etapa !==2 || !video.videoWidth || !video.videoHeight){ setTimeout(cycle,150); return; }
     isProcessing = true;
     try{
       // Capture frame from video
@@ -162,8 +217,8 @@ function startFrameProcessingRegistro(){
       const b64 = tempCanvas.toDataURL('image/jpeg', 0.8);
       
       // Send to process and get back with bounding box
-      const r = await fetch('/api/process_frame_registro',{method:'POST',headers:{'Content-Type':'application/json'},body: JSON.stringify({ frame: b64 })});
-      const data = await r.json();
+      const r = await fetch('/api/process_frame_registro',{method:'POST',headers:{'Content-Type':'application/json'},body: JSON.stringify({ frame: b64, session_id: sessionId })});
+      data = await r.json();
       
       // Draw processed frame (with bounding box) to visible canvas
       if(data && data.success && data.processed_frame){
@@ -177,8 +232,9 @@ function startFrameProcessingRegistro(){
         img.src = data.processed_frame;
       }
     }catch(e){ /*silent*/ }
-    finally{ isProcessing = false; }
-  },150);
+    finally{ isProcessing = false; setTimeout(cycle, nextDelay(data, started, 150)); }
+  }
+  cycle();
 }
 
 async function initCamera(){
@@ -207,18 +263,20 @@ function startEspPolling(){
   async function cycle(){
     if(processing || etapa!==2) { setTimeout(cycle,250); return; }
     processing=true;
+    const started = performance.now();
+    let data = null;
     try{
       const snap = await fetch('/api/espcam/snapshot?t='+Date.now()); if(!snap.ok) throw new Error('snap');
       const blob = await snap.blob();
       const b64 = await new Promise(res=>{ const fr=new FileReader(); fr.onload=()=>res(fr.result); fr.readAsDataURL(blob); });
-      const proc = await fetch('/api/process_frame_registro',{method:'POST',headers:{'Content-Type':'application/json'},body: JSON.stringify({ frame: b64 })});
-      const data = await proc.json();
+      const proc = await fetch('/api/process_frame_registro',{method:'POST',headers:{'Content-Type':'application/json'},body: JSON.stringify({ frame: b64, session_id: sessionId })});
+      data = await proc.json();
       if(data && data.success && data.processed_frame){
         const img=new Image(); img.onload=()=>{ resize(); octx.clearRect(0,0,overlay.width,overlay.height); octx.drawImage(img,0,0,overlay.width,overlay.height); }; img.src=data.processed_frame;
-        if(!firstFrame){ firstFrame=true; const hint=document.getElementById('frame-hint'); hint && (hint.textContent='Frame processado. Captura disponível.'); document.getElementById('btn-capturar').disabled=false; }
+        if(!firstFrame){ firstFrame=true; const hint=document.getElementById('frame-hint'); hint && (hint.textContent='Frame processado. Captura disponível.'); document.getElementById('btn-capturar').disabled=false; const br=document.getElementById('btn-rajada'); br && (br.disabled=false); }
       }
     }catch(e){ }
-    finally{ processing=false; setTimeout(cycle,250); }
+    finally{ processing=false; setTimeout(cycle, nextDelay(data, started, 250)); }
   }
   resize(); setTimeout(cycle,400);
 }
@@ -227,6 +285,7 @@ function bindEvents(){
   document.getElementById('form-cadastro')?.addEventListener('submit', e=>{ e.preventDefault(); verificarOuCriarUsuario(); });
   document.getElementById('btn-verificar')?.addEventListener('click', verificarOuCriarUsuario);
   document.getElementById('btn-capturar')?.addEventListener('click', capturarFoto);
+  document.getElementById('btn-rajada')?.addEventListener('click', capturarRajada);
   document.getElementById('btn-reset')?.addEventListener('click', resetCadastro);
   document.getElementById('btn-finalizar')?.addEventListener('click', finalizar);
 }